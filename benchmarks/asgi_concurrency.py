@@ -0,0 +1,215 @@
+"""
+Concurrent connections per instance: gunicorn (WSGI) against uvicorn (ASGI).
+
+Starts the web app under each server with the same number of worker
+processes, on a throwaway SQLite database with in-process broker and events,
+and holds --connections long-polls (``/task/<id>/status/?wait=``) open on a
+task that never changes while probing /health/. Under WSGI each waiting
+long-poll occupies a worker process; under ASGI it waits in the async view.
+The report has, per server and connection count, how many long-polls were
+answered on time (within the wait plus --slack seconds), their latency and
+the latency of the health probes sent meanwhile.
+
+Usage:
+    python -m benchmarks.asgi_concurrency --connections 2 10 50 --wait 5
+"""
+
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.common import emit, project_root, summarize, timed
+
+TASK_ID = 'benchmark-long-poll'
+
+
+def server_command(server, port, workers):
+    if server == 'wsgi':
+        return [
+            *(sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}'),
+            *('--workers', str(workers), '--timeout', '300'),
+            'remove_bg.wsgi:application',
+        ]
+    return [
+        *(sys.executable, '-m', 'uvicorn', 'remove_bg.asgi:application'),
+        *('--host', '127.0.0.1', '--port', str(port), '--workers', str(workers)),
+        *('--log-level', 'warning'),
+    ]
+
+
+def server_environment(data_dir):
+    return os.environ | {
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'benchmark'),
+        'DEBUG': 'False',
+        'ALLOWED_HOSTS': '127.0.0.1',
+        'DATABASE_PATH': str(Path(data_dir) / 'db.sqlite3'),
+        'DATABASE_CONN_MAX_AGE': '0',
+        'CELERY_BROKER_URL': 'memory://',
+        'CELERY_RESULT_BACKEND': 'cache+memory://',
+        'TASK_EVENTS_URL': 'memory://',
+        'TASK_STATE_URL': '',
+        'ADMISSION_URL': '',
+    }
+
+
+def prepare_database(env):
+    """Migrate the throwaway database and create a task that stays pending."""
+    script = (
+        'import django; django.setup()\n'
+        'from django.core.management import call_command\n'
+        "call_command('migrate', verbosity=0)\n"
+        'from processor.models import ProcessingTask\n'
+        f"ProcessingTask.objects.create(task_id={TASK_ID!r}, status='pending')\n"
+    )
+    subprocess.run(
+        [sys.executable, '-c', script],
+        cwd=project_root,
+        env=env | {'DJANGO_SETTINGS_MODULE': 'remove_bg.settings'},
+        check=True,
+    )
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited with code {process.returncode}')
+        try:
+            urllib.request.urlopen(f'{base_url}/health/', timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('Server did not start in time')
+
+
+def get(url, timeout):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        response.read()
+
+
+def measure(base_url, connections, wait, slack, probe_interval):
+    """Hold ``connections`` long-polls open and probe /health/ meanwhile."""
+    url = f'{base_url}/task/{TASK_ID}/status/?wait={wait}'
+    timeout = wait * 3 + slack
+    long_poll_ms, probe_ms = [], []
+    errors = 0
+    done = threading.Event()
+
+    def long_poll():
+        nonlocal errors
+        try:
+            with timed(long_poll_ms):
+                get(url, timeout)
+        except OSError:
+            errors += 1
+
+    def probe():
+        while not done.is_set():
+            try:
+                with timed(probe_ms):
+                    get(f'{base_url}/health/', timeout)
+            except OSError:
+                pass
+            done.wait(probe_interval)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        for _ in range(connections):
+            pool.submit(long_poll)
+    done.set()
+    prober.join()
+
+    on_time_ms = (wait + slack) * 1000
+    return {
+        'connections': connections,
+        'on_time': sum(1 for sample in long_poll_ms if sample <= on_time_ms),
+        'errors': errors,
+        **{f'long_poll_{k}': v for k, v in summarize(long_poll_ms).items()},
+        **{f'health_{k}': v for k, v in summarize(probe_ms).items()},
+    }
+
+
+def run(servers, connections, workers, wait, slack, probe_interval):
+    results = []
+    for server in servers:
+        data_dir = tempfile.mkdtemp(prefix='benchmark-asgi-')
+        env = server_environment(data_dir)
+        port = free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        try:
+            prepare_database(env)
+            process = subprocess.Popen(
+                server_command(server, port, workers), cwd=project_root, env=env
+            )
+            try:
+                wait_until_up(base_url, process)
+                for count in connections:
+                    row = measure(base_url, count, wait, slack, probe_interval)
+                    results.append({'server': server, 'workers': workers} | row)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        '--servers', nargs='+', default=['wsgi', 'asgi'], choices=['wsgi', 'asgi']
+    )
+    parser.add_argument(
+        '--connections',
+        nargs='+',
+        type=int,
+        default=[2, 10, 50],
+        help='Concurrent long-polls per run',
+    )
+    parser.add_argument(
+        '--workers', type=int, default=2, help='Server processes (as deployed: 2)'
+    )
+    parser.add_argument(
+        '--wait', type=float, default=5, help='Seconds each long-poll waits'
+    )
+    parser.add_argument(
+        '--slack',
+        type=float,
+        default=1,
+        help='Seconds past --wait a long-poll may take and still be on time',
+    )
+    parser.add_argument(
+        '--probe-interval', type=float, default=0.2, help='Seconds between probes'
+    )
+    parser.add_argument('--json', action='store_true', help='Print JSON results')
+    args = parser.parse_args()
+
+    results = run(
+        args.servers,
+        args.connections,
+        args.workers,
+        args.wait,
+        args.slack,
+        args.probe_interval,
+    )
+    emit(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
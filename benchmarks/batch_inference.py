@@ -0,0 +1,75 @@
+"""
+Measure segmentation throughput (images/sec) against inference batch size.
+
+Runs ``processor.batching.predict_masks`` on synthetic images, so only the
+model and pre/post-processing are timed (no storage or database access).
+
+Usage:
+    python -m benchmarks.batch_inference --batch-sizes 1 2 4 8 16 --images 64
+"""
+
+import argparse
+import time
+
+from benchmarks.common import emit, setup_django
+
+
+def synthetic_images(count, size):
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed=0)
+    return [
+        Image.fromarray(rng.integers(0, 255, (size[1], size[0], 3), dtype='uint8'))
+        for _ in range(count)
+    ]
+
+
+def run(model_name, batch_sizes, image_count, image_size):
+    from rembg import new_session
+
+    from processor.batching import predict_masks
+
+    session = new_session(model_name)
+    images = synthetic_images(image_count, image_size)
+    predict_masks(session, images[:1])  # warm-up
+
+    results = []
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        for offset in range(0, image_count, batch_size):
+            predict_masks(session, images[offset : offset + batch_size])
+        elapsed = time.perf_counter() - start
+
+        results.append(
+            {
+                'model': model_name,
+                'batch_size': batch_size,
+                'images': image_count,
+                'seconds': round(elapsed, 3),
+                'images_per_sec': round(image_count / elapsed, 2),
+            }
+        )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--model', default='u2net')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--images', type=int, default=64)
+    parser.add_argument('--width', type=int, default=1024)
+    parser.add_argument('--height', type=int, default=768)
+    parser.add_argument('--json', action='store_true', help='Print JSON results')
+    args = parser.parse_args()
+
+    setup_django()
+    emit(
+        run(args.model, args.batch_sizes, args.images, (args.width, args.height)),
+        args.json,
+    )
+
+
+if __name__ == '__main__':
+    main()
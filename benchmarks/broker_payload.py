@@ -0,0 +1,96 @@
+"""
+Compare broker message size and enqueue latency for image uploads.
+
+``inline`` reproduces the old behaviour (base64 image in the task arguments),
+``staged`` writes the upload to default storage and only enqueues its key.
+
+Usage:
+    python -m benchmarks.broker_payload --sizes-mb 1 5 10 --iterations 20
+"""
+
+import argparse
+import base64
+import os
+import tempfile
+import uuid
+
+from benchmarks.common import emit, setup_django, summarize, timed
+
+TASK_NAME = 'processor.tasks.process_image_task'
+
+
+def message_bytes(app, args):
+    """Size of the serialized task body as it would be written to the broker."""
+    from kombu.serialization import dumps
+
+    body = (args, {}, {'callbacks': None, 'errbacks': None, 'chain': None})
+    _, _, payload = dumps(body, serializer=app.conf.task_serializer)
+    return len(payload)
+
+
+def run(sizes_mb, iterations):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.test.utils import override_settings
+
+    from processor.staging import discard_staged, stage_upload
+    from remove_bg.celery import app
+
+    app.conf.broker_url = 'memory://'
+    results = []
+
+    with (
+        tempfile.TemporaryDirectory() as media_root,
+        override_settings(MEDIA_ROOT=media_root),
+        app.connection_for_write() as connection,
+    ):
+        for size_mb in sizes_mb:
+            image_bytes = os.urandom(int(size_mb * 1024 * 1024))
+
+            for mode in ('inline', 'staged'):
+                samples_ms = []
+                payload_size = 0
+
+                for _ in range(iterations):
+                    task_id = str(uuid.uuid4())
+                    input_key = ''
+
+                    with timed(samples_ms):
+                        if mode == 'inline':
+                            args = (base64.b64encode(image_bytes).decode(), task_id)
+                        else:
+                            upload = SimpleUploadedFile(f'{task_id}.png', image_bytes)
+                            input_key = stage_upload(upload, task_id)
+                            args = (input_key, task_id)
+                        app.send_task(
+                            TASK_NAME, args=args, task_id=task_id, connection=connection
+                        )
+
+                    payload_size = message_bytes(app, args)
+                    connection.default_channel.queue_purge(app.conf.task_default_queue)
+                    discard_staged(input_key)
+
+                results.append(
+                    {
+                        'mode': mode,
+                        'upload_mb': size_mb,
+                        'broker_bytes': payload_size,
+                        **summarize(samples_ms),
+                    }
+                )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes-mb', type=float, nargs='+', default=[1, 5, 10])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help='Print JSON results')
+    args = parser.parse_args()
+
+    setup_django()
+    emit(run(args.sizes_mb, args.iterations), args.json)
+
+
+if __name__ == '__main__':
+    main()
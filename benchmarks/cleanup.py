@@ -0,0 +1,117 @@
+"""
+Measure cleanup_old_tasks throughput on a large backlog.
+
+Seeds a throwaway SQLite database with --rows old tasks (a share of them with
+real result files in a temporary MEDIA_ROOT, some sharing results like cache
+hits do) and times the chunked cleanup for each chunk size.
+
+Usage:
+    python -m benchmarks.cleanup --rows 100000 --files 5000 --chunk-sizes 500 2000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import emit, setup_django
+
+
+def seed(rows, files, recent_rows):
+    from datetime import timedelta
+
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import default_storage
+    from django.utils import timezone
+
+    from processor.models import ProcessingTask
+
+    old = timezone.now() - timedelta(days=2)
+    tasks = []
+    for index in range(rows):
+        result_url = ''
+        if index < files:
+            # One task in ten reuses the previous task's file, like a cache hit
+            file_index = index - 1 if index % 10 == 1 else index
+            name = f'processed/bench-{file_index}.png'
+            if not default_storage.exists(name):
+                default_storage.save(name, ContentFile(b'x' * 256))
+            result_url = default_storage.url(name)
+        tasks.append(
+            ProcessingTask(
+                task_id=f'bench-{index}', status='completed', result_url=result_url
+            )
+        )
+
+    ProcessingTask.objects.bulk_create(tasks, batch_size=5000)
+    ProcessingTask.objects.update(created_at=old)
+    ProcessingTask.objects.bulk_create(
+        ProcessingTask(task_id=f'recent-{index}', status='pending')
+        for index in range(recent_rows)
+    )
+
+
+def run_once(rows, files, chunk_size, workers):
+    from datetime import timedelta
+
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test.utils import override_settings
+    from django.utils import timezone
+
+    from processor.cleanup import cleanup_old_tasks
+    from processor.models import ProcessingTask
+
+    with (
+        tempfile.TemporaryDirectory() as media_root,
+        override_settings(MEDIA_ROOT=media_root),
+    ):
+        call_command('flush', interactive=False, verbosity=0)
+        seed_start = time.perf_counter()
+        seed(rows, files, recent_rows=1000)
+        seed_seconds = time.perf_counter() - seed_start
+
+        stats = cleanup_old_tasks(
+            timezone.now() - timedelta(hours=1), chunk_size, workers
+        )
+        remaining_files = sum(len(names) for _, _, names in os.walk(media_root))
+        assert ProcessingTask.objects.count() == 1000, 'recent tasks must survive'
+        connection.close()
+
+    return {
+        'rows': rows,
+        'chunk_size': chunk_size,
+        'seed_s': round(seed_seconds, 2),
+        'cleanup_s': round(stats['seconds'], 2),
+        'tasks_per_s': round(stats['tasks'] / stats['seconds']),
+        'files_deleted': stats['files'],
+        'files_left': remaining_files,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--files', type=int, default=5000)
+    parser.add_argument('--chunk-sizes', type=int, nargs='+', default=[500, 2000])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--json', action='store_true', help='Print JSON results')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ['DATABASE_PATH'] = os.path.join(workdir, 'bench.sqlite3')
+        setup_django()
+
+        from django.core.management import call_command
+
+        call_command('migrate', verbosity=0)
+        results = [
+            run_once(args.rows, args.files, chunk_size, args.workers)
+            for chunk_size in args.chunk_sizes
+        ]
+
+    emit(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
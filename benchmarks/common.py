@@ -0,0 +1,54 @@
+import json
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+
+def setup_django():
+    """Configure Django so benchmarks can be run as plain scripts."""
+    import django
+
+    sys.path.insert(0, str(project_root))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'remove_bg.settings')
+    django.setup()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def summarize(samples_ms):
+    return {
+        'count': len(samples_ms),
+        'mean_ms': round(statistics.fmean(samples_ms), 3) if samples_ms else 0.0,
+        'p50_ms': round(percentile(samples_ms, 50), 3),
+        'p95_ms': round(percentile(samples_ms, 95), 3),
+    }
+
+
+@contextmanager
+def timed(samples_ms):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        samples_ms.append((time.perf_counter() - start) * 1000)
+
+
+def emit(results, as_json):
+    """Print results as JSON or as one aligned line per row."""
+    if as_json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for row in results:
+        print('  '.join(f'{key}={value}' for key, value in row.items()))
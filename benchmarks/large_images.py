@@ -0,0 +1,120 @@
+"""
+Compare full, downscale and tiled inference on large images.
+
+Each (size, mode) run happens in a fresh process so peak RSS is attributable
+to that run. Mask quality is reported as IoU of the thresholded alpha channel
+against the full-resolution path.
+
+Usage:
+    python -m benchmarks.large_images --megapixels 2 6 12 24 [--image photo.jpg]
+"""
+
+import argparse
+import math
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.common import emit, setup_django
+
+MODES = ('full', 'downscale', 'tiled')
+
+
+def build_image(megapixels, source_path=None):
+    from PIL import Image, ImageDraw
+
+    width = round(math.sqrt(megapixels * 1_000_000 * 3 / 2))
+    height = round(width * 2 / 3)
+
+    if source_path:
+        return Image.open(source_path).convert('RGB').resize((width, height))
+
+    image = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    ImageDraw.Draw(image).ellipse(
+        (width // 4, height // 5, 3 * width // 4, 4 * height // 5),
+        fill=(220, 120, 60),
+    )
+    return image
+
+
+def measure(megapixels, mode, model, source_path, alpha_path):
+    """Run one inference in the current (fresh) process."""
+    import resource
+
+    setup_django()
+    from processor.imaging import remove_background
+    from processor.sessions import get_session
+
+    session = get_session(model)
+    image = build_image(megapixels, source_path)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    output = remove_background(image, session, mode)
+    elapsed = time.perf_counter() - start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    output.getchannel('A').save(alpha_path)
+    return {
+        'seconds': elapsed,
+        'peak_rss_mb': peak_rss / 1024,
+        'rss_growth_mb': (peak_rss - baseline_rss) / 1024,
+    }
+
+
+def iou(first_path, second_path):
+    import numpy as np
+    from PIL import Image
+
+    first = np.asarray(Image.open(first_path)) >= 128
+    second = np.asarray(Image.open(second_path)) >= 128
+    union = np.logical_or(first, second).sum()
+    return float(np.logical_and(first, second).sum() / union) if union else 1.0
+
+
+def run(megapixel_counts, model, source_path):
+    context = multiprocessing.get_context('spawn')
+    results = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for megapixels in megapixel_counts:
+            alpha_paths = {}
+            for mode in MODES:
+                alpha_paths[mode] = os.path.join(workdir, f'{megapixels}-{mode}.png')
+                with ProcessPoolExecutor(1, mp_context=context) as pool:
+                    stats = pool.submit(
+                        measure, megapixels, mode, model, source_path, alpha_paths[mode]
+                    ).result()
+
+                results.append(
+                    {
+                        'megapixels': megapixels,
+                        'mode': mode,
+                        'seconds': round(stats['seconds'], 3),
+                        'peak_rss_mb': round(stats['peak_rss_mb'], 1),
+                        'rss_growth_mb': round(stats['rss_growth_mb'], 1),
+                        'iou_vs_full': round(
+                            iou(alpha_paths['full'], alpha_paths[mode]), 4
+                        ),
+                    }
+                )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--megapixels', type=float, nargs='+', default=[2, 6, 12, 24])
+    parser.add_argument('--model', default='u2net')
+    parser.add_argument('--image', help='Photo to resize instead of a synthetic image')
+    parser.add_argument('--json', action='store_true', help='Print JSON results')
+    args = parser.parse_args()
+
+    emit(run(args.megapixels, args.model, args.image), args.json)
+
+
+if __name__ == '__main__':
+    main()
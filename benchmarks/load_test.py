@@ -0,0 +1,231 @@
+"""
+Load test: single uploads plus status polling, as the web frontend does it.
+
+Sends --rate uploads per second for --duration seconds (open loop: a slow
+server does not slow the arrivals down) with at most --concurrency jobs in
+flight. Each job polls its status until it finishes. The report has upload
+latency, polling overhead (requests and time per job), queue wait (time until
+the job is first seen past ``pending``, so accurate to one poll interval),
+end-to-end completion time and how many uploads were rejected by admission
+control.
+
+Run it against a local stack whose worker uses a stub model, so the numbers
+show where the web workers, the broker and SQLite saturate rather than the
+model. Start Redis, then the web server as deployed and the stub worker:
+    gunicorn --workers 2 --timeout 300 remove_bg.wsgi:application
+    python -m benchmarks.load_test worker --model-latency-ms 200
+    python -m benchmarks.load_test run --url http://localhost:8000 --rate 5
+"""
+
+import argparse
+import os
+import threading
+import time
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import emit, setup_django, summarize
+from benchmarks.priority_queues import TERMINAL_STATUSES, Client, random_png
+
+
+class Stats:
+    """Samples collected by concurrent jobs."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples_ms = {
+            'upload': [],
+            'poll': [],
+            'polling_per_job': [],
+            'queue_wait': [],
+            'end_to_end': [],
+            'start_lag': [],
+        }
+        self.polls = 0
+        self.outcomes = {}
+
+    def add(self, outcome, **samples_ms):
+        with self.lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            for name, value in samples_ms.items():
+                if isinstance(value, list):
+                    self.samples_ms[name].extend(value)
+                elif value is not None:
+                    self.samples_ms[name].append(value)
+
+
+def upload_job(client, stats, scheduled, *args):
+    start = time.perf_counter()
+    start_lag = (start - scheduled) * 1000
+    try:
+        follow_job(client, stats, start, start_lag, *args)
+    except urllib.error.HTTPError as exc:
+        # 503 (admission control) and 429 (rate limit) are expected under load
+        outcome = 'rejected' if exc.code in (429, 503) else 'error'
+        stats.add(f'{outcome}_{exc.code}', start_lag=start_lag)
+    except OSError:
+        stats.add('error', start_lag=start_lag)
+
+
+def follow_job(
+    client, stats, start, start_lag, image_size, poll_interval, wait, timeout
+):
+    """Upload one image and poll it to a terminal state."""
+    task = client.post_multipart(
+        '/', {}, [('image', 'photo.png', random_png(image_size))]
+    )
+    uploaded = time.perf_counter()
+
+    status = task['status']
+    poll_ms = []
+    queue_wait = 0.0 if status != 'pending' else None
+    while status not in TERMINAL_STATUSES:
+        if time.perf_counter() - start > timeout:
+            status = 'timeout'
+            break
+        if not wait:
+            time.sleep(poll_interval)
+
+        poll_start = time.perf_counter()
+        query = f'?wait={wait}&since={status}' if wait else ''
+        status = client.get_json(f'/task/{task["task_id"]}/status/{query}')['status']
+        poll_ms.append((time.perf_counter() - poll_start) * 1000)
+
+        if queue_wait is None and status != 'pending':
+            queue_wait = (time.perf_counter() - uploaded) * 1000
+
+    finished = time.perf_counter()
+    stats.add(
+        status,
+        upload=(uploaded - start) * 1000,
+        poll=poll_ms,
+        polling_per_job=sum(poll_ms),
+        queue_wait=queue_wait,
+        end_to_end=None if status == 'timeout' else (finished - start) * 1000,
+        start_lag=start_lag,
+    )
+    with stats.lock:
+        stats.polls += len(poll_ms)
+
+
+def run(
+    base_url, rate, duration, concurrency, image_size, poll_interval, wait, timeout
+):
+    client = Client(base_url)
+    stats = Stats()
+    jobs = round(rate * duration)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index in range(jobs):
+            scheduled = start + index / rate
+            time.sleep(max(0.0, scheduled - time.perf_counter()))
+            pool.submit(
+                upload_job,
+                client,
+                stats,
+                scheduled,
+                image_size,
+                poll_interval,
+                wait,
+                timeout,
+            )
+    elapsed = time.perf_counter() - start
+
+    completed = stats.outcomes.get('completed', 0)
+    followed = len(stats.samples_ms['polling_per_job'])
+    results = [
+        {
+            'rate': rate,
+            'concurrency': concurrency,
+            'jobs': jobs,
+            **dict(sorted(stats.outcomes.items())),
+            'throughput_per_s': round(completed / elapsed, 2),
+            'polls_per_job': round(stats.polls / followed, 1) if followed else 0.0,
+        }
+    ]
+    # A growing start lag means the load generator, not the server, is the limit
+    results += [
+        {'metric': name} | summarize(samples)
+        for name, samples in stats.samples_ms.items()
+    ]
+    return results
+
+
+def stub_inference(latency_ms):
+    def run_inference(input_image, model_name):
+        time.sleep(latency_ms / 1000)
+        return input_image.convert('RGBA')
+
+    return run_inference
+
+
+def run_worker(model_latency_ms, concurrency, queues):
+    """Celery worker whose model is a fixed delay (patched before forking)."""
+    os.environ.setdefault('WORKER_WARMUP', 'False')  # No model to warm up
+    setup_django()
+
+    import processor.tasks
+    from processor.tuning import worker_concurrency
+    from remove_bg.celery import app
+
+    processor.tasks.run_inference = stub_inference(model_latency_ms)
+    app.Worker(
+        loglevel='WARNING',
+        concurrency=concurrency or worker_concurrency(),
+        queues=queues,
+        pool='prefork',
+    ).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    load = commands.add_parser('run', help='Generate load against a web server')
+    load.add_argument('--url', default='http://localhost:8000')
+    load.add_argument('--rate', type=float, default=5, help='Uploads per second')
+    load.add_argument('--duration', type=float, default=60, help='Seconds of load')
+    load.add_argument(
+        '--concurrency', type=int, default=50, help='Maximum jobs in flight'
+    )
+    load.add_argument('--image-size', type=int, default=512)
+    load.add_argument(
+        '--poll-interval',
+        type=float,
+        default=2.0,
+        help='Seconds between status polls (default: as the frontend)',
+    )
+    load.add_argument(
+        '--wait', type=float, default=0, help='Long-poll seconds instead of polling'
+    )
+    load.add_argument('--timeout', type=float, default=300)
+    load.add_argument('--json', action='store_true', help='Print JSON results')
+
+    worker = commands.add_parser('worker', help='Run a worker with a stub model')
+    worker.add_argument('--model-latency-ms', type=float, default=200)
+    worker.add_argument(
+        '--concurrency', type=int, default=0, help='Default: WORKER_CONCURRENCY'
+    )
+    worker.add_argument('--queues', nargs='+', default=['interactive', 'bulk'])
+
+    args = parser.parse_args()
+    if args.command == 'worker':
+        run_worker(args.model_latency_ms, args.concurrency, args.queues)
+        return
+
+    results = run(
+        args.url.rstrip('/'),
+        args.rate,
+        args.duration,
+        args.concurrency,
+        args.image_size,
+        args.poll_interval,
+        args.wait,
+        args.timeout,
+    )
+    emit(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Compare encode time and output size of the supported result formats.
+
+The corpus is a fixed set of synthetic RGBA cutouts (soft-edged subjects on a
+transparent background, like real results) unless --corpus points to a
+directory of images, which are converted to RGBA as-is.
+
+Usage:
+    python -m benchmarks.output_encoding [--corpus results/] [--repeat 3]
+"""
+
+import argparse
+import math
+from pathlib import Path
+
+from benchmarks.common import emit, summarize, timed
+
+# (label, output format, mask only, encoder options)
+VARIANTS = (
+    ('png-default', 'png', False, {}),
+    ('png-level1', 'png', False, {'compress_level': 1}),
+    ('png-optimize', 'png', False, {'optimize': True}),
+    ('webp-lossless', 'webp', False, {'lossless': True}),
+    ('webp-q80', 'webp', False, {'quality': 80}),
+    ('avif-q60', 'avif', False, {'quality': 60}),
+    ('mask-png', 'png', True, {}),
+    ('mask-png-level1', 'png', True, {'compress_level': 1}),
+)
+
+CORPUS_SIZES = ((640, 480), (1600, 1200), (3000, 2000))
+
+
+def synthetic_cutout(width, height):
+    from PIL import Image, ImageDraw, ImageFilter
+
+    image = Image.radial_gradient('L').resize((width, height))
+    image = Image.merge(
+        'RGB', (image, image.rotate(90), Image.new('L', image.size, 90))
+    )
+
+    alpha = Image.new('L', (width, height), 0)
+    ImageDraw.Draw(alpha).ellipse(
+        (width // 5, height // 6, 4 * width // 5, 5 * height // 6), fill=255
+    )
+    alpha = alpha.filter(ImageFilter.GaussianBlur(max(2, math.ceil(width / 300))))
+
+    image.putalpha(alpha)
+    return image
+
+
+def load_corpus(corpus_dir=None):
+    from PIL import Image
+
+    if not corpus_dir:
+        return [
+            (f'synthetic-{width}x{height}', synthetic_cutout(width, height))
+            for width, height in CORPUS_SIZES
+        ]
+
+    return [
+        (path.name, Image.open(path).convert('RGBA'))
+        for path in sorted(Path(corpus_dir).iterdir())
+        if path.is_file()
+    ]
+
+
+def run(corpus, repeat):
+    from processor.encoding import available_formats, encode_image
+
+    formats = available_formats()
+    results = []
+
+    for label, output_format, mask_only, options in VARIANTS:
+        if output_format not in formats:
+            continue
+
+        samples_ms = []
+        total_bytes = 0
+        for _, image in corpus:
+            source = image.getchannel('A') if mask_only else image
+            for _ in range(repeat):
+                with timed(samples_ms):
+                    data, _ = encode_image(source, output_format, options)
+            total_bytes += len(data)
+
+        results.append(
+            {'variant': label, 'total_kb': round(total_bytes / 1024, 1)}
+            | summarize(samples_ms)
+        )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--corpus', help='Directory of images to encode')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='Print JSON results')
+    args = parser.parse_args()
+
+    emit(run(load_corpus(args.corpus), args.repeat), args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""
+End-to-end benchmark of the single-image processing pipeline.
+
+Runs process_image_task in-process (no broker) on a synthetic corpus of
+sizes and formats, and reports per-stage p50/p95 for decode, inference,
+encode, storage_save and db (time spent in database queries), plus
+end-to-end latency, throughput and peak RSS. Results are JSON so runs can
+be compared across commits; compare() lists the metrics that got worse
+than a baseline by more than a threshold.
+
+The management command sets up the throwaway database and media directory:
+    python manage.py benchmark --output results.json
+    python manage.py benchmark --baseline results.json --threshold 0.2
+"""
+
+import io
+import os
+import platform
+import resource
+import subprocess
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from types import SimpleNamespace
+from unittest import mock
+
+from benchmarks.common import project_root, summarize, timed
+
+SIZES = ((640, 480), (1600, 1200), (3000, 2000))
+FORMATS = ('jpeg', 'png', 'webp')
+
+STAGES = ('decode', 'inference', 'encode', 'storage_save', 'db')
+
+# Latencies below this are too noisy to flag as regressions
+MIN_COMPARED_MS = 1.0
+
+# metric -> True if higher is worse
+COMPARED_METRICS = {
+    'p50_ms': True,
+    'p95_ms': True,
+    'throughput_per_s': False,
+    'peak_rss_mb': True,
+}
+
+
+def synthetic_photo(width, height):
+    """An RGB image with gradients, a subject and sensor-like noise."""
+    from PIL import Image, ImageDraw
+
+    image = Image.merge(
+        'RGB',
+        (
+            Image.linear_gradient('L').resize((width, height)),
+            Image.radial_gradient('L').resize((width, height)),
+            Image.effect_noise((width, height), 40),
+        ),
+    )
+    ImageDraw.Draw(image).ellipse(
+        (width // 4, height // 5, 3 * width // 4, 4 * height // 5),
+        fill=(220, 120, 60),
+    )
+    return image
+
+
+def build_corpus(sizes=SIZES, formats=FORMATS):
+    """``(case, format, encoded bytes)`` for every size and format."""
+    corpus = []
+    for width, height in sizes:
+        image = synthetic_photo(width, height)
+        for image_format in formats:
+            buffer = io.BytesIO()
+            image.save(buffer, format=image_format.upper())
+            corpus.append(
+                (f'{image_format}-{width}x{height}', image_format, buffer.getvalue())
+            )
+    return corpus
+
+
+class StageRecorder:
+    """Stand-in for metrics.STAGE_SECONDS that keeps every observation."""
+
+    def __init__(self):
+        self.samples_ms = defaultdict(list)
+
+    def labels(self, stage):
+        samples = self.samples_ms[stage]
+        return SimpleNamespace(observe=lambda seconds: samples.append(seconds * 1000))
+
+
+@contextmanager
+def query_time():
+    """Yield a one-item list accumulating the milliseconds spent in queries."""
+    from django.db import connection
+
+    total_ms = [0.0]
+
+    def wrapper(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            total_ms[0] += (time.perf_counter() - start) * 1000
+
+    with connection.execute_wrapper(wrapper):
+        yield total_ms
+
+
+def passthrough_inference(input_image, model_name):
+    """Replaces inference to measure the rest of the pipeline on its own."""
+    return input_image.convert('RGBA')
+
+
+def peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run(corpus, repeat=5, warmup=1, model_name=None, inference=True):
+    """
+    Process every corpus entry ``warmup + repeat`` times and summarize.
+
+    Expects a disposable database and storage. Returns one row per case and
+    stage; the ``end_to_end`` row also carries throughput and peak RSS.
+    """
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import default_storage
+
+    from processor.models import ProcessingTask
+    from processor.tasks import process_image_task
+
+    patch_inference = (
+        nullcontext()
+        if inference
+        else mock.patch('processor.tasks.run_inference', passthrough_inference)
+    )
+    results = []
+
+    with patch_inference:
+        for case, image_format, data in corpus:
+            recorder = StageRecorder()
+            end_to_end_ms = []
+
+            for iteration in range(warmup + repeat):
+                measured = iteration >= warmup
+                task_id = f'benchmark-{case}-{iteration}'
+                ProcessingTask.objects.create(task_id=task_id)
+                input_key = default_storage.save(
+                    f'uploads/{task_id}.{image_format}', ContentFile(data)
+                )
+
+                with (
+                    mock.patch(
+                        'processor.metrics.STAGE_SECONDS',
+                        recorder if measured else StageRecorder(),
+                    ),
+                    query_time() as db_ms,
+                    timed(end_to_end_ms if measured else []),
+                ):
+                    result = process_image_task.apply(
+                        args=(input_key, task_id, model_name)
+                    ).result
+
+                if result['status'] != 'completed':
+                    raise RuntimeError(f'{case} failed: {result["error"]}')
+                if measured:
+                    recorder.samples_ms['db'].append(db_ms[0])
+
+            for stage in STAGES:
+                if recorder.samples_ms[stage]:
+                    results.append(
+                        {'case': case, 'stage': stage}
+                        | summarize(recorder.samples_ms[stage])
+                    )
+
+            seconds = sum(end_to_end_ms) / 1000
+            results.append(
+                {'case': case, 'stage': 'end_to_end'}
+                | summarize(end_to_end_ms)
+                | {
+                    'throughput_per_s': round(repeat / seconds, 2) if seconds else 0.0,
+                    'peak_rss_mb': peak_rss_mb(),
+                }
+            )
+
+    return results
+
+
+def environment(model_name, inference):
+    """What the numbers depend on, so reports are only compared knowingly."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=project_root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ''
+
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': len(os.sched_getaffinity(0)),
+        'model': model_name or '',
+        'inference': inference,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Metrics of ``results`` worse than ``baseline`` by more than ``threshold``.
+
+    Both are lists of rows as returned by run(); rows present in only one of
+    them are ignored. ``threshold`` is a fraction (0.2 allows 20% worse).
+    """
+    baseline_rows = {(row['case'], row['stage']): row for row in baseline}
+    regressions = []
+
+    for row in results:
+        previous = baseline_rows.get((row['case'], row['stage']))
+        if previous is None:
+            continue
+
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            if metric not in row or metric not in previous:
+                continue
+            current, before = row[metric], previous[metric]
+            if metric.endswith('_ms') and before < MIN_COMPARED_MS:
+                continue
+            if not before:
+                continue
+
+            change = (current - before) / before
+            if (change if higher_is_worse else -change) > threshold:
+                regressions.append(
+                    {
+                        'case': row['case'],
+                        'stage': row['stage'],
+                        'metric': metric,
+                        'baseline': before,
+                        'current': current,
+                        'change': round(change, 3),
+                    }
+                )
+
+    return regressions
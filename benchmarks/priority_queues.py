@@ -0,0 +1,170 @@
+"""
+Load test: interactive upload latency while a bulk backlog is processed.
+
+Runs against a live deployment (web, Redis and workers, e.g. docker compose).
+Queues one batch of --bulk images, then submits --interactive single uploads
+every --interval seconds and waits for each to finish through the long-poll
+status endpoint. Reports end-to-end interactive latency and how much of the
+bulk batch completed meanwhile. Run it twice, with --bulk-priority bulk and
+interactive, to compare dedicated queues against one shared queue.
+
+Usage:
+    python -m benchmarks.priority_queues --url http://localhost:8000 --bulk 200
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from benchmarks.common import emit, summarize
+
+TERMINAL_STATUSES = ('completed', 'failed')
+
+
+def random_png(size):
+    """A noise image, unique per call so the result cache never short-circuits."""
+    from PIL import Image
+
+    image = Image.frombytes('RGB', (size, size), os.urandom(size * size * 3))
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class Client:
+    """urllib client that keeps cookies and sends Django's CSRF token."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies)
+        )
+        self.opener.open(f'{base_url}/', timeout=30).close()  # Sets csrftoken
+        self.csrf_token = next(
+            (cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), ''
+        )
+
+    def get_json(self, path):
+        with self.opener.open(f'{self.base_url}{path}', timeout=120) as response:
+            return json.load(response)
+
+    def post_multipart(self, path, fields, files):
+        """POST form fields and ``(field, filename, bytes)`` files; return JSON."""
+        body, content_type = encode_multipart(fields, files)
+        request = urllib.request.Request(
+            f'{self.base_url}{path}',
+            data=body,
+            headers={
+                'Content-Type': content_type,
+                'Referer': self.base_url,
+                'X-CSRFToken': self.csrf_token,
+            },
+        )
+        with self.opener.open(request, timeout=120) as response:
+            return json.load(response)
+
+
+def encode_multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    body = BytesIO()
+    for name, value in fields.items():
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"'
+            f'\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, filename, content in files:
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+            f'filename="{filename}"\r\nContent-Type: image/png\r\n\r\n'.encode()
+        )
+        body.write(content)
+        body.write(b'\r\n')
+    body.write(f'--{boundary}--\r\n'.encode())
+    return body.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+
+def interactive_job(client, image_size, timeout):
+    """Upload one image and wait for it; return the latency in milliseconds."""
+    start = time.perf_counter()
+    task = client.post_multipart(
+        '/',
+        {'priority': 'interactive'},
+        [('image', 'photo.png', random_png(image_size))],
+    )
+
+    status = task.get('status')
+    while status not in TERMINAL_STATUSES:
+        if time.perf_counter() - start > timeout:
+            return None
+        payload = client.get_json(
+            f'/task/{task["task_id"]}/status/?wait=30&since={status}'
+        )
+        status = payload['status']
+
+    return (time.perf_counter() - start) * 1000
+
+
+def run(base_url, bulk, bulk_priority, interactive, interval, image_size, timeout):
+    client = Client(base_url)
+    batch = client.post_multipart(
+        '/batch/',
+        {'priority': bulk_priority},
+        [('images', f'bulk-{i}.png', random_png(image_size)) for i in range(bulk)],
+    )
+
+    with ThreadPoolExecutor(max_workers=interactive) as pool:
+        futures = []
+        for _ in range(interactive):
+            futures.append(pool.submit(interactive_job, client, image_size, timeout))
+            time.sleep(interval)
+        latencies = [future.result() for future in futures]
+
+    progress = client.get_json(f'/batch/{batch["batch_id"]}/status/')
+    completed = [latency for latency in latencies if latency is not None]
+
+    return [
+        {
+            'bulk_priority': bulk_priority,
+            'bulk_jobs': bulk,
+            'bulk_progress': progress['progress'],
+            'interactive_timeouts': len(latencies) - len(completed),
+        }
+        | summarize(completed)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--bulk', type=int, default=200, help='Images in the batch')
+    parser.add_argument(
+        '--bulk-priority', default='bulk', choices=('bulk', 'interactive')
+    )
+    parser.add_argument('--interactive', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=2.0)
+    parser.add_argument('--image-size', type=int, default=512)
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--json', action='store_true', help='Print JSON results')
+    args = parser.parse_args()
+
+    results = run(
+        args.url.rstrip('/'),
+        args.bulk,
+        args.bulk_priority,
+        args.interactive,
+        args.interval,
+        args.image_size,
+        args.timeout,
+    )
+    emit(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
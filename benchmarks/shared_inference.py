@@ -0,0 +1,138 @@
+"""
+Compare memory and throughput of per-process sessions and the inference server.
+
+For each concurrency level, runs a pool of spawned processes through
+``processor.tasks.run_inference`` twice: once with every process loading its
+own model session (the default prefork setup) and once with the processes
+sending images to a single inference server (INFERENCE_SERVER_ADDRESS).
+Memory is the total proportional set size (PSS) of the pool and the server
+after warm-up, so pages shared between processes are only counted once.
+
+Usage:
+    python -m benchmarks.shared_inference --concurrency 1 2 4 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks.common import emit, setup_django
+
+IMAGE_SIZE = (1024, 768)
+
+
+def init_process(environment):
+    os.environ.update(environment)
+    setup_django()
+
+
+def run_server(environment):
+    os.environ.update(environment)
+    setup_django()
+
+    from processor.inference_server import serve
+
+    serve()
+
+
+def process_image(model_name, seed):
+    import numpy as np
+    from PIL import Image
+
+    from processor.tasks import run_inference
+
+    rng = np.random.default_rng(seed=seed)
+    pixels = rng.integers(0, 255, (IMAGE_SIZE[1], IMAGE_SIZE[0], 3), dtype='uint8')
+    run_inference(Image.fromarray(pixels), model_name)
+
+
+def descendants(pid):
+    """Pids of every process below ``pid`` (Linux only)."""
+    children = []
+    for task in Path(f'/proc/{pid}/task').iterdir():
+        children += [int(child) for child in (task / 'children').read_text().split()]
+    return children + [grandchild for c in children for grandchild in descendants(c)]
+
+
+def total_pss_mb():
+    total_kb = 0
+    for pid in descendants(os.getpid()):
+        try:
+            rollup = Path(f'/proc/{pid}/smaps_rollup').read_text()
+        except OSError:
+            continue  # Exited meanwhile
+        for line in rollup.splitlines():
+            if line.startswith('Pss:'):
+                total_kb += int(line.split()[1])
+    return round(total_kb / 1024, 1)
+
+
+def run_mode(mode, concurrency, model_name, image_count):
+    context = multiprocessing.get_context('spawn')
+    environment = {
+        'WORKER_CONCURRENCY': str(concurrency),
+        'INFERENCE_SERVER_ADDRESS': '',
+    }
+
+    server = None
+    if mode == 'server':
+        environment['INFERENCE_SERVER_ADDRESS'] = os.path.join(
+            tempfile.mkdtemp(), 'inference.sock'
+        )
+        server = context.Process(target=run_server, args=(environment,), daemon=True)
+        server.start()
+
+    try:
+        with ProcessPoolExecutor(
+            concurrency,
+            mp_context=context,
+            initializer=init_process,
+            initargs=(environment,),
+        ) as pool:
+            # Start every process and load the sessions before measuring
+            warm_up = 2 * concurrency
+            list(pool.map(process_image, [model_name] * warm_up, range(warm_up)))
+            memory = total_pss_mb()
+
+            start = time.perf_counter()
+            list(
+                pool.map(process_image, [model_name] * image_count, range(image_count))
+            )
+            elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+
+    return {
+        'mode': mode,
+        'concurrency': concurrency,
+        'total_pss_mb': memory,
+        'images_per_sec': round(image_count / elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--model', default='u2net')
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 2, 4])
+    parser.add_argument('--images', type=int, default=32)
+    parser.add_argument('--json', action='store_true', help='Print JSON results')
+    args = parser.parse_args()
+
+    emit(
+        [
+            run_mode(mode, concurrency, args.model, args.images)
+            for concurrency in args.concurrency
+            for mode in ('per-process', 'server')
+        ],
+        args.json,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Measure process startup time and RSS for the web and worker import paths.
+
+Each phase runs in a fresh interpreter:
+  web     - django.setup() and importing processor.views (what gunicorn loads)
+  worker  - the above plus loading a model session, as the first task does
+
+Before lazy loading, the web phase also paid the model load, so it matched
+the worker row.
+
+Usage:
+    python -m benchmarks.startup --model u2net --repeat 3
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import emit, project_root
+
+PROBE = """
+import json, os, resource, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'remove_bg.settings')
+import django
+django.setup()
+import processor.views
+if {load_model!r}:
+    from processor.sessions import get_session
+    get_session({model!r})
+print(json.dumps({{
+    'seconds': time.perf_counter() - start,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def probe(load_model, model):
+    code = PROBE.format(root=str(project_root), load_model=load_model, model=model)
+    output = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(model, repeat):
+    results = []
+    for phase, load_model in (('web', False), ('worker', True)):
+        samples = [probe(load_model, model) for _ in range(repeat)]
+        results.append(
+            {
+                'phase': phase,
+                'model': model if load_model else '-',
+                'startup_s': round(statistics.median(s['seconds'] for s in samples), 3),
+                'max_rss_mb': round(max(s['max_rss_mb'] for s in samples), 1),
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--model', default='u2net')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='Print JSON results')
+    args = parser.parse_args()
+
+    emit(run(args.model, args.repeat), args.json)
+
+
+if __name__ == '__main__':
+    main()
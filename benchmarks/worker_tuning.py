@@ -0,0 +1,119 @@
+"""
+Sweep worker processes x ONNX threads x graph optimization for throughput.
+
+Each combination starts a fresh pool of spawned processes configured through
+the same WORKER_CONCURRENCY / ONNX_* environment variables as the worker, lets
+every process load its session, then times background removal of a fixed set
+of synthetic images spread across the pool. The ``auto`` row shows what the
+worker would pick on this machine.
+
+Usage:
+    python -m benchmarks.worker_tuning --processes 1 2 4 --threads 1 2 4
+"""
+
+import argparse
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.common import emit, setup_django
+
+IMAGE_SIZE = (1024, 768)
+
+
+def init_process(environment, model_name):
+    os.environ.update(environment)
+    setup_django()
+
+    from processor.sessions import get_session
+
+    get_session(model_name)
+
+
+def process_image(model_name, seed):
+    import numpy as np
+    from PIL import Image
+
+    from processor.imaging import remove_background
+    from processor.sessions import get_session
+
+    rng = np.random.default_rng(seed=seed)
+    pixels = rng.integers(0, 255, (IMAGE_SIZE[1], IMAGE_SIZE[0], 3), dtype='uint8')
+    start = time.perf_counter()
+    remove_background(Image.fromarray(pixels), get_session(model_name), 'full')
+    return time.perf_counter() - start
+
+
+def run_combination(processes, threads, optimization, model_name, image_count):
+    environment = {
+        'WORKER_CONCURRENCY': str(processes),
+        'ONNX_INTRA_OP_THREADS': str(threads),
+        'ONNX_GRAPH_OPTIMIZATION': optimization,
+    }
+    pool_size = auto_processes() if processes == 'auto' else int(processes)
+
+    with ProcessPoolExecutor(
+        pool_size,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_process,
+        initargs=(environment, model_name),
+    ) as pool:
+        # Start every process and load its session before timing
+        warm_up = 2 * pool_size
+        list(pool.map(process_image, [model_name] * warm_up, range(warm_up)))
+
+        start = time.perf_counter()
+        latencies = list(
+            pool.map(process_image, [model_name] * image_count, range(image_count))
+        )
+        elapsed = time.perf_counter() - start
+
+    return {
+        'processes': pool_size,
+        'intra_op_threads': threads,
+        'graph_optimization': optimization,
+        'images_per_sec': round(image_count / elapsed, 2),
+        'mean_latency_s': round(sum(latencies) / len(latencies), 3),
+    }
+
+
+def auto_processes():
+    setup_django()
+    from django.test.utils import override_settings
+
+    from processor.tuning import worker_concurrency
+
+    with override_settings(WORKER_CONCURRENCY='auto'):
+        return worker_concurrency()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--model', default='u2net')
+    parser.add_argument('--processes', nargs='+', default=['1', '2', '4'])
+    parser.add_argument('--threads', nargs='+', default=['1', '2', '4'])
+    parser.add_argument('--optimizations', nargs='+', default=['all'])
+    parser.add_argument('--images', type=int, default=32)
+    parser.add_argument('--no-auto', action='store_true', help='Skip the auto row')
+    parser.add_argument('--json', action='store_true', help='Print JSON results')
+    args = parser.parse_args()
+
+    combinations = list(
+        itertools.product(args.processes, args.threads, args.optimizations)
+    )
+    if not args.no_auto:
+        combinations.append(('auto', 'auto', 'all'))
+
+    emit(
+        [
+            run_combination(processes, threads, optimization, args.model, args.images)
+            for processes, threads, optimization in combinations
+        ],
+        args.json,
+    )
+
+
+if __name__ == '__main__':
+    main()
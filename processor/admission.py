@@ -0,0 +1,245 @@
+import logging
+import math
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+
+from processor.backends import get_backend
+
+logger = logging.getLogger(__name__)
+
+SERVICE_TIME_KEY = 'processor:admission:service_time'
+SERVICE_TIME_ALPHA = 0.2  # Weight of the newest sample in the moving average
+
+# KEYS[1] bucket; ARGV rate (tokens/s), burst, now (s), cost. A cost above
+# the burst needs a full bucket and leaves it in debt (negative tokens).
+TOKEN_BUCKET_SCRIPT = """
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local now, cost = tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(state[1]) or burst
+local at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - at) * rate)
+local needed = math.min(cost, burst)
+local allowed = tokens >= needed
+if allowed then tokens = tokens - cost end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 1)
+if allowed then return {1, '0'} end
+return {0, tostring((needed - tokens) / rate)}
+"""
+
+# KEYS[1] average; ARGV sample, alpha, ttl
+MOVING_AVERAGE_SCRIPT = """
+local value = tonumber(ARGV[1])
+local current = tonumber(redis.call('GET', KEYS[1]))
+if current then value = current + tonumber(ARGV[2]) * (value - current) end
+redis.call('SET', KEYS[1], tostring(value), 'EX', ARGV[3])
+return tostring(value)
+"""
+
+
+class InProcessStore:
+    """Token buckets and averages within one process (non-Redis ADMISSION_URL)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._averages = {}
+
+    def take_token(self, key, rate, burst, now, cost=1):
+        with self._lock:
+            tokens, at = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + max(0, now - at) * rate)
+            needed = min(cost, burst)
+            allowed = tokens >= needed
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+        return allowed, 0.0 if allowed else (needed - tokens) / rate
+
+    def update_average(self, key, sample, alpha, ttl):
+        with self._lock:
+            current = self._averages.get(key)
+            value = sample if current is None else current + alpha * (sample - current)
+            self._averages[key] = value
+        return value
+
+    def get_average(self, key):
+        return self._averages.get(key)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._averages.clear()
+
+
+class RedisStore:
+    def __init__(self, client):
+        self._client = client
+        self._take_token = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._update_average = self._client.register_script(MOVING_AVERAGE_SCRIPT)
+
+    def take_token(self, key, rate, burst, now, cost=1):
+        allowed, retry_after = self._take_token(
+            keys=[key], args=[rate, burst, now, cost]
+        )
+        return bool(allowed), float(retry_after)
+
+    def update_average(self, key, sample, alpha, ttl):
+        return float(self._update_average(keys=[key], args=[sample, alpha, ttl]))
+
+    def get_average(self, key):
+        value = self._client.get(key)
+        return float(value) if value is not None else None
+
+
+def get_store():
+    """Return the admission store for ADMISSION_URL, or None when disabled."""
+    return get_backend(settings.ADMISSION_URL, RedisStore, InProcessStore)
+
+
+class Rejection(NamedTuple):
+    status: int  # 429 (client rate limit) or 503 (workers saturated)
+    error: str
+    retry_after: int  # Seconds
+
+
+_depths = {}  # queue -> (depth, measured at), per process
+
+
+def queue_depth(queue: str) -> int:
+    """
+    Messages waiting in a broker queue.
+
+    Cached for ADMISSION_DEPTH_CACHE_SECONDS so a burst of uploads costs one
+    broker round trip per process instead of one per request.
+    """
+    cached = _depths.get(queue)
+    if cached and time.monotonic() - cached[1] < settings.ADMISSION_DEPTH_CACHE_SECONDS:
+        return cached[0]
+
+    from amqp.exceptions import ChannelError
+
+    from remove_bg.celery import app
+
+    with app.connection_for_read() as connection:
+        try:
+            depth = connection.default_channel.queue_declare(
+                queue, passive=True
+            ).message_count
+        except ChannelError:
+            depth = 0  # Not declared yet (or drained, on Redis)
+
+    _depths[queue] = (depth, time.monotonic())
+    return depth
+
+
+def service_time() -> float:
+    """Recent seconds per job from the workers, or ADMISSION_SERVICE_SECONDS."""
+    store = get_store()
+    try:
+        average = store.get_average(SERVICE_TIME_KEY) if store else None
+    except Exception:
+        logger.warning('Failed to read the service time', exc_info=True)
+        average = None
+    return average if average is not None else settings.ADMISSION_SERVICE_SECONDS
+
+
+def record_service_time(seconds: float) -> None:
+    """Fold one job's duration into the shared moving average (best effort)."""
+    store = get_store()
+    if store is None:
+        return
+    try:
+        store.update_average(
+            SERVICE_TIME_KEY,
+            seconds,
+            SERVICE_TIME_ALPHA,
+            settings.ADMISSION_SERVICE_TTL,
+        )
+    except Exception:
+        logger.warning('Failed to record the service time', exc_info=True)
+
+
+def estimate_wait(priority: str) -> tuple[int, float]:
+    """Jobs queued ahead of a new job of this priority, and their drain time."""
+    from remove_bg.celery import route_task
+
+    route = route_task(
+        'processor.tasks.process_image_task', (), {'priority': priority}, {}
+    )
+    depth = queue_depth(route['queue'])
+    return depth, depth * service_time() / settings.ADMISSION_WORKER_SLOTS
+
+
+def client_address(request) -> str:
+    """
+    Client IP for rate limiting.
+
+    With RATE_LIMIT_PROXY_COUNT trusted proxies in front of the app, the
+    client is that many entries from the end of X-Forwarded-For; entries
+    further left are set by the client and cannot be trusted.
+    """
+    proxies = settings.RATE_LIMIT_PROXY_COUNT
+    forwarded = [
+        address.strip()
+        for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+        if address.strip()
+    ]
+    if proxies and len(forwarded) >= proxies:
+        return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def check_rate_limit(request, cost: int = 1) -> Rejection | None:
+    """
+    Take ``cost`` tokens (one per image) from the client's bucket.
+
+    Buckets follow the RATE_LIMIT_* settings. A batch larger than
+    RATE_LIMIT_BURST is admitted from a full bucket and leaves it in debt,
+    so images in batches are limited like single uploads.
+    """
+    store = get_store()
+    if not settings.RATE_LIMIT_ENABLED or store is None:
+        return None
+
+    key = f'processor:ratelimit:{client_address(request)}'
+    try:
+        allowed, retry_after = store.take_token(
+            key,
+            settings.RATE_LIMIT_RATE,
+            settings.RATE_LIMIT_BURST,
+            time.time(),
+            cost,
+        )
+    except Exception:
+        logger.warning('Rate limit check failed; admitting', exc_info=True)
+        return None
+
+    if allowed:
+        return None
+    return Rejection(429, 'Too many uploads, slow down', max(1, math.ceil(retry_after)))
+
+
+def check_capacity(priority: str, jobs: int = 1) -> tuple[Rejection | None, float]:
+    """
+    Decide whether ``jobs`` more images of this priority may be queued.
+
+    Returns ``(rejection, estimated_wait)``. Uploads are refused when the
+    queue would hold more than ADMISSION_MAX_QUEUE_DEPTH jobs or its expected
+    wait exceeds the priority's ADMISSION_MAX_WAIT_SECONDS; Retry-After is
+    roughly when the workers will have drained it below both limits.
+    """
+    depth, wait = estimate_wait(priority)
+
+    excess_jobs = depth + jobs - settings.ADMISSION_MAX_QUEUE_DEPTH
+    excess_wait = wait - settings.ADMISSION_MAX_WAIT_SECONDS[priority]
+    if excess_jobs > 0 or excess_wait > 0:
+        drain = excess_jobs * service_time() / settings.ADMISSION_WORKER_SLOTS
+        retry_after = max(1, math.ceil(max(drain, excess_wait)))
+        return Rejection(503, 'Server busy, try again later', retry_after), wait
+
+    return None, wait
@@ -0,0 +1,50 @@
+"""
+Process-wide backends for state shared between web and worker processes.
+
+The hot task state (processor.task_state), admission control
+(processor.admission) and task events (processor.events) each name a URL in
+settings. A ``redis://`` or ``rediss://`` URL gets the Redis implementation,
+built on one client (and connection pool) per URL that all of them share;
+any other URL gets the in-process implementation, for tests and
+single-process setups.
+"""
+
+import threading
+
+_clients = {}
+_backends = {}
+_lock = threading.RLock()
+
+
+def is_redis_url(url: str) -> bool:
+    return url.startswith(('redis://', 'rediss://'))
+
+
+def redis_client(url: str):
+    """This process's Redis client for ``url``."""
+    with _lock:
+        if url not in _clients:
+            import redis
+
+            _clients[url] = redis.Redis.from_url(url)
+        return _clients[url]
+
+
+def get_backend(url: str, redis_backend, in_process_backend):
+    """
+    This process's backend for ``url``, or None when ``url`` is empty.
+
+    ``redis_backend`` is called with the shared client for a Redis URL,
+    ``in_process_backend`` with no arguments otherwise; each is built once.
+    """
+    if not url:
+        return None
+    with _lock:
+        key = (redis_backend, url)
+        if key not in _backends:
+            _backends[key] = (
+                redis_backend(redis_client(url))
+                if is_redis_url(url)
+                else in_process_backend()
+            )
+        return _backends[key]
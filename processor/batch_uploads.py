@@ -0,0 +1,106 @@
+import io
+import mimetypes
+import os
+import zipfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from processor.storage import storage_name_from_url
+
+IGNORED_ARCHIVE_PREFIXES = ('__MACOSX/', '.')
+
+
+def archive_entries(archive) -> list[zipfile.ZipInfo]:
+    """
+    List the image candidates in a zip upload.
+
+    Raises ValueError for corrupt archives or more than BATCH_MAX_FILES entries.
+    """
+    try:
+        with zipfile.ZipFile(archive) as zip_file:
+            entries = [
+                entry
+                for entry in zip_file.infolist()
+                if not entry.is_dir()
+                and not entry.filename.startswith(IGNORED_ARCHIVE_PREFIXES)
+                and not os.path.basename(entry.filename).startswith('.')
+            ]
+    except zipfile.BadZipFile:
+        raise ValueError('Invalid zip archive')
+
+    if len(entries) > settings.BATCH_MAX_FILES:
+        raise ValueError(f'Archive contains more than {settings.BATCH_MAX_FILES} files')
+    return entries
+
+
+def iter_archive_files(archive, entries):
+    """
+    Yield archive entries one at a time as uploaded files.
+
+    Reads at most MAX_UPLOAD_SIZE + 1 bytes per entry, so oversized or
+    zip-bomb entries fail the regular size validation without being inflated.
+    """
+    with zipfile.ZipFile(archive) as zip_file:
+        for entry in entries:
+            with zip_file.open(entry) as member:
+                content = member.read(settings.MAX_UPLOAD_SIZE + 1)
+
+            name = os.path.basename(entry.filename)
+            content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            yield SimpleUploadedFile(name, content, content_type=content_type)
+
+
+class _ZipStream(io.RawIOBase):
+    """Write-only, non-seekable buffer that zipfile writes into while streaming."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_results_zip(tasks):
+    """
+    Yield a zip archive of completed task results chunk by chunk.
+
+    Result files are copied from storage in chunks and never fully buffered,
+    so archive size does not affect web worker memory. Entries are stored
+    uncompressed because the images are already compressed.
+    """
+    stream = _ZipStream()
+    used_names = set()
+
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for task in tasks:
+            storage_name = storage_name_from_url(task.result_url)
+            stem = os.path.splitext(task.source_name or task.task_id)[0]
+            extension = os.path.splitext(storage_name)[1]
+
+            arcname = f'{stem}{extension}'
+            if arcname in used_names:
+                arcname = f'{stem}-{task.task_id[:8]}{extension}'
+            used_names.add(arcname)
+
+            with (
+                default_storage.open(storage_name, 'rb') as source,
+                archive.open(arcname, 'w', force_zip64=True) as destination,
+            ):
+                for chunk in source.chunks():
+                    destination.write(chunk)
+                    yield stream.drain()
+
+            yield stream.drain()
+
+    yield stream.drain()
@@ -0,0 +1,180 @@
+import logging
+import time
+import traceback
+from collections import defaultdict
+
+import numpy as np
+from PIL import Image
+from rembg.bg import fix_image_orientation, naive_cutout
+
+from processor.metrics import observe_stage
+from processor.models import ProcessingTask
+from processor.result_cache import store_cached_result
+from processor.sessions import get_session
+from processor.staging import discard_staged, open_staged_image
+
+logger = logging.getLogger(__name__)
+
+# (mean, std, input size) used by rembg to normalize inputs for each model
+MODEL_NORMALIZATION = {
+    'u2net': ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    'u2netp': ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    'silueta': ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    'isnet-general-use': ((0.5, 0.5, 0.5), (1.0, 1.0, 1.0), (1024, 1024)),
+}
+
+
+def predict_masks(session, images: list[Image.Image]) -> list[Image.Image]:
+    """
+    Run segmentation for several images in a single ONNX Runtime call.
+
+    Mirrors rembg's per-image pre/post-processing, but stacks the normalized
+    inputs along the batch axis. Models exported with a fixed batch size of 1
+    fall back to one run per image.
+    """
+    if session.model_name not in MODEL_NORMALIZATION:
+        raise ValueError(f'Batched inference is not supported for {session.model_name}')
+
+    mean, std, size = MODEL_NORMALIZATION[session.model_name]
+    model_input = session.inner_session.get_inputs()[0]
+    feeds = [
+        session.normalize(image, mean, std, size)[model_input.name] for image in images
+    ]
+
+    if model_input.shape[0] == 1:
+        outputs = [
+            session.inner_session.run(None, {model_input.name: feed})[0]
+            for feed in feeds
+        ]
+        predictions = np.concatenate(outputs)
+    else:
+        predictions = session.inner_session.run(
+            None, {model_input.name: np.concatenate(feeds)}
+        )[0]
+
+    masks = []
+    for image, prediction in zip(images, predictions[:, 0, :, :], strict=True):
+        lowest, highest = np.min(prediction), np.max(prediction)
+        prediction = (prediction - lowest) / max(highest - lowest, 1e-6)
+        mask = Image.fromarray((prediction.clip(0, 1) * 255).astype('uint8'))
+        masks.append(mask.resize(image.size, Image.Resampling.LANCZOS))
+
+    return masks
+
+
+def collect_batch(queue, max_size: int, max_wait_ms: int, idle_timeout: float = 1.0):
+    """
+    Pull up to ``max_size`` messages from a kombu SimpleQueue.
+
+    Waits up to ``idle_timeout`` seconds for the first message, then at most
+    ``max_wait_ms`` for the batch to fill. Returns an empty list when idle.
+    """
+    try:
+        messages = [queue.get(block=True, timeout=idle_timeout)]
+    except queue.Empty:
+        return []
+
+    deadline = time.monotonic() + max_wait_ms / 1000
+    while len(messages) < max_size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            messages.append(queue.get(block=True, timeout=remaining))
+        except queue.Empty:
+            break
+
+    return messages
+
+
+def job_from_message(message) -> tuple[str, str, str | None]:
+    """Extract ``(input_key, task_id, model_name)`` from a process_image_task message."""
+    args = message.decode()[0]
+    model_name = args[2] if len(args) > 2 else None
+    return args[0], args[1], model_name
+
+
+def process_batch(jobs: list[tuple[str, str, str | None]]) -> int:
+    """
+    Process staged inputs with one batched inference run per model.
+
+    Decode or storage errors only fail the affected task; an inference error
+    fails every task sharing that run. Returns the number of completed tasks.
+    """
+    jobs_by_model = defaultdict(list)
+    for input_key, task_id, model_name in jobs:
+        jobs_by_model[model_name].append((input_key, task_id))
+
+    return sum(
+        _process_model_batch(model_jobs, model_name)
+        for model_name, model_jobs in jobs_by_model.items()
+    )
+
+
+def _process_model_batch(jobs: list[tuple[str, str]], model_name: str | None) -> int:
+    from processor.tasks import save_result_image
+
+    records = ProcessingTask.objects.in_bulk(
+        [task_id for _, task_id in jobs], field_name='task_id'
+    )
+    loaded = []
+
+    for input_key, task_id in jobs:
+        task_record = records.get(task_id)
+        if task_record is None:
+            logger.error('ProcessingTask not found', extra={'task_id': task_id})
+            discard_staged(input_key)
+            continue
+
+        task_record.mark_processing()
+        try:
+            image = fix_image_orientation(open_staged_image(input_key))
+        except Exception as exc:
+            _fail(task_record, input_key, exc)
+            continue
+        loaded.append((input_key, task_record, image))
+
+    if not loaded:
+        return 0
+
+    try:
+        session = get_session(model_name)
+        with observe_stage('batch_inference'):
+            masks = predict_masks(session, [image for _, _, image in loaded])
+    except Exception as exc:
+        for input_key, task_record, _ in loaded:
+            _fail(task_record, input_key, exc)
+        return 0
+
+    completed = 0
+    for (input_key, task_record, image), mask in zip(loaded, masks, strict=True):
+        try:
+            result_url = save_result_image(task_record, naive_cutout(image, mask))
+        except Exception as exc:
+            _fail(task_record, input_key, exc)
+            continue
+        # Cache first: completing releases the in-flight marker for the same input
+        store_cached_result(task_record.content_hash, result_url)
+        task_record.mark_completed(result_url)
+        discard_staged(input_key)
+        completed += 1
+
+    logger.info(
+        'Batch processed',
+        extra={'model': model_name, 'batch_size': len(jobs), 'completed': completed},
+    )
+    return completed
+
+
+def _fail(task_record, input_key, exc):
+    logger.error(
+        'Image processing failed',
+        extra={
+            'task_id': task_record.task_id,
+            'error_type': type(exc).__name__,
+            'error_message': str(exc),
+        },
+        exc_info=exc,
+    )
+    task_record.mark_failed(f'{type(exc).__name__}: {exc!s}\n{traceback.format_exc()}')
+    discard_staged(input_key)
@@ -0,0 +1,159 @@
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from processor.models import ProcessingBatch, ProcessingTask
+from processor.profiling import profile_name
+from processor.result_cache import evict_stale_entries, referenced_result_urls
+from processor.storage import delete_stored_files, storage_name_from_url
+from processor.task_state import get_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_WORKERS = 8
+LOCK_KEY = 'processor:cleanup:lock'
+
+
+@contextmanager
+def cleanup_lock(ttl: int):
+    """
+    Hold the cleanup lock in the hot state store for at most ``ttl`` seconds.
+
+    Yields whether it was acquired: every worker instance may run beat, and
+    only one of their scheduled runs should clean up at a time. Without a
+    store the lock is always acquired; if the store is unreachable it is not.
+    """
+    store = get_store()
+    if store is None:
+        yield True
+        return
+
+    token = uuid.uuid4().hex
+    try:
+        acquired = store.add(LOCK_KEY, token, ttl)
+    except Exception:
+        logger.warning('Failed to take the cleanup lock', exc_info=True)
+        acquired = False
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                store.delete_if_equal(LOCK_KEY, token)
+            except Exception:
+                logger.warning('Failed to release the cleanup lock', exc_info=True)
+
+
+def cleanup_old_tasks(
+    cutoff_time,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = DEFAULT_WORKERS,
+    max_rows: int | None = None,
+    time_budget: float | None = None,
+) -> dict:
+    """
+    Delete tasks created before ``cutoff_time`` with their files, chunk by chunk.
+
+    Tasks are paged by primary key, so each chunk is one indexed range read,
+    a bounded number of storage deletes and one short DELETE statement; no
+    lock is held across the whole backlog. Result files are only deleted
+    when no surviving task or cache entry still points to them. Stale cache
+    entries are evicted first, in chunks of the same size, and their files
+    handled the same way.
+
+    ``max_rows`` (tasks and cache entries together) and ``time_budget``
+    (seconds) stop the run after the chunk that reaches them;
+    ``stats['complete']`` tells whether the backlog was drained, otherwise
+    the next run continues where this one stopped.
+    """
+    start = time.perf_counter()
+    stats = {
+        'tasks': 0,
+        'files': 0,
+        'inputs': 0,
+        'kept': 0,
+        'evicted': 0,
+        'batches': 0,
+        'complete': False,
+    }
+
+    def chunk_limit():
+        """Rows the next chunk may delete; 0 once a budget is spent."""
+        if time_budget is not None and time.perf_counter() - start >= time_budget:
+            return 0
+        if max_rows is None:
+            return chunk_size
+        return min(chunk_size, max_rows - stats['tasks'] - stats['evicted'])
+
+    old_tasks = ProcessingTask.objects.filter(created_at__lt=cutoff_time)
+
+    while (limit := chunk_limit()) > 0:
+        evicted_urls = evict_stale_entries(limit=limit)
+        stats['evicted'] += len(evicted_urls)
+        _delete_results(evicted_urls, old_tasks, workers, stats)
+        if len(evicted_urls) < limit:
+            break
+
+    last_pk = 0
+    while (limit := chunk_limit()) > 0:
+        chunk = list(
+            old_tasks.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', 'input_key', 'result_url', 'task_id')[:limit]
+        )
+        if not chunk:
+            stats['complete'] = True
+            break
+        last_pk = chunk[-1][0]
+
+        # Staged inputs normally go away when the task finishes; this
+        # catches tasks that never reached a terminal state.
+        stats['inputs'] += delete_stored_files(
+            (input_key for _, input_key, _, _ in chunk), workers
+        )
+        if settings.TASK_PROFILE_SAMPLE_RATE:
+            delete_stored_files(
+                (profile_name(task_id) for _, _, _, task_id in chunk), workers
+            )
+        _delete_results(
+            [result_url for _, _, result_url, _ in chunk if result_url],
+            old_tasks,
+            workers,
+            stats,
+        )
+
+        deleted, _ = ProcessingTask.objects.filter(
+            pk__in=[pk for pk, _, _, _ in chunk]
+        ).delete()
+        stats['tasks'] += deleted
+
+    stats['batches'], _ = ProcessingBatch.objects.filter(
+        created_at__lt=cutoff_time, tasks__isnull=True
+    ).delete()
+
+    stats['seconds'] = time.perf_counter() - start
+    logger.info('Old tasks cleaned up', extra=stats)
+    return stats
+
+
+def _delete_results(result_urls, old_tasks, workers, stats):
+    """
+    Delete result files no longer referenced outside ``old_tasks``.
+
+    Cache hits share result files, so a URL can appear in several chunks;
+    references from other tasks being cleaned up do not keep a file alive.
+    """
+    candidate_urls = set(result_urls)
+    if not candidate_urls:
+        return
+
+    referenced_urls = referenced_result_urls(candidate_urls, excluding_tasks=old_tasks)
+    stats['kept'] += len(referenced_urls)
+    stats['files'] += delete_stored_files(
+        (storage_name_from_url(url) for url in candidate_urls - referenced_urls),
+        workers,
+    )
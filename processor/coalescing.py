@@ -0,0 +1,67 @@
+"""
+Single-flight coalescing of identical uploads.
+
+The first upload of a content hash claims an in-flight marker in the hot
+state store and is processed as usual (the leader). Identical uploads that
+arrive while the marker exists are stored as followers of the leader and
+never enqueued; the leader copies its outcome to them when it finishes (see
+ProcessingTask.mark_completed). The marker expires after COALESCE_TTL
+seconds, so a leader lost with its worker only captures uploads for that long.
+"""
+
+import logging
+
+from django.conf import settings
+
+from processor.task_state import get_store
+
+logger = logging.getLogger(__name__)
+
+
+def marker_key(content_hash: str) -> str:
+    return f'processor:inflight:{content_hash}'
+
+
+def claim(content_hash: str, task_id: str) -> str | None:
+    """
+    Make ``task_id`` the in-flight job for ``content_hash``.
+
+    Returns the task id of the leader already processing the same input, in
+    which case the new task must not be enqueued, or None if ``task_id``
+    leads (also when coalescing is disabled or the store is unreachable).
+    """
+    store = get_store()
+    if not settings.COALESCE_UPLOADS or store is None or not content_hash:
+        return None
+
+    key = marker_key(content_hash)
+    try:
+        for _ in range(2):  # Once more if the marker expires in between
+            if store.add(key, task_id, settings.COALESCE_TTL):
+                return None
+            (leader,) = store.get_many([key])
+            if leader is not None:
+                return leader
+    except Exception:
+        logger.warning(
+            'Failed to claim in-flight marker',
+            extra={'task_id': task_id},
+            exc_info=True,
+        )
+    return None
+
+
+def release(content_hash: str, task_id: str) -> None:
+    """Drop the marker if ``task_id`` still holds it (best effort)."""
+    store = get_store()
+    if not settings.COALESCE_UPLOADS or store is None or not content_hash:
+        return
+
+    try:
+        store.delete_if_equal(marker_key(content_hash), task_id)
+    except Exception:
+        logger.warning(
+            'Failed to release in-flight marker',
+            extra={'task_id': task_id},
+            exc_info=True,
+        )
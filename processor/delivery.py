@@ -0,0 +1,210 @@
+"""
+Delivery of result files to clients.
+
+Tasks store a stable URL for their result (ProcessingTask.result_url); clients
+get it through delivery_url(). With GCS and RESULT_SIGNED_URL_TTL set, that is
+a short-lived V4 signed URL, so the bucket can stay private and downloads go
+straight to GCS; each URL is reused for half its TTL, so polling clients do
+not cost a signature (an IAM API call without a private key) per poll. With
+local storage, results are served by serve_result(): handed off to nginx with
+X-Accel-Redirect when RESULT_ACCEL_REDIRECT is set, otherwise sent by the WSGI
+server's file wrapper (sendfile under gunicorn), with single byte ranges
+streamed in chunks. Result names are unique per task, so every response
+carries RESULT_CACHE_CONTROL.
+"""
+
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from processor.storage import is_gcs_storage, storage_name_from_url
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = 'processed'
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Signed URLs by (ttl, name) with the time until which they are handed out
+SIGNED_URL_CACHE_SIZE = 1024
+_signed_urls = {}
+_signing_storages = {}
+_signing_lock = threading.Lock()
+
+
+def delivery_url(result_url: str) -> str:
+    """URL clients should download ``result_url`` from."""
+    if not result_url or not settings.RESULT_SIGNED_URL_TTL:
+        return result_url
+    if not is_gcs_storage(default_storage):
+        return result_url
+
+    try:
+        return _signed_url(storage_name_from_url(result_url))
+    except Exception:
+        logger.warning(
+            'Failed to sign result URL', extra={'result_url': result_url}, exc_info=True
+        )
+        return result_url
+
+
+def with_delivery_url(payload: dict) -> dict:
+    """Copy of a status payload with its result URL ready for the client."""
+    if not payload.get('result_url'):
+        return payload
+    return {**payload, 'result_url': delivery_url(payload['result_url'])}
+
+
+def _signed_url(name: str) -> str:
+    """
+    Signed URL for ``name``, reused for half its TTL so every client still
+    gets at least half the TTL to start the download.
+    """
+    ttl = settings.RESULT_SIGNED_URL_TTL
+    key = (ttl, name)
+    now = time.monotonic()
+    with _signing_lock:
+        cached = _signed_urls.get(key)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    url = _signing_storage().url(name)
+    with _signing_lock:
+        _signed_urls.pop(key, None)
+        _signed_urls[key] = (url, now + ttl / 2)
+        while len(_signed_urls) > SIGNED_URL_CACHE_SIZE:
+            del _signed_urls[next(iter(_signed_urls))]  # Oldest first
+    return url
+
+
+def _signing_storage():
+    """GCS storage like the default one, but returning signed URLs."""
+    ttl = settings.RESULT_SIGNED_URL_TTL
+    with _signing_lock:
+        storage = _signing_storages.get(ttl)
+        if storage is None:
+            from storages.backends.gcloud import GoogleCloudStorage
+
+            storage = GoogleCloudStorage(
+                querystring_auth=True, expiration=timedelta(seconds=ttl)
+            )
+            _signing_storages[ttl] = storage
+        return storage
+
+
+def serve_result(request, name: str):
+    """
+    Response for the local result file ``processed/<name>``.
+
+    Supports conditional requests (ETag/Last-Modified) and a single byte range;
+    raises Http404 for missing files and names outside the results directory.
+    """
+    if not isinstance(default_storage, FileSystemStorage):
+        raise Http404('Results are not stored locally')
+
+    storage_name = posixpath.normpath(f'{RESULTS_DIR}/{name}')
+    if not storage_name.startswith(f'{RESULTS_DIR}/'):  # Staged inputs stay private
+        raise Http404('Result not found')
+    try:
+        path = default_storage.path(storage_name)
+        stat = os.stat(path)
+    except (SuspiciousFileOperation, OSError) as exc:
+        raise Http404('Result not found') from exc
+    if not os.path.isfile(path):
+        raise Http404('Result not found')
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        if settings.RESULT_ACCEL_REDIRECT:
+            # nginx serves the file (ranges included) from its internal location
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = settings.RESULT_ACCEL_REDIRECT + quote(
+                storage_name
+            )
+        else:
+            response = _file_response(request, path, stat.st_size, etag, content_type)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = settings.RESULT_CACHE_CONTROL
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _file_response(request, path, size, etag, content_type):
+    byte_range = _requested_range(request, size, etag)
+    if byte_range is None:
+        return FileResponse(open(path, 'rb'), content_type=content_type)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _read_range(path, start, end), status=206, content_type=content_type
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(end - start + 1)
+    return response
+
+
+def _requested_range(request, size, etag):
+    """
+    ``(start, end)`` of a satisfiable single range, False for an unsatisfiable
+    one, or None to send the whole file (no, invalid, multiple or stale ranges).
+    """
+    header = request.headers.get('Range', '')
+    if_range = request.headers.get('If-Range')
+    if not header or (if_range is not None and if_range != etag):
+        return None
+
+    match = RANGE_RE.match(header.strip())
+    if match is None or match.group(1) == match.group(2) == '':
+        return None
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        start, end = max(size - int(last), 0), size - 1
+        if int(last) == 0:
+            return False
+
+    if start >= size:
+        return False
+    return start, end
+
+
+def _read_range(path, start, end, chunk_size=64 * 1024):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(chunk_size, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
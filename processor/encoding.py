@@ -0,0 +1,83 @@
+from io import BytesIO
+
+from PIL import Image, features
+
+# Output format -> (Pillow format name, file extension, Pillow feature to check)
+OUTPUT_FORMATS = {
+    'png': ('PNG', '.png', None),
+    'webp': ('WEBP', '.webp', 'webp'),
+    'avif': ('AVIF', '.avif', 'avif'),
+}
+
+# Encoder options accepted per format
+ENCODER_OPTIONS = {
+    'png': ('compress_level', 'optimize'),
+    'webp': ('quality', 'lossless'),
+    'avif': ('quality',),
+}
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def available_formats() -> list[str]:
+    """Output formats supported by the installed Pillow build."""
+    available = []
+    for name, (_, _, feature) in OUTPUT_FORMATS.items():
+        try:
+            if feature is None or features.check(feature):
+                available.append(name)
+        except ValueError:  # Pillow too old to know the feature
+            continue
+    return available
+
+
+def parse_output_options(data) -> dict:
+    """
+    Validate output options from request data (a QueryDict or dict).
+
+    Returns ``{'format': str, 'mask_only': bool, 'encoder': dict}`` where
+    ``encoder`` only contains the options that apply to the chosen format.
+    Raises ValueError with a user-facing message on invalid input.
+    """
+    output_format = (data.get('format') or 'png').lower()
+    if output_format not in available_formats():
+        allowed = ', '.join(available_formats())
+        raise ValueError(f'Unsupported output format. Allowed formats: {allowed}')
+
+    encoder = {}
+    for option in ENCODER_OPTIONS[output_format]:
+        value = data.get(option)
+        if value in (None, ''):
+            continue
+        if option in ('lossless', 'optimize'):
+            encoder[option] = str(value).lower() in TRUE_VALUES
+        else:
+            encoder[option] = _parse_int(option, value)
+
+    if 'quality' in encoder and not 1 <= encoder['quality'] <= 100:
+        raise ValueError('quality must be between 1 and 100')
+    if 'compress_level' in encoder and not 0 <= encoder['compress_level'] <= 9:
+        raise ValueError('compress_level must be between 0 and 9')
+
+    return {
+        'format': output_format,
+        'mask_only': str(data.get('mask_only', '')).lower() in TRUE_VALUES,
+        'encoder': encoder,
+    }
+
+
+def _parse_int(option, value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{option} must be an integer')
+
+
+def encode_image(
+    image: Image.Image, output_format: str = 'png', encoder_options=None
+) -> tuple[bytes, str]:
+    """Encode an image, returning its bytes and file extension."""
+    pillow_format, extension, _ = OUTPUT_FORMATS[output_format]
+    output_buffer = BytesIO()
+    image.save(output_buffer, format=pillow_format, **(encoder_options or {}))
+    return output_buffer.getvalue(), extension
@@ -0,0 +1,113 @@
+import json
+import logging
+import queue
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from processor.backends import get_backend
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('completed', 'failed')
+
+
+def channel_name(task_id: str) -> str:
+    return f'processor:task:{task_id}'
+
+
+class InProcessBroker:
+    """Pub/sub within one process (TASK_EVENTS_URL is not a Redis URL)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    @contextmanager
+    def subscribe(self, channel):
+        messages = queue.Queue()
+        with self._lock:
+            self._subscribers[channel].add(messages)
+
+        def receive(timeout):
+            try:
+                return messages.get(timeout=timeout)
+            except queue.Empty:
+                return None
+
+        try:
+            yield receive
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(messages)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+
+class RedisBroker:
+    def __init__(self, client):
+        self._client = client
+
+    def publish(self, channel, message):
+        self._client.publish(channel, message)
+
+    @contextmanager
+    def subscribe(self, channel):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(channel)
+
+        def receive(timeout):
+            message = pubsub.get_message(timeout=timeout)
+            return message['data'] if message else None
+
+        try:
+            yield receive
+        finally:
+            pubsub.close()
+
+
+def get_broker():
+    """Return the pub/sub backend for TASK_EVENTS_URL (one per URL and process)."""
+    return get_backend(settings.TASK_EVENTS_URL, RedisBroker, InProcessBroker)
+
+
+def publish_task_status(task_id: str, payload: dict) -> None:
+    """
+    Announce a task state transition to any listening status streams.
+
+    Publishing is best effort: a broker outage must never fail the task.
+    """
+    try:
+        get_broker().publish(channel_name(task_id), json.dumps(payload))
+    except Exception:
+        logger.warning(
+            'Failed to publish task status',
+            extra={'task_id': task_id, 'status': payload.get('status')},
+            exc_info=True,
+        )
+
+
+@contextmanager
+def subscribe_task(task_id: str):
+    """
+    Subscribe to a task's transitions.
+
+    Yields ``receive(timeout)``, which returns the next status payload or None
+    if nothing arrived in time. Subscribe before reading the current state
+    from the database so no transition is missed in between.
+    """
+    with get_broker().subscribe(channel_name(task_id)) as receive:
+
+        def receive_payload(timeout):
+            message = receive(timeout)
+            return json.loads(message) if message is not None else None
+
+        yield receive_payload
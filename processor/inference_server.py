@@ -0,0 +1,196 @@
+"""
+Out-of-process inference shared by all worker children.
+
+With INFERENCE_SERVER_ADDRESS set, one server process holds the model
+sessions and Celery children only decode, encode and store images. A child
+copies the decoded RGB pixels into a ``multiprocessing.shared_memory`` block
+sized for the RGBA result, sends the block name over a Unix socket and reads
+the cutout back from the same block once the server replies; pixel data never
+goes through a pipe or pickle. Memory therefore grows by one small
+interpreter per extra child instead of one model copy per child.
+"""
+
+import logging
+import os
+import threading
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client, Listener
+from multiprocessing.shared_memory import SharedMemory
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = 30  # Seconds to wait for the server when a worker starts
+SHARED_MEMORY_PATH = '/dev/shm'
+
+
+def _authkey() -> bytes:
+    return settings.SECRET_KEY.encode()
+
+
+def serve(address: str | None = None, ready: threading.Event | None = None):
+    """
+    Run the inference server until the process exits.
+
+    Every worker child gets its own connection and handler thread;
+    onnxruntime releases the GIL while running, so requests from different
+    children run concurrently on the shared sessions.
+    """
+    address = address or settings.INFERENCE_SERVER_ADDRESS
+    if os.path.exists(address):
+        os.unlink(address)  # Stale socket from a previous run
+
+    with Listener(address, family='AF_UNIX', authkey=_authkey()) as listener:
+        logger.info('Inference server listening', extra={'address': address})
+        if ready is not None:
+            ready.set()
+        while True:
+            try:
+                connection = listener.accept()
+            except OSError:
+                logger.warning('Rejected inference connection', exc_info=True)
+                continue
+            threading.Thread(target=_handle, args=(connection,), daemon=True).start()
+
+
+def run_server():
+    """Entry point for a spawned server process."""
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'remove_bg.settings')
+    django.setup()
+    serve()
+
+
+def _handle(connection):
+    with connection:
+        while True:
+            try:
+                request = connection.recv()
+            except EOFError:
+                return
+
+            try:
+                _run_request(request)
+            except Exception as exc:
+                logger.exception('Remote inference failed')
+                connection.send({'error': f'{type(exc).__name__}: {exc}'})
+            else:
+                connection.send({'ok': True})
+
+
+def _run_request(request):
+    """Read RGB pixels from the request's block and write the RGBA cutout back."""
+    from processor.imaging import remove_background
+    from processor.sessions import get_session
+
+    width, height = request['size']
+    block = _attach(request['shm'], request['pid'])
+    try:
+        image = Image.frombytes(
+            'RGB', (width, height), bytes(block.buf[: 3 * width * height])
+        )
+        output = remove_background(
+            image, get_session(request['model']), request['mode']
+        )
+        block.buf[: 4 * width * height] = output.convert('RGBA').tobytes()
+    finally:
+        block.close()
+
+
+def _attach(name: str, owner_pid: int) -> SharedMemory:
+    block = SharedMemory(name=name)
+    if owner_pid != os.getpid():
+        # The client owns and unlinks the block; before Python 3.13 attaching
+        # also registers it with this process's resource tracker, which would
+        # unlink it again (with a warning) when the server exits.
+        resource_tracker.unregister(block._name, 'shared_memory')
+    return block
+
+
+class InferenceClient:
+    """Per-process connection to the inference server (thread-safe)."""
+
+    def __init__(self, address: str):
+        self.address = address
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while True:
+            try:
+                return Client(self.address, family='AF_UNIX', authkey=_authkey())
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.2)  # Server still starting
+
+    def remove_background(self, image: Image.Image, model_name, mode=None):
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        width, height = image.size
+
+        block = SharedMemory(create=True, size=4 * width * height)
+        try:
+            block.buf[: 3 * width * height] = image.tobytes()
+            request = {
+                'shm': block.name,
+                'pid': os.getpid(),
+                'size': (width, height),
+                'model': model_name,
+                'mode': mode,
+            }
+
+            with self._lock:
+                if self._connection is None:
+                    self._connection = self._connect()
+                try:
+                    self._connection.send(request)
+                    response = self._connection.recv()
+                except (EOFError, OSError):
+                    self._connection = None  # Reconnect on the next request
+                    raise
+
+            if 'error' in response:
+                raise RuntimeError(f'Inference server error: {response["error"]}')
+            return Image.frombytes(
+                'RGBA', (width, height), bytes(block.buf[: 4 * width * height])
+            )
+        finally:
+            block.close()
+            block.unlink()
+
+
+def fits_shared_memory(image: Image.Image) -> bool:
+    """
+    Whether the RGBA block for ``image`` fits in the free shared memory.
+
+    Blocks are sparse files in /dev/shm, which Docker caps at 64MB by
+    default; touching pages beyond the cap kills the process with SIGBUS
+    rather than raising, so oversized images must not be sent at all.
+    """
+    try:
+        stats = os.statvfs(SHARED_MEMORY_PATH)
+    except OSError:
+        return True  # No tmpfs to check (e.g. macOS)
+    width, height = image.size
+    return 4 * width * height <= stats.f_bavail * stats.f_frsize
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def remote_remove_background(image: Image.Image, model_name=None, mode=None):
+    """Run remove_background in the inference server process."""
+    address = settings.INFERENCE_SERVER_ADDRESS
+    with _clients_lock:
+        # Keyed by pid too: a forked child must not share its parent's socket
+        key = (address, os.getpid())
+        if key not in _clients:
+            _clients[key] = InferenceClient(address)
+        client = _clients[key]
+    return client.remove_background(image, model_name, mode)
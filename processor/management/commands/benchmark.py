@@ -0,0 +1,158 @@
+import json
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from benchmarks.common import emit
+from benchmarks.pipeline import FORMATS, SIZES, build_corpus, compare, environment, run
+
+
+def parse_size(value):
+    width, _, height = value.lower().partition('x')
+    try:
+        return int(width), int(height)
+    except ValueError:
+        raise CommandError(f'Invalid size "{value}", expected WIDTHxHEIGHT') from None
+
+
+def without_commit(environment):
+    return {key: value for key, value in environment.items() if key != 'commit'}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the image processing pipeline and check for regressions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            default=[f'{width}x{height}' for width, height in SIZES],
+            help='Input sizes as WIDTHxHEIGHT (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--formats',
+            nargs='+',
+            default=list(FORMATS),
+            choices=FORMATS,
+            help='Input formats (default: all)',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5, help='Measured runs per input (default: 5)'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=1,
+            help='Unmeasured runs per input, e.g. to load the model (default: 1)',
+        )
+        parser.add_argument(
+            '--model', default=None, help='Model (default: REMBG_MODEL)'
+        )
+        parser.add_argument(
+            '--no-inference',
+            action='store_true',
+            help='Skip the model and measure the rest of the pipeline',
+        )
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument(
+            '--baseline', help='JSON report of a previous run to compare against'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Fail when a metric is worse than the baseline by more than '
+            'this fraction (default: 0.2)',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            baseline = json.loads(Path(options['baseline']).read_text())
+
+        corpus = build_corpus(
+            [parse_size(size) for size in options['sizes']], options['formats']
+        )
+        inference = not options['no_inference']
+
+        with isolated_environment():
+            results = run(
+                corpus,
+                repeat=options['repeat'],
+                warmup=options['warmup'],
+                model_name=options['model'],
+                inference=inference,
+            )
+
+        report = {
+            'environment': environment(options['model'], inference),
+            'results': results,
+        }
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2))
+        emit(results, as_json=False)
+
+        if baseline is None:
+            return
+
+        regressions = compare(results, baseline['results'], options['threshold'])
+        if without_commit(baseline['environment']) != without_commit(
+            report['environment']
+        ):
+            self.stdout.write(
+                self.style.WARNING('Baseline was recorded in a different environment')
+            )
+        for regression in regressions:
+            self.stdout.write(
+                self.style.ERROR(
+                    f'{regression["case"]} {regression["stage"]} {regression["metric"]}: '
+                    f'{regression["baseline"]} -> {regression["current"]} '
+                    f'({regression["change"]:+.0%})'
+                )
+            )
+        if regressions:
+            raise CommandError(
+                f'{len(regressions)} metric(s) regressed by more than '
+                f'{options["threshold"]:.0%}'
+            )
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+
+@contextmanager
+def isolated_environment():
+    """
+    Throwaway database and media directory, with hot state and admission
+    bookkeeping kept in memory, so benchmarks never touch real data.
+    """
+    media_root = tempfile.mkdtemp(prefix='benchmark-media-')
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+        # A file, not the default in-memory database, to include disk writes
+        test_settings['NAME'] = str(Path(media_root) / 'benchmark.sqlite3')
+
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        with override_settings(
+            MEDIA_ROOT=media_root,
+            TASK_STATE_URL='',
+            TASK_EVENTS_URL='memory://',
+            ADMISSION_URL='',
+            INFERENCE_SERVER_ADDRESS='',
+            RESULT_CACHE_ENABLED=False,
+            STORAGES={
+                **settings.STORAGES,
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            },
+        ):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(media_root, ignore_errors=True)
@@ -1,11 +1,11 @@
-import os
 from datetime import timedelta
 
-from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from processor.cleanup import DEFAULT_CHUNK_SIZE, DEFAULT_WORKERS, cleanup_old_tasks
 from processor.models import ProcessingTask
+from processor.result_cache import evict_stale_entries
 
 
 class Command(BaseCommand):
@@ -23,64 +23,105 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be deleted without actually deleting',
         )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Tasks deleted per batch (default: {DEFAULT_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--max-rows',
+            type=int,
+            default=None,
+            help='Stop after deleting this many tasks (default: no limit)',
+        )
+        parser.add_argument(
+            '--time-budget',
+            type=float,
+            default=None,
+            help='Stop starting new chunks after this many seconds',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=DEFAULT_WORKERS,
+            help=f'Parallel file deletes (default: {DEFAULT_WORKERS})',
+        )
 
     def handle(self, *args, **options):
         hours = options['hours']
-        dry_run = options['dry_run']
-
         cutoff_time = timezone.now() - timedelta(hours=hours)
 
-        old_tasks = ProcessingTask.objects.filter(created_at__lt=cutoff_time)
-        task_count = old_tasks.count()
+        if options['dry_run']:
+            self._dry_run(cutoff_time, hours)
+            return
 
-        if task_count == 0:
+        stats = cleanup_old_tasks(
+            cutoff_time,
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            max_rows=options['max_rows'],
+            time_budget=options['time_budget'],
+        )
+
+        if stats['tasks'] == 0 and stats['evicted'] == 0:
             self.stdout.write(
                 self.style.SUCCESS(f'No tasks older than {hours} hour(s) found.')
             )
             return
 
-        if dry_run:
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully deleted {stats["tasks"]} task(s) and '
+                f'{stats["files"]} file(s)'
+            )
+        )
+
+        seconds = max(stats['seconds'], 1e-6)
+        self.stdout.write(
+            f'Took {stats["seconds"]:.2f}s '
+            f'({stats["tasks"] / seconds:.0f} tasks/s, '
+            f'{(stats["files"] + stats["inputs"]) / seconds:.0f} files/s)'
+        )
+
+        if not stats['complete']:
             self.stdout.write(
                 self.style.WARNING(
-                    f'[DRY RUN] Would delete {task_count} task(s) older than {hours} hour(s)'
+                    'Stopped at the row or time budget; rerun to continue'
                 )
             )
-            for task in old_tasks[:10]:
-                self.stdout.write(f'  - {task.task_id[:8]} ({task.status})')
-            if task_count > 10:
-                self.stdout.write(f'  ... and {task_count - 10} more')
-            return
 
-        files_deleted = 0
-        files_not_found = 0
+        if stats['evicted']:
+            self.stdout.write(f'Evicted {stats["evicted"]} cached result(s)')
 
-        for task in old_tasks:
-            if task.result_url:
-                file_path = os.path.join(
-                    settings.MEDIA_ROOT,
-                    task.result_url.replace(settings.MEDIA_URL, '', 1),
-                )
+        if stats['kept']:
+            self.stdout.write(f'Kept {stats["kept"]} file(s) still referenced')
 
-                if os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                        files_deleted += 1
-                    except OSError as e:
-                        self.stdout.write(
-                            self.style.ERROR(f'Error deleting {file_path}: {e}')
-                        )
-                else:
-                    files_not_found += 1
+        if stats['inputs']:
+            self.stdout.write(f'Discarded {stats["inputs"]} staged input(s)')
 
-        old_tasks.delete()
+        if stats['batches']:
+            self.stdout.write(f'Deleted {stats["batches"]} empty batch(es)')
 
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'Successfully deleted {task_count} task(s) and {files_deleted} file(s)'
-            )
-        )
+    def _dry_run(self, cutoff_time, hours):
+        old_tasks = ProcessingTask.objects.filter(created_at__lt=cutoff_time)
+        task_count = old_tasks.count()
+        evicted_urls = evict_stale_entries(dry_run=True)
 
-        if files_not_found > 0:
+        if task_count == 0 and not evicted_urls:
             self.stdout.write(
-                self.style.WARNING(f'{files_not_found} file(s) were already missing')
+                self.style.SUCCESS(f'No tasks older than {hours} hour(s) found.')
             )
+            return
+
+        self.stdout.write(
+            self.style.WARNING(
+                f'[DRY RUN] Would delete {task_count} task(s) older than {hours} hour(s)'
+            )
+        )
+        for task in old_tasks.order_by('pk')[:10]:
+            self.stdout.write(f'  - {task.task_id[:8]} ({task.status})')
+        if task_count > 10:
+            self.stdout.write(f'  ... and {task_count - 10} more')
+        if evicted_urls:
+            self.stdout.write(f'Would evict {len(evicted_urls)} cached result(s)')
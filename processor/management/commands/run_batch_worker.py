@@ -0,0 +1,64 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from processor.batching import collect_batch, job_from_message, process_batch
+
+
+class Command(BaseCommand):
+    help = 'Consume the batch queue and run background removal in batched ONNX calls'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.INFERENCE_BATCH_SIZE,
+            help='Maximum images per inference run (default: INFERENCE_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--max-wait-ms',
+            type=int,
+            default=settings.INFERENCE_BATCH_MAX_WAIT_MS,
+            help='How long to wait for a batch to fill (default: INFERENCE_BATCH_MAX_WAIT_MS)',
+        )
+        parser.add_argument(
+            '--queue',
+            default=settings.INFERENCE_BATCH_QUEUE,
+            help='Queue to consume (default: INFERENCE_BATCH_QUEUE)',
+        )
+
+    def handle(self, *args, **options):
+        from remove_bg.celery import app
+
+        batch_size = options['batch_size']
+        max_wait_ms = options['max_wait_ms']
+
+        self.stdout.write(
+            f'Consuming "{options["queue"]}" '
+            f'(batch size {batch_size}, max wait {max_wait_ms}ms)'
+        )
+
+        with (
+            app.connection_for_read() as connection,
+            connection.SimpleQueue(options['queue']) as queue,
+        ):
+            queue.consumer.qos(prefetch_count=batch_size)
+
+            while True:
+                messages = collect_batch(queue, batch_size, max_wait_ms)
+                if not messages:
+                    continue
+
+                start = time.perf_counter()
+                completed = process_batch(
+                    [job_from_message(message) for message in messages]
+                )
+                for message in messages:
+                    message.ack()
+
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f'Processed {len(messages)} image(s), {completed} completed, '
+                    f'in {elapsed * 1000:.0f}ms ({len(messages) / elapsed:.1f} images/s)'
+                )
@@ -0,0 +1,124 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Gunicorn and Celery prefork record metrics in several processes. Set
+# PROMETHEUS_MULTIPROC_DIR (an empty directory, shared by the processes of one
+# container) so export_metrics() aggregates all of them.
+
+QUEUE_WAIT_SECONDS = Histogram(
+    'processor_queue_wait_seconds',
+    'Time from task creation to the start of processing',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+STAGE_SECONDS = Histogram(
+    'processor_stage_seconds',
+    'Duration of a processing stage (decode, inference, encode, storage_save)',
+    ['stage'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+INPUT_MEGAPIXELS = Histogram(
+    'processor_input_megapixels',
+    'Pixel count of decoded input images, in megapixels',
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 12, 16, 24, 32, 48, 64),
+)
+OUTPUT_BYTES = Histogram(
+    'processor_output_bytes',
+    'Size of stored result images',
+    ['format'],
+    buckets=(16e3, 64e3, 256e3, 512e3, 1e6, 2e6, 4e6, 8e6, 16e6, 32e6),
+)
+TASK_STATUS_TOTAL = Counter(
+    'processor_task_status_total',
+    'Task status transitions',
+    ['status'],
+)
+TASK_ERRORS_TOTAL = Counter(
+    'processor_task_errors_total',
+    'Failed processing attempts by retry classification and exception type',
+    ['classification', 'error_type'],
+)
+FAILED_ATTEMPT_SECONDS = Counter(
+    'processor_failed_attempt_seconds_total',
+    'Worker time spent on attempts that failed, by outcome (retried, failed)',
+    ['outcome'],
+)
+ADMISSION_REJECTIONS_TOTAL = Counter(
+    'processor_admission_rejections_total',
+    'Uploads refused by admission control, by HTTP status',
+    ['status'],
+)
+ESTIMATED_WAIT_SECONDS = Histogram(
+    'processor_estimated_wait_seconds',
+    'Queue wait estimated by admission control when an upload arrives',
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600),
+)
+WORKER_STARTUP_SECONDS = Histogram(
+    'processor_worker_startup_seconds',
+    'Duration of worker startup phases (django_setup, model_load, '
+    'first_inference, warm_up, worker_start, ready)',
+    ['phase'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 20, 30, 60, 120),
+)
+WORKER_WARMUP_FAILURES_TOTAL = Counter(
+    'processor_worker_warmup_failures_total',
+    'Pool processes that started cold because every warm-up attempt failed',
+)
+CELERY_TASK_EVENTS_TOTAL = Counter(
+    'processor_celery_task_events_total',
+    'Celery task outcomes reported by signals',
+    ['event'],
+)
+
+
+# Per-task stage durations, collected by collect_stage_timings()
+_stage_timings = ContextVar('stage_timings', default=None)
+
+
+@contextmanager
+def observe_stage(stage: str):
+    """Record the duration of the enclosed block under ``stage``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage=stage).observe(elapsed)
+        timings = _stage_timings.get()
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0) + elapsed * 1000, 3)
+
+
+@contextmanager
+def collect_stage_timings():
+    """
+    Yield a dict filled with the milliseconds spent in each observe_stage()
+    block of the enclosed code (repeated stages add up).
+    """
+    timings = {}
+    token = _stage_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _stage_timings.reset(token)
+
+
+def export_metrics() -> tuple[bytes, str]:
+    """Render all metrics in the Prometheus text format, with its content type."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
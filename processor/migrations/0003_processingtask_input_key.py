@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0002_alter_processingtask_error_message_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="processingtask",
+            name="input_key",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Storage key of the staged upload passed to the worker",
+                max_length=500,
+            ),
+        ),
+    ]
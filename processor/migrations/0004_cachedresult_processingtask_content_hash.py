@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-17 05:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0003_processingtask_input_key"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CachedResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "content_hash",
+                    models.CharField(
+                        help_text="SHA-256 of input bytes, model and options",
+                        max_length=64,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "result_url",
+                    models.CharField(
+                        help_text="URL of the cached result", max_length=500
+                    ),
+                ),
+                ("hit_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "last_used_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="processingtask",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                help_text="Result cache key (input bytes + model + options)",
+                max_length=64,
+            ),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-17 05:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0004_cachedresult_processingtask_content_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProcessingBatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "batch_id",
+                    models.CharField(
+                        db_index=True,
+                        help_text="Batch UUID",
+                        max_length=255,
+                        unique=True,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="processingtask",
+            name="source_name",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Original upload filename",
+                max_length=255,
+            ),
+        ),
+        migrations.AddField(
+            model_name="processingtask",
+            name="batch",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="tasks",
+                to="processor.processingbatch",
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 05:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0005_processingbatch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="processingtask",
+            name="mask_only",
+            field=models.BooleanField(
+                default=False,
+                help_text="Store the single-channel alpha mask instead of a cutout",
+            ),
+        ),
+        migrations.AddField(
+            model_name="processingtask",
+            name="output_format",
+            field=models.CharField(
+                default="png",
+                help_text="Result image format (png, webp, avif)",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="processingtask",
+            name="output_options",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Encoder options (quality, lossless, ...)",
+            ),
+        ),
+    ]
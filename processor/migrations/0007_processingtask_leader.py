@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0006_processingtask_output_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="processingtask",
+            name="leader",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                help_text="Identical in-flight task whose result this task receives",
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="followers",
+                to="processor.processingtask",
+                to_field="task_id",
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0007_processingtask_leader"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="processingtask",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("retrying", "Retrying"),
+                    ("completed", "Completed"),
+                    ("failed", "Failed"),
+                ],
+                db_index=True,
+                default="pending",
+                max_length=20,
+            ),
+        ),
+    ]
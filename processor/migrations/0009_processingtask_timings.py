@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("processor", "0008_alter_processingtask_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="processingtask",
+            name="timings",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Milliseconds spent per processing stage by the last attempt",
+            ),
+        ),
+    ]
@@ -1,18 +1,85 @@
 from typing import ClassVar
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+from processor.coalescing import release
+from processor.events import TERMINAL_STATUSES, publish_task_status
+from processor.metrics import QUEUE_WAIT_SECONDS, TASK_STATUS_TOTAL
+from processor.task_state import (
+    load_task_state,
+    load_task_states,
+    store_final_task_state,
+    store_task_state,
+)
+
+
+class ProcessingBatch(models.Model):
+    """
+    Groups the tasks created by one batch upload under a single job handle.
+    Progress is derived from the status of its tasks.
+    """
+
+    batch_id = models.CharField(
+        max_length=255, unique=True, db_index=True, help_text='Batch UUID'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f'Batch {self.batch_id[:8]}'
+
+    def progress(self):
+        """
+        Aggregate status and per-status task counts.
+
+        Tasks being processed or waiting for a retry are still pending in the
+        database (see ProcessingTask.mark_processing), so those are looked up
+        in the hot state.
+        """
+        counts = dict.fromkeys(
+            ('pending', 'processing', 'retrying', 'completed', 'failed'), 0
+        )
+        counts.update(
+            self.tasks.order_by()
+            .values_list('status')
+            .annotate(total=models.Count('id'))
+        )
+        if counts['pending']:
+            pending = self.tasks.filter(status='pending').values_list(
+                'task_id', flat=True
+            )
+            for state in load_task_states(pending).values():
+                if state['status'] in ('processing', 'retrying'):
+                    counts['pending'] -= 1
+                    counts[state['status']] += 1
+        total = sum(counts.values())
+        finished = counts['completed'] + counts['failed']
+
+        return {
+            'batch_id': self.batch_id,
+            'status': 'completed' if finished == total else 'processing',
+            'total': total,
+            'counts': counts,
+            'progress': round(finished / total, 4) if total else 1.0,
+        }
+
 
 class ProcessingTask(models.Model):
     """
     Tracks background image processing tasks.
     Provides persistent state storage beyond Celery's TTL-limited result backend.
+
+    The row is written when the task is created and when it reaches a terminal
+    state. The ``processing`` and ``retrying`` transitions only go to the hot
+    state store (processor.task_state), which status reads check first.
     """
 
     STATUS_CHOICES: ClassVar = [
         ('pending', 'Pending'),
         ('processing', 'Processing'),
+        ('retrying', 'Retrying'),
         ('completed', 'Completed'),
         ('failed', 'Failed'),
     ]
@@ -32,9 +99,58 @@ class ProcessingTask(models.Model):
         default='',
         help_text='URL or path to processed image',
     )
+    input_key = models.CharField(
+        max_length=500,
+        blank=True,
+        default='',
+        help_text='Storage key of the staged upload passed to the worker',
+    )
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        db_index=True,
+        help_text='Result cache key (input bytes + model + options)',
+    )
+    output_format = models.CharField(
+        max_length=10, default='png', help_text='Result image format (png, webp, avif)'
+    )
+    mask_only = models.BooleanField(
+        default=False,
+        help_text='Store the single-channel alpha mask instead of a cutout',
+    )
+    output_options = models.JSONField(
+        default=dict, blank=True, help_text='Encoder options (quality, lossless, ...)'
+    )
+    leader = models.ForeignKey(
+        'self',
+        to_field='task_id',
+        null=True,
+        blank=True,
+        # Followers are stored before their leader's row may exist
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name='followers',
+        help_text='Identical in-flight task whose result this task receives',
+    )
+    batch = models.ForeignKey(
+        ProcessingBatch,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name='tasks',
+    )
+    source_name = models.CharField(
+        max_length=255, blank=True, default='', help_text='Original upload filename'
+    )
     error_message = models.TextField(
         blank=True, default='', help_text='Exception traceback if task failed'
     )
+    timings = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text='Milliseconds spent per processing stage by the last attempt',
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         db_index=True,
@@ -52,18 +168,167 @@ class ProcessingTask(models.Model):
     def __str__(self):
         return f'Task {self.task_id[:8]} - {self.status}'
 
-    def mark_processing(self):
+    @classmethod
+    def current_status(cls, task_id):
+        """
+        Status payload of a task: the hot state if present, else the database.
+
+        Raises ProcessingTask.DoesNotExist for unknown tasks.
+        """
+        payload = load_task_state(task_id)
+        if payload is None:
+            payload = cls.objects.get(task_id=task_id).status_payload()
+        return payload
+
+    @classmethod
+    async def acurrent_status(cls, task_id):
+        """Async version of current_status(); the hot state is read in a thread."""
+        payload = await sync_to_async(load_task_state, thread_sensitive=False)(task_id)
+        if payload is None:
+            payload = (await cls.objects.aget(task_id=task_id)).status_payload()
+        return payload
+
+    def status_payload(self):
+        """Public view of the task state, as returned by the status endpoints."""
+        return {
+            'status': self.status,
+            'result_url': self.result_url,
+            'error': self.error_message,
+        }
+
+    def output_settings(self):
+        """Output options in the form returned by encoding.parse_output_options."""
+        return {
+            'format': self.output_format,
+            'mask_only': self.mask_only,
+            'encoder': self.output_options,
+        }
+
+    def mark_processing(self, retry=False):
+        if self.status == 'pending' and not retry:
+            queue_wait = timezone.now() - self.created_at
+            QUEUE_WAIT_SECONDS.observe(queue_wait.total_seconds())
+
         self.status = 'processing'
-        self.save(update_fields=['status'])
+        self._store_transient_state(['status'])
 
-    def mark_completed(self, result_url):
+    def mark_retrying(self, error_message):
+        """The attempt failed with a transient error and another one is scheduled."""
+        self.status = 'retrying'
+        self.error_message = error_message
+        self._store_transient_state(['status', 'error_message'])
+
+    def _store_transient_state(self, fields):
+        if not store_task_state(self.task_id, self.status_payload()):
+            self.save(update_fields=fields)  # No hot state store available
+        self._announce()
+
+    def mark_completed(self, result_url, timings=None):
         self.status = 'completed'
         self.result_url = result_url
         self.completed_at = timezone.now()
-        self.save(update_fields=['status', 'result_url', 'completed_at'])
+        self._save_outcome(['status', 'result_url', 'completed_at'], timings)
+        # Overwrite the hot 'processing' state so it cannot shadow the row
+        store_final_task_state(self.task_id, self.status_payload())
+        self._announce()
+        self._finish_followers()
 
-    def mark_failed(self, error_message):
+    def mark_failed(self, error_message, timings=None):
         self.status = 'failed'
         self.error_message = error_message
         self.completed_at = timezone.now()
-        self.save(update_fields=['status', 'error_message', 'completed_at'])
+        self._save_outcome(['status', 'error_message', 'completed_at'], timings)
+        store_final_task_state(self.task_id, self.status_payload())
+        self._announce()
+        self._finish_followers()
+
+    def _save_outcome(self, fields, timings):
+        if timings is not None:
+            self.timings = timings
+            fields = [*fields, 'timings']
+        self.save(update_fields=fields)
+
+    def _announce(self):
+        TASK_STATUS_TOTAL.labels(status=self.status).inc()
+        publish_task_status(self.task_id, self.status_payload())
+
+    def _finish_followers(self):
+        """Give this task's terminal outcome to the uploads coalesced into it."""
+        release(self.content_hash, self.task_id)
+
+        follower_ids = list(
+            self.followers.exclude(status__in=TERMINAL_STATUSES).values_list(
+                'task_id', flat=True
+            )
+        )
+        if not follower_ids:
+            return
+
+        ProcessingTask.objects.filter(task_id__in=follower_ids).update(
+            status=self.status,
+            result_url=self.result_url,
+            error_message=self.error_message,
+            completed_at=self.completed_at,
+        )
+        payload = self.status_payload()
+        for task_id in follower_ids:
+            TASK_STATUS_TOTAL.labels(status=self.status).inc()
+            store_final_task_state(task_id, payload)
+            publish_task_status(task_id, payload)
+
+    @classmethod
+    def abandon_leader(cls, task_id, content_hash):
+        """
+        Fail an upload that claimed the in-flight marker but will not run.
+
+        Identical uploads may have been stored as its followers already (before
+        its own row exists). Its row is stored as failed so they, and any
+        followers stored later (see settle_followers), fail with it instead of
+        staying pending.
+        """
+        try:
+            if content_hash and settings.COALESCE_UPLOADS:
+                leader, _ = cls.objects.get_or_create(
+                    task_id=task_id, defaults={'content_hash': content_hash}
+                )
+                leader.mark_failed('Upload could not be queued')
+        finally:
+            release(content_hash, task_id)
+
+    @classmethod
+    def settle_followers(cls, tasks):
+        """
+        Finish newly stored followers whose leader has already finished.
+
+        Call after saving followers: a leader that finished before they were
+        stored did not see them (see processor.coalescing).
+        """
+        leader_ids = {task.leader_id for task in tasks if task.leader_id}
+        if leader_ids:
+            finished = cls.objects.filter(
+                task_id__in=leader_ids, status__in=TERMINAL_STATUSES
+            )
+            for leader in finished:
+                leader._finish_followers()
+
+
+class CachedResult(models.Model):
+    """
+    Content-addressed index of processed results.
+
+    Lets identical uploads reuse an existing result file instead of running the
+    model again. Entries are evicted by cleanup_old_tasks (TTL and max entries).
+    """
+
+    content_hash = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text='SHA-256 of input bytes, model and options',
+    )
+    result_url = models.CharField(max_length=500, help_text='URL of the cached result')
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f'Cached {self.content_hash[:12]} ({self.hit_count} hits)'
@@ -0,0 +1,60 @@
+"""
+Opt-in cProfile sampling of processing tasks.
+
+A fraction TASK_PROFILE_SAMPLE_RATE of tasks runs under cProfile. The profile
+is saved to default storage alongside the results, as
+``profiles/<task_id>.prof`` in the pstats format (``python -m pstats``,
+snakeviz, ...); unlike results, profiles are not served to clients. Cleanup
+deletes them with their tasks while sampling is enabled.
+"""
+
+import cProfile
+import logging
+import marshal
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+
+def profile_name(task_id: str) -> str:
+    return f'profiles/{task_id}.prof'
+
+
+@contextmanager
+def maybe_profile(task_id: str):
+    """Profile the enclosed block for a sampled fraction of tasks."""
+    if random.random() >= settings.TASK_PROFILE_SAMPLE_RATE:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # Another profiler is active in this thread
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _save_profile(profiler, task_id)
+
+
+def _save_profile(profiler, task_id):
+    try:
+        profiler.create_stats()
+        name = default_storage.save(
+            profile_name(task_id), ContentFile(marshal.dumps(profiler.stats))
+        )
+    except Exception:
+        logger.warning(
+            'Failed to save task profile', extra={'task_id': task_id}, exc_info=True
+        )
+        return
+    logger.info('Task profile saved', extra={'task_id': task_id, 'profile': name})
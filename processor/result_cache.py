@@ -0,0 +1,121 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from processor.models import CachedResult, ProcessingTask
+
+logger = logging.getLogger(__name__)
+
+
+def compute_content_hash(uploaded_file, model_name: str, options=None) -> str:
+    """
+    Hash the upload together with everything that affects the output.
+
+    Reads the file in chunks so large uploads are never held in memory twice.
+    """
+    digest = hashlib.sha256()
+    uploaded_file.seek(0)
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+
+    digest.update(
+        json.dumps(
+            {'model': model_name, 'options': options or {}}, sort_keys=True
+        ).encode()
+    )
+    return digest.hexdigest()
+
+
+def lookup_cached_result(content_hash: str) -> CachedResult | None:
+    """Return the cached result for a hash and record the hit, if any."""
+    if not settings.RESULT_CACHE_ENABLED or not content_hash:
+        return None
+
+    entry = CachedResult.objects.filter(content_hash=content_hash).first()
+    if entry is None:
+        return None
+
+    CachedResult.objects.filter(pk=entry.pk).update(
+        hit_count=F('hit_count') + 1, last_used_at=timezone.now()
+    )
+    return entry
+
+
+async def alookup_cached_result(content_hash: str) -> CachedResult | None:
+    """Async version of lookup_cached_result()."""
+    if not settings.RESULT_CACHE_ENABLED or not content_hash:
+        return None
+
+    entry = await CachedResult.objects.filter(content_hash=content_hash).afirst()
+    if entry is None:
+        return None
+
+    await CachedResult.objects.filter(pk=entry.pk).aupdate(
+        hit_count=F('hit_count') + 1, last_used_at=timezone.now()
+    )
+    return entry
+
+
+def store_cached_result(content_hash: str, result_url: str) -> None:
+    if not settings.RESULT_CACHE_ENABLED or not content_hash:
+        return
+
+    try:
+        CachedResult.objects.update_or_create(
+            content_hash=content_hash,
+            defaults={'result_url': result_url, 'last_used_at': timezone.now()},
+        )
+    except IntegrityError:
+        # Another worker cached the same content concurrently; either result is fine
+        logger.info('Result already cached', extra={'content_hash': content_hash})
+
+
+def evict_stale_entries(dry_run: bool = False, limit: int | None = None) -> list[str]:
+    """
+    Apply the TTL and max-entries policy, returning the evicted result URLs.
+
+    Least recently used entries go first and at most ``limit`` are evicted,
+    so a caller can work off a large backlog in bounded steps. Callers decide
+    whether the files can be deleted with referenced_result_urls().
+    """
+    cutoff_time = timezone.now() - timedelta(hours=settings.RESULT_CACHE_TTL_HOURS)
+    # Expired entries sort before all others, so the stale ones are a prefix
+    entries = CachedResult.objects.order_by('last_used_at', 'pk')
+    expired = entries.filter(last_used_at__lt=cutoff_time).count()
+    stale_count = max(expired, entries.count() - settings.RESULT_CACHE_MAX_ENTRIES)
+    if limit is not None:
+        stale_count = min(stale_count, limit)
+    if stale_count <= 0:
+        return []
+
+    stale = list(entries.values_list('pk', 'result_url')[:stale_count])
+    if not dry_run:
+        CachedResult.objects.filter(pk__in=[pk for pk, _ in stale]).delete()
+    return [result_url for _, result_url in stale]
+
+
+def referenced_result_urls(result_urls, excluding_tasks=None) -> set[str]:
+    """
+    Return the subset of result URLs still used by a cache entry or a task.
+
+    ``excluding_tasks`` is a queryset of tasks about to be deleted, whose
+    references do not count.
+    """
+    tasks = ProcessingTask.objects.filter(result_url__in=result_urls)
+    if excluding_tasks is not None:
+        tasks = tasks.exclude(pk__in=excluding_tasks.values('pk'))
+
+    referenced = set(tasks.values_list('result_url', flat=True))
+    referenced.update(
+        CachedResult.objects.filter(result_url__in=result_urls).values_list(
+            'result_url', flat=True
+        )
+    )
+    return referenced
@@ -0,0 +1,44 @@
+"""
+Retry policy of process_image_task.
+
+Errors that depend on the input fail the task on the first attempt: the same
+image would fail the same way on every retry. Everything else (storage,
+broker, database locks, memory pressure, the inference server restarting)
+is treated as transient and retried with exponential backoff and jitter.
+"""
+
+import random
+
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from PIL import Image, UnidentifiedImageError
+
+from processor.staging import InvalidImageError
+
+PERMANENT_ERRORS = (
+    InvalidImageError,
+    UnidentifiedImageError,
+    Image.DecompressionBombError,
+    FileNotFoundError,  # Staged input is gone
+    SoftTimeLimitExceeded,  # The image is too slow to process within the limit
+    ValueError,  # Unknown model or output options
+    TypeError,
+)
+
+
+def is_transient(exc: BaseException) -> bool:
+    return not isinstance(exc, PERMANENT_ERRORS)
+
+
+def retry_delay(retries: int) -> float:
+    """
+    Seconds before retry number ``retries + 1``.
+
+    Doubles from TASK_RETRY_BACKOFF_BASE up to TASK_RETRY_BACKOFF_MAX and
+    draws from the upper half of that window, so tasks that failed together
+    (e.g. during a storage outage) do not all come back at the same moment.
+    """
+    window = min(
+        settings.TASK_RETRY_BACKOFF_MAX, settings.TASK_RETRY_BACKOFF_BASE * 2**retries
+    )
+    return random.uniform(window / 2, window)
@@ -0,0 +1,84 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from processor.tuning import onnx_thread_counts, session_options
+
+logger = logging.getLogger(__name__)
+
+# Public model names accepted by the API, mapped to rembg session names
+MODEL_REGISTRY = {
+    'u2net': 'u2net',
+    'u2netp': 'u2netp',
+    'isnet': 'isnet-general-use',
+    'silueta': 'silueta',
+}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def resolve_model_name(model_name: str | None = None) -> str:
+    """
+    Validate a public model name, falling back to REMBG_MODEL.
+
+    Raises ValueError for unknown or disabled models.
+    """
+    model_name = model_name or settings.REMBG_MODEL
+    if model_name not in MODEL_REGISTRY or model_name not in settings.REMBG_MODELS:
+        available = ', '.join(settings.REMBG_MODELS)
+        raise ValueError(f'Unknown model "{model_name}". Available models: {available}')
+    return model_name
+
+
+def get_session(model_name: str | None = None):
+    """
+    Return the rembg session for a model, loading it on first use.
+
+    Sessions are cached per process, so only processes that actually run
+    inference (Celery worker children, or the inference server when
+    INFERENCE_SERVER_ADDRESS is set) pay the import and model load cost.
+    """
+    model_name = resolve_model_name(model_name)
+
+    session = _sessions.get(model_name)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        if model_name not in _sessions:
+            start = time.perf_counter()
+            _sessions[model_name] = new_session(MODEL_REGISTRY[model_name])
+            intra_op, inter_op = onnx_thread_counts()
+            logger.info(
+                'Model session loaded',
+                extra={
+                    'model': model_name,
+                    'load_seconds': round(time.perf_counter() - start, 3),
+                    'intra_op_threads': intra_op,
+                    'inter_op_threads': inter_op,
+                },
+            )
+
+    return _sessions[model_name]
+
+
+def new_session(rembg_name: str):
+    """
+    Create a rembg session with SessionOptions from the ONNX_* settings.
+
+    Mirrors ``rembg.new_session``, which always builds default options.
+    """
+    # rembg pulls in onnxruntime, scipy and numba; keep it off import paths
+    from rembg.sessions import sessions_class
+
+    for session_class in sessions_class:
+        if session_class.name() == rembg_name:
+            return session_class(rembg_name, session_options())
+    raise ValueError(f'No rembg session class for model "{rembg_name}"')
+
+
+def loaded_models() -> list[str]:
+    return list(_sessions)
@@ -0,0 +1,80 @@
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, UnidentifiedImageError
+
+from processor.metrics import INPUT_MEGAPIXELS, observe_stage
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidImageError(ValueError):
+    """A staged input that cannot be decoded."""
+
+
+def stage_upload(uploaded_file, task_id: str) -> str:
+    """
+    Persist an uploaded image to default storage before it is queued.
+
+    Only the returned storage key travels through the broker, so Celery
+    messages stay a few hundred bytes regardless of the upload size.
+
+    Uploads spooled to a temporary file by TemporaryFileUploadHandler are
+    moved into place by FileSystemStorage rather than copied through memory.
+    """
+    file_ext = os.path.splitext(uploaded_file.name)[1].lower()
+    uploaded_file.seek(0)
+    return default_storage.save(
+        f'{settings.UPLOAD_STAGING_PREFIX}{task_id}{file_ext}', uploaded_file
+    )
+
+
+def open_staged_image(input_key: str) -> Image.Image:
+    """
+    Decode a staged input straight from storage.
+
+    Pillow reads the file in chunks while decoding, so the encoded bytes are
+    never held in memory next to the decoded pixels. Corrupt or truncated
+    data raises InvalidImageError; storage errors propagate unchanged.
+    """
+    with observe_stage('decode'), default_storage.open(input_key, 'rb') as staged_file:
+        try:
+            image = Image.open(staged_file)
+            image.load()
+        except (UnidentifiedImageError, SyntaxError) as exc:
+            raise InvalidImageError(f'Cannot decode {input_key}: {exc}') from exc
+        except OSError as exc:
+            # Pillow reports truncated or broken data as a plain OSError;
+            # subclasses come from the storage backend and may be transient
+            if type(exc) is not OSError:
+                raise
+            raise InvalidImageError(f'Cannot decode {input_key}: {exc}') from exc
+
+    INPUT_MEGAPIXELS.observe(image.width * image.height / 1_000_000)
+    return image
+
+
+def discard_staged(input_key: str) -> bool:
+    """
+    Delete a staged input once it is no longer needed.
+
+    Returns True if a file was removed. Storage errors are logged rather than
+    raised so that garbage collection never fails the caller.
+    """
+    if not input_key:
+        return False
+
+    try:
+        if not default_storage.exists(input_key):
+            return False
+        default_storage.delete(input_key)
+        return True
+    except Exception:
+        logger.warning(
+            'Failed to discard staged input',
+            extra={'input_key': input_key},
+            exc_info=True,
+        )
+        return False
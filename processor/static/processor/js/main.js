@@ -81,6 +81,35 @@ async function pollTaskStatus(taskId) {
     });
 }
 
+function waitForTaskResult(taskId) {
+    // Event streams are only served without holding a worker under ASGI
+    if (!window.EventSource || !window.UPLOAD_CONFIG.serverEvents) {
+        return pollTaskStatus(taskId);
+    }
+
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`/task/${taskId}/events/`);
+
+        source.addEventListener('status', (event) => {
+            const data = JSON.parse(event.data);
+
+            if (data.status === 'completed') {
+                source.close();
+                resolve(data.result_url);
+            } else if (data.status === 'failed') {
+                source.close();
+                reject(new Error(data.error || 'Processing failed'));
+            }
+        });
+
+        // Stream closed or unsupported by a proxy: fall back to polling
+        source.onerror = () => {
+            source.close();
+            pollTaskStatus(taskId).then(resolve, reject);
+        };
+    });
+}
+
 async function uploadFile(file) {
     const validation = validateFile(file);
     if (!validation.valid) {
@@ -110,9 +139,10 @@ async function uploadFile(file) {
             return;
         }
 
-        const { task_id } = await uploadResponse.json();
+        const { task_id, status, result_url } = await uploadResponse.json();
 
-        const resultUrl = await pollTaskStatus(task_id);
+        // Identical uploads are served from the result cache without queueing
+        const resultUrl = status === 'completed' ? result_url : await waitForTaskResult(task_id);
 
         const imageResponse = await fetch(resultUrl);
         const blob = await imageResponse.blob();
@@ -0,0 +1,86 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+
+def storage_name_from_url(result_url: str) -> str:
+    """
+    Map a public result URL back to its name in default storage.
+
+    Works for FileSystemStorage (``MEDIA_URL`` prefix) and for public GCS URLs
+    (``https://storage.googleapis.com/<bucket>/<name>``).
+    """
+    base_url = default_storage.url('')
+    if base_url and result_url.startswith(base_url):
+        return unquote(result_url[len(base_url) :])
+
+    if result_url.startswith(settings.MEDIA_URL):
+        return unquote(result_url[len(settings.MEDIA_URL) :])
+
+    return unquote(urlparse(result_url).path).lstrip('/')
+
+
+def is_gcs_storage(storage) -> bool:
+    """Whether ``storage`` is django-storages' GoogleCloudStorage (or alike)."""
+    return hasattr(storage, 'bucket') and hasattr(storage, 'client')
+
+
+# Maximum number of calls in one GCS JSON API batch request
+GCS_BATCH_SIZE = 100
+
+
+def delete_stored_files(names, workers: int = 8) -> int:
+    """
+    Delete files from default storage, returning how many were deleted.
+
+    GCS deletes are sent as batch requests of up to GCS_BATCH_SIZE calls and
+    counted as issued (missing blobs are ignored by GCS). Other backends are
+    deleted from a thread pool, since each delete is a blocking syscall or
+    HTTP request. Errors are logged and never raised.
+    """
+    names = list(dict.fromkeys(name for name in names if name))
+    if not names:
+        return 0
+
+    if is_gcs_storage(default_storage):
+        return _delete_gcs_blobs(default_storage, names)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return sum(pool.map(_delete_file, names))
+
+
+def _delete_file(name: str) -> bool:
+    try:
+        if not default_storage.exists(name):
+            return False
+        default_storage.delete(name)
+        return True
+    except Exception:
+        logger.warning('Failed to delete file', extra={'name': name}, exc_info=True)
+        return False
+
+
+def _delete_gcs_blobs(storage, names: list[str]) -> int:
+    from storages.utils import clean_name
+
+    deleted = 0
+    for start in range(0, len(names), GCS_BATCH_SIZE):
+        chunk = names[start : start + GCS_BATCH_SIZE]
+        try:
+            with storage.client.batch(raise_exception=False):
+                for name in chunk:
+                    storage.bucket.delete_blob(
+                        storage._normalize_name(clean_name(name))
+                    )
+        except Exception:
+            logger.warning(
+                'Failed to delete files', extra={'names': chunk[:5]}, exc_info=True
+            )
+            continue
+        deleted += len(chunk)
+    return deleted
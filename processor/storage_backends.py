@@ -0,0 +1,26 @@
+"""
+Storage backends, referenced from STORAGES in remove_bg/settings.py.
+
+Kept apart from processor.storage so that importing its helpers does not
+load the Google Cloud client.
+"""
+
+from django.conf import settings
+from storages.backends.gcloud import GoogleCloudStorage
+
+from processor.delivery import RESULTS_DIR
+
+
+class ResultsGoogleCloudStorage(GoogleCloudStorage):
+    """
+    GoogleCloudStorage that stores results with RESULT_CACHE_CONTROL.
+
+    Result names are unique per task, so results may be cached as immutable;
+    other objects (staged uploads) keep the bucket's default caching.
+    """
+
+    def get_object_parameters(self, name):
+        parameters = super().get_object_parameters(name)
+        if name.startswith(self._normalize_name(f'{RESULTS_DIR}/')):
+            parameters.setdefault('cache_control', settings.RESULT_CACHE_CONTROL)
+        return parameters
@@ -0,0 +1,158 @@
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from processor.backends import get_backend
+
+logger = logging.getLogger(__name__)
+
+
+def state_key(task_id: str) -> str:
+    return f'processor:state:{task_id}'
+
+
+class InProcessStore:
+    """Expiring dict within one process (TASK_STATE_URL is not a Redis URL)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._values[key] = (value, time.monotonic() + ttl)
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            entries = [self._values.get(key, (None, now)) for key in keys]
+        return [value if expires > now else None for value, expires in entries]
+
+    def add(self, key, value, ttl):
+        """Set ``key`` unless it holds an unexpired value; return whether it was set."""
+        now = time.monotonic()
+        with self._lock:
+            if self._values.get(key, (None, now))[1] > now:
+                return False
+            self._values[key] = (value, now + ttl)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def delete_if_equal(self, key, value):
+        with self._lock:
+            if self._values.get(key, (None, 0))[0] == value:
+                del self._values[key]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+# KEYS[1] key; ARGV[1] value it must still hold
+DELETE_IF_EQUAL_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisStore:
+    def __init__(self, client):
+        self._client = client
+        self._delete_if_equal = self._client.register_script(DELETE_IF_EQUAL_SCRIPT)
+
+    def set(self, key, value, ttl):
+        self._client.set(key, value, ex=ttl)
+
+    def get_many(self, keys):
+        return [
+            value.decode() if value is not None else None
+            for value in self._client.mget(keys)
+        ]
+
+    def add(self, key, value, ttl):
+        return bool(self._client.set(key, value, ex=ttl, nx=True))
+
+    def delete(self, key):
+        self._client.delete(key)
+
+    def delete_if_equal(self, key, value):
+        self._delete_if_equal(keys=[key], args=[value])
+
+
+def get_store():
+    """Return the hot state store for TASK_STATE_URL, or None when disabled."""
+    return get_backend(settings.TASK_STATE_URL, RedisStore, InProcessStore)
+
+
+def store_task_state(task_id: str, payload: dict) -> bool:
+    """
+    Save a task's status payload for TASK_STATE_TTL seconds.
+
+    Returns False when no store is configured or it is unreachable, in which
+    case the caller must persist the state to the database instead.
+    """
+    store = get_store()
+    if store is None:
+        return False
+
+    try:
+        store.set(state_key(task_id), json.dumps(payload), settings.TASK_STATE_TTL)
+    except Exception:
+        logger.warning(
+            'Failed to store task state',
+            extra={'task_id': task_id, 'status': payload.get('status')},
+            exc_info=True,
+        )
+        return False
+    return True
+
+
+def store_final_task_state(task_id: str, payload: dict) -> None:
+    """
+    Replace a task's hot state with its terminal payload (already in the database).
+
+    If the write fails the entry is deleted instead, so an earlier transient
+    state cannot shadow the database row until it expires.
+    """
+    if store_task_state(task_id, payload):
+        return
+    store = get_store()
+    if store is None:
+        return
+    try:
+        store.delete(state_key(task_id))
+    except Exception:
+        logger.warning(
+            'Failed to clear task state', extra={'task_id': task_id}, exc_info=True
+        )
+
+
+def load_task_states(task_ids) -> dict:
+    """Hot status payloads by task id; tasks without one are left out."""
+    store = get_store()
+    task_ids = list(task_ids)
+    if store is None or not task_ids:
+        return {}
+
+    try:
+        values = store.get_many([state_key(task_id) for task_id in task_ids])
+    except Exception:
+        logger.warning('Failed to load task state', exc_info=True)
+        return {}
+    return {
+        task_id: json.loads(value)
+        for task_id, value in zip(task_ids, values, strict=True)
+        if value is not None
+    }
+
+
+def load_task_state(task_id: str) -> dict | None:
+    return load_task_states([task_id]).get(task_id)
@@ -1,108 +1,234 @@
-import base64
 import logging
+import os
+import time
 import traceback
-from io import BytesIO
+from datetime import timedelta
 
 from celery import shared_task
-from celery.signals import task_failure, task_retry, task_success
+from celery.signals import (
+    task_failure,
+    task_retry,
+    task_success,
+    worker_process_init,
+    worker_process_shutdown,
+)
+from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
+from django.utils import timezone
 from PIL import Image
-from rembg import new_session, remove
 
+from processor.admission import record_service_time
+from processor.cleanup import cleanup_lock, cleanup_old_tasks
+from processor.encoding import encode_image
+from processor.imaging import remove_background
+from processor.inference_server import fits_shared_memory, remote_remove_background
+from processor.metrics import (
+    CELERY_TASK_EVENTS_TOTAL,
+    FAILED_ATTEMPT_SECONDS,
+    OUTPUT_BYTES,
+    TASK_ERRORS_TOTAL,
+    collect_stage_timings,
+    observe_stage,
+)
 from processor.models import ProcessingTask
+from processor.profiling import maybe_profile
+from processor.result_cache import store_cached_result
+from processor.retries import is_transient, retry_delay
+from processor.sessions import get_session
+from processor.staging import discard_staged, open_staged_image
+from processor.warmup import clear_ready, warm_up_worker_process
 
 logger = logging.getLogger(__name__)
 
-_rembg_session = new_session()
 
+def save_result_image(task_record: ProcessingTask, output_image: Image.Image) -> str:
+    """Encode a processed image per the task's output options and return its URL."""
+    if task_record.mask_only:
+        output_image = output_image.getchannel('A')
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def process_image_task(self, image_data_b64: str, task_id: str) -> dict:
+    with observe_stage('encode'):
+        image_bytes, extension = encode_image(
+            output_image, task_record.output_format, task_record.output_options
+        )
+    OUTPUT_BYTES.labels(format=task_record.output_format).observe(len(image_bytes))
+
+    filename = f'processed/{task_record.task_id}{extension}'
+    with observe_stage('storage_save'):
+        saved_path = default_storage.save(filename, ContentFile(image_bytes))
+
+    return default_storage.url(saved_path)
+
+
+def run_inference(input_image: Image.Image, model_name: str | None) -> Image.Image:
+    """
+    Remove the background in the shared inference server or in-process.
+
+    Images too large for the free shared memory are processed in-process.
+    """
+    if settings.INFERENCE_SERVER_ADDRESS:
+        if fits_shared_memory(input_image):
+            with observe_stage('inference'):
+                return remote_remove_background(input_image, model_name)
+        logger.warning(
+            'Image does not fit in shared memory, running inference in-process',
+            extra={'size': input_image.size},
+        )
+
+    session = get_session(model_name)
+    with observe_stage('inference'):
+        return remove_background(input_image, session)
+
+
+@shared_task(bind=True, max_retries=settings.TASK_MAX_RETRIES)
+def process_image_task(
+    self,
+    input_key: str,
+    task_id: str,
+    model_name: str | None = None,
+    priority: str = 'interactive',
+) -> dict:
     """
     Removes background from uploaded image asynchronously.
 
-    Uses base64 encoding because Celery JSON serializer doesn't support raw bytes.
-    Task retries up to 3 times on failure with exponential backoff.
+    The upload is staged in default storage by the web process and only its key
+    is passed through the broker. The staged input is kept across retries and
+    discarded once the task reaches a terminal state.
+    ``model_name`` picks a session from the model registry (default REMBG_MODEL).
+    ``priority`` only selects the queue (see route_task in remove_bg/celery.py).
+    Transient errors are retried up to TASK_MAX_RETRIES times with exponential
+    backoff (the task shows as ``retrying`` meanwhile); errors caused by the
+    input fail the task at once (see processor.retries).
+    Stage durations of the attempt are logged and stored in ``timings``; a
+    TASK_PROFILE_SAMPLE_RATE fraction of runs is profiled (processor.profiling).
     """
     task_record = None
-    extra = {'task_id': task_id, 'celery_task_id': self.request.id}
+    started = time.perf_counter()
+    extra = {
+        'task_id': task_id,
+        'celery_task_id': self.request.id,
+        'priority': priority,
+    }
 
-    try:
-        logger.info('Starting image processing', extra=extra)
+    with collect_stage_timings() as timings, maybe_profile(task_id):
+        try:
+            logger.info('Starting image processing', extra=extra)
 
-        task_record = ProcessingTask.objects.get(task_id=task_id)
-        task_record.mark_processing()
+            task_record = ProcessingTask.objects.get(task_id=task_id)
+            task_record.mark_processing(retry=self.request.retries > 0)
 
-        image_bytes = base64.b64decode(image_data_b64)
-        input_image = Image.open(BytesIO(image_bytes))
+            input_image = open_staged_image(input_key)
 
-        logger.info(
-            'Image loaded successfully',
-            extra={
-                **extra,
-                'image_size': input_image.size,
-                'image_format': input_image.format,
-            },
-        )
+            logger.info(
+                'Image loaded successfully',
+                extra={
+                    **extra,
+                    'image_size': input_image.size,
+                    'image_format': input_image.format,
+                },
+            )
 
-        output_image = remove(input_image, session=_rembg_session)
+            output_image = run_inference(input_image, model_name)
 
-        output_buffer = BytesIO()
-        output_image.save(output_buffer, format='PNG')
-        output_buffer.seek(0)
+            result_url = save_result_image(task_record, output_image)
+            # Cache first: completing releases the in-flight marker for the same input
+            store_cached_result(task_record.content_hash, result_url)
+            elapsed = time.perf_counter() - started
+            timings['total'] = round(elapsed * 1000, 3)
+            task_record.mark_completed(result_url, timings)
+            discard_staged(input_key)
+            record_service_time(elapsed)  # For admission control
 
-        filename = f'processed/{task_id}.png'
-        saved_path = default_storage.save(filename, ContentFile(output_buffer.read()))
+            logger.info(
+                'Image processing completed',
+                extra={**extra, 'result_url': result_url, 'timings': timings},
+            )
 
-        result_url = default_storage.url(saved_path)
-        task_record.mark_completed(result_url)
+            return {
+                'status': 'completed',
+                'result_url': result_url,
+            }
 
-        logger.info(
-            'Image processing completed', extra={**extra, 'result_url': result_url}
-        )
+        except ProcessingTask.DoesNotExist:
+            error_msg = f'ProcessingTask with task_id={task_id} not found'
+            logger.error(
+                'ProcessingTask not found', extra={**extra, 'error': error_msg}
+            )
+            discard_staged(input_key)
+            return {
+                'status': 'failed',
+                'error': error_msg,
+            }
 
-        return {
-            'status': 'completed',
-            'result_url': result_url,
-        }
-
-    except ProcessingTask.DoesNotExist:
-        error_msg = f'ProcessingTask with task_id={task_id} not found'
-        logger.error('ProcessingTask not found', extra={**extra, 'error': error_msg})
-        return {
-            'status': 'failed',
-            'error': error_msg,
-        }
-
-    except Exception as exc:
-        error_msg = f'{type(exc).__name__}: {exc!s}\n{traceback.format_exc()}'
-
-        logger.error(
-            'Image processing failed',
-            extra={
-                **extra,
-                'error_type': type(exc).__name__,
-                'error_message': str(exc),
-            },
-            exc_info=True,
-        )
+        except Exception as exc:
+            error_msg = f'{type(exc).__name__}: {exc!s}\n{traceback.format_exc()}'
+            elapsed = time.perf_counter() - started
+            timings['total'] = round(elapsed * 1000, 3)
+            transient = is_transient(exc)
+            will_retry = transient and self.request.retries < self.max_retries
 
-        if task_record:
-            task_record.mark_failed(error_msg)
+            logger.error(
+                'Image processing failed',
+                extra={
+                    **extra,
+                    'error_type': type(exc).__name__,
+                    'error_message': str(exc),
+                    'transient': transient,
+                    'retries': self.request.retries,
+                    'timings': timings,
+                },
+                exc_info=True,
+            )
+            TASK_ERRORS_TOTAL.labels(
+                classification='transient' if transient else 'permanent',
+                error_type=type(exc).__name__,
+            ).inc()
+            FAILED_ATTEMPT_SECONDS.labels(
+                outcome='retried' if will_retry else 'failed'
+            ).inc(elapsed)
 
-        try:
-            raise self.retry(exc=exc)
-        except self.MaxRetriesExceededError:
-            logger.error('Max retries exceeded', extra=extra, exc_info=True)
+            if will_retry:
+                if task_record:
+                    task_record.mark_retrying(error_msg)
+                raise self.retry(exc=exc, countdown=retry_delay(self.request.retries))
+
+            if task_record:
+                task_record.mark_failed(error_msg, timings)
+            discard_staged(input_key)
             return {
                 'status': 'failed',
                 'error': str(exc),
             }
 
 
+@shared_task(ignore_result=True)
+def cleanup_old_tasks_periodic() -> dict | None:
+    """
+    Scheduled cleanup of old tasks and result files (see remove_bg/celery.py).
+
+    Each run deletes at most CLEANUP_MAX_ROWS tasks and stops starting new
+    chunks after CLEANUP_TIME_BUDGET_SECONDS, so a large backlog is worked
+    off in small increments across runs instead of one long delete. Runs
+    scheduled by several workers' beats while one is in progress are skipped.
+    """
+    with cleanup_lock(settings.CLEANUP_INTERVAL_SECONDS) as acquired:
+        if not acquired:
+            logger.info('Cleanup already running elsewhere, skipping')
+            return None
+        stats = cleanup_old_tasks(
+            timezone.now() - timedelta(hours=settings.CLEANUP_MAX_AGE_HOURS),
+            chunk_size=settings.CLEANUP_CHUNK_SIZE,
+            max_rows=settings.CLEANUP_MAX_ROWS,
+            time_budget=settings.CLEANUP_TIME_BUDGET_SECONDS,
+        )
+    if not stats['complete']:
+        logger.info('Cleanup budget reached, backlog remains', extra=stats)
+    return stats
+
+
 @task_success.connect
 def task_success_handler(sender=None, result=None, **kwargs):
+    CELERY_TASK_EVENTS_TOTAL.labels(event='success').inc()
     extra = {
         'task_id': kwargs.get('task_id'),
         'task_name': sender.name,
@@ -112,6 +238,7 @@ def task_success_handler(sender=None, result=None, **kwargs):
 
 @task_retry.connect
 def task_retry_handler(sender=None, reason=None, **kwargs):
+    CELERY_TASK_EVENTS_TOTAL.labels(event='retry').inc()
     extra = {
         'task_id': kwargs.get('task_id'),
         'task_name': sender.name,
@@ -123,6 +250,7 @@ def task_retry_handler(sender=None, reason=None, **kwargs):
 
 @task_failure.connect
 def task_failure_handler(sender=None, exception=None, **kwargs):
+    CELERY_TASK_EVENTS_TOTAL.labels(event='failure').inc()
     extra = {
         'task_id': kwargs.get('task_id'),
         'task_name': sender.name,
@@ -131,3 +259,16 @@ def task_failure_handler(sender=None, exception=None, **kwargs):
         'traceback': kwargs.get('traceback'),
     }
     logger.error('Task failed', extra=extra, exc_info=exception)
+
+
+@worker_process_init.connect
+def worker_process_init_handler(**kwargs):
+    """Load the models in each pool process before it takes tasks."""
+    if not warm_up_worker_process(run_inference):
+        # A cold process must not take tasks: the pool starts a new one
+        os._exit(1)
+
+
+@worker_process_shutdown.connect
+def worker_process_shutdown_handler(**kwargs):
+    clear_ready()
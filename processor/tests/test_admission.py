@@ -0,0 +1,158 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from processor import admission
+from processor.tests.test_routing import make_upload
+
+CAPACITY = {
+    'ADMISSION_ENABLED': True,
+    'ADMISSION_URL': 'memory://',
+    'ADMISSION_MAX_QUEUE_DEPTH': 100,
+    'ADMISSION_MAX_WAIT_SECONDS': {'interactive': 30, 'bulk': 600},
+    'ADMISSION_WORKER_SLOTS': 2,
+    'ADMISSION_SERVICE_SECONDS': 3,
+}
+
+
+@override_settings(**CAPACITY)
+class CapacityTests(SimpleTestCase):
+    def setUp(self):
+        admission.get_store().clear()
+        self.addCleanup(admission.get_store().clear)
+
+    @mock.patch('processor.admission.queue_depth', return_value=10)
+    def test_wait_is_estimated_from_depth_and_service_time(self, queue_depth):
+        rejection, wait = admission.check_capacity('interactive')
+
+        self.assertIsNone(rejection)
+        self.assertEqual(wait, 15)  # 10 jobs x 3s / 2 slots
+        queue_depth.assert_called_once_with('interactive')
+
+    def test_queue_depth_reads_the_broker(self):
+        admission._depths.clear()
+
+        self.assertEqual(admission.queue_depth('undeclared-queue'), 0)
+
+    @mock.patch('processor.admission.queue_depth', return_value=10)
+    def test_measured_service_time_replaces_the_default(self, queue_depth):
+        admission.record_service_time(8)
+        admission.record_service_time(8)
+
+        rejection, wait = admission.check_capacity('interactive')
+
+        self.assertEqual(wait, 40)
+        self.assertEqual(rejection.status, 503)
+        self.assertEqual(rejection.retry_after, 10)
+
+    @mock.patch('processor.admission.queue_depth', return_value=95)
+    def test_queue_depth_limit_counts_the_new_jobs(self, queue_depth):
+        self.assertIsNone(admission.check_capacity('bulk', jobs=5)[0])
+
+        rejection, _ = admission.check_capacity('bulk', jobs=6)
+        self.assertEqual(rejection.status, 503)
+        self.assertEqual(rejection.retry_after, 2)  # 1 excess job x 3s / 2 slots
+
+
+@override_settings(ADMISSION_URL='memory://', RATE_LIMIT_ENABLED=True)
+class RateLimitTests(SimpleTestCase):
+    def setUp(self):
+        admission.get_store().clear()
+        self.addCleanup(admission.get_store().clear)
+        self.factory = RequestFactory()
+
+    @override_settings(RATE_LIMIT_RATE=0.5, RATE_LIMIT_BURST=2)
+    def test_bucket_allows_bursts_then_refills(self):
+        request = self.factory.post('/')
+
+        with mock.patch('processor.admission.time.time', return_value=1000):
+            self.assertIsNone(admission.check_rate_limit(request))
+            self.assertIsNone(admission.check_rate_limit(request))
+            rejection = admission.check_rate_limit(request)
+
+        self.assertEqual(rejection.status, 429)
+        self.assertEqual(rejection.retry_after, 2)
+
+        with mock.patch('processor.admission.time.time', return_value=1002):
+            self.assertIsNone(admission.check_rate_limit(request))
+
+    @override_settings(RATE_LIMIT_RATE=0.5, RATE_LIMIT_BURST=2)
+    def test_batches_larger_than_the_burst_leave_the_bucket_in_debt(self):
+        request = self.factory.post('/')
+
+        with mock.patch('processor.admission.time.time', return_value=1000):
+            self.assertIsNone(admission.check_rate_limit(request, cost=5))
+            rejection = admission.check_rate_limit(request)
+
+        self.assertEqual(rejection.retry_after, 8)  # From -3 tokens back to 1
+
+        with mock.patch('processor.admission.time.time', return_value=1008):
+            self.assertIsNone(admission.check_rate_limit(request))
+
+    @override_settings(RATE_LIMIT_BURST=1, RATE_LIMIT_PROXY_COUNT=1)
+    def test_clients_are_told_apart_behind_a_proxy(self):
+        first = self.factory.post('/', HTTP_X_FORWARDED_FOR='spoofed, 10.0.0.1')
+        second = self.factory.post('/', HTTP_X_FORWARDED_FOR='10.0.0.2')
+
+        self.assertEqual(admission.client_address(first), '10.0.0.1')
+        self.assertIsNone(admission.check_rate_limit(first))
+        self.assertIsNone(admission.check_rate_limit(second))
+        self.assertIsNotNone(admission.check_rate_limit(first))
+
+
+@override_settings(RESULT_CACHE_ENABLED=False, **CAPACITY)
+@mock.patch('processor.views.process_image_task.apply_async')
+class UploadAdmissionTests(TestCase):
+    def setUp(self):
+        admission.get_store().clear()
+        self.addCleanup(admission.get_store().clear)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    @mock.patch('processor.admission.queue_depth', return_value=4)
+    def test_upload_response_includes_estimated_wait(self, queue_depth, apply_async):
+        response = self.client.post(reverse('home'), {'image': make_upload()})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['estimated_wait'], 6.0)
+
+    @mock.patch('processor.admission.queue_depth', return_value=1000)
+    def test_saturated_queue_returns_503(self, queue_depth, apply_async):
+        response = self.client.post(reverse('home'), {'image': make_upload()})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1470')
+        apply_async.assert_not_called()
+
+    @mock.patch('processor.admission.queue_depth', side_effect=ConnectionError)
+    def test_broker_outage_admits_uploads(self, queue_depth, apply_async):
+        response = self.client.post(reverse('home'), {'image': make_upload()})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('estimated_wait', response.json())
+
+    @override_settings(RATE_LIMIT_ENABLED=True, RATE_LIMIT_BURST=1)
+    @mock.patch('processor.admission.queue_depth', return_value=0)
+    def test_rate_limited_client_gets_429(self, queue_depth, apply_async):
+        self.client.post(reverse('home'), {'image': make_upload()})
+        response = self.client.post(reverse('home'), {'image': make_upload()})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        apply_async.assert_called_once()
+
+    @override_settings(RATE_LIMIT_ENABLED=True, RATE_LIMIT_BURST=3)
+    @mock.patch('processor.admission.queue_depth', return_value=0)
+    @mock.patch('processor.views.group')
+    def test_batch_takes_one_token_per_image(self, group, queue_depth, apply_async):
+        images = [make_upload(f'{index}.png') for index in range(3)]
+
+        first = self.client.post(reverse('batch_upload'), {'images': images})
+        second = self.client.post(reverse('home'), {'image': make_upload()})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 429)
@@ -0,0 +1,119 @@
+import asyncio
+import io
+import json
+import shutil
+import tempfile
+import time
+import zipfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+
+from processor.models import ProcessingBatch, ProcessingTask
+from processor.tests.test_routing import make_upload
+
+
+@override_settings(
+    TASK_STATE_URL='',
+    TASK_EVENTS_URL='memory://',
+    RESULT_CACHE_ENABLED=False,
+    ADMISSION_ENABLED=False,
+)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.client = AsyncClient()
+
+    async def test_upload_page_streams_events_under_asgi(self):
+        response = await self.client.get(reverse('home'))
+
+        config = json.loads(response.context['upload_config'])
+        self.assertTrue(config['serverEvents'])
+
+    @mock.patch('processor.views.process_image_task.apply_async')
+    async def test_upload_is_staged_and_enqueued(self, apply_async):
+        response = await self.client.post(reverse('home'), {'image': make_upload()})
+
+        self.assertEqual(response.status_code, 200)
+        task = await ProcessingTask.objects.aget(task_id=response.json()['task_id'])
+        self.assertEqual(task.status, 'pending')
+        self.assertTrue(task.input_key)
+        apply_async.assert_called_once()
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+    @mock.patch(
+        'processor.tasks.run_inference',
+        side_effect=lambda image, model_name: image.convert('RGBA'),
+    )
+    async def test_eager_task_shares_the_request_connection(self, run_inference):
+        response = await self.client.post(reverse('home'), {'image': make_upload()})
+
+        self.assertEqual(response.status_code, 200)
+        task = await ProcessingTask.objects.aget(task_id=response.json()['task_id'])
+        self.assertEqual(task.status, 'completed')
+
+    async def test_invalid_upload_is_rejected(self):
+        response = await self.client.post(reverse('home'), {})
+
+        self.assertEqual(response.status_code, 400)
+
+    async def test_long_polls_wait_concurrently(self):
+        await ProcessingTask.objects.acreate(task_id='async-task', status='pending')
+        url = reverse('task_status', args=['async-task'])
+
+        start = time.monotonic()
+        responses = await asyncio.gather(
+            *(self.client.get(url, {'wait': 0.5}) for _ in range(4))
+        )
+
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertEqual(
+            [response.json()['status'] for response in responses], ['pending'] * 4
+        )
+
+    async def test_status_of_unknown_task_returns_404(self):
+        response = await self.client.get(reverse('task_status', args=['missing']))
+
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(TASK_EVENTS_STREAM_TIMEOUT=1, TASK_EVENTS_HEARTBEAT=0.05)
+    async def test_events_are_sent_as_they_happen(self):
+        await ProcessingTask.objects.acreate(task_id='async-task', status='pending')
+        response = await self.client.get(reverse('task_events', args=['async-task']))
+
+        start = time.monotonic()
+        arrivals = [
+            (time.monotonic() - start, chunk)
+            async for chunk in response.streaming_content
+        ]
+
+        first_at, first = arrivals[0]
+        self.assertLess(first_at, 0.5)
+        self.assertIn(b'"status": "pending"', first)
+        self.assertTrue(
+            any(at < 0.5 and chunk == b': keepalive\n\n' for at, chunk in arrivals)
+        )
+
+    async def test_batch_download_streams_a_zip(self):
+        batch = await ProcessingBatch.objects.acreate(batch_id='async-batch')
+        name = default_storage.save('processed/async.png', ContentFile(b'png-data'))
+        await ProcessingTask.objects.acreate(
+            task_id='async-batch-task',
+            batch=batch,
+            status='completed',
+            source_name='shot.jpg',
+            result_url=default_storage.url(name),
+        )
+
+        response = await self.client.get(
+            reverse('batch_download', args=['async-batch'])
+        )
+
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        self.assertEqual(archive.read('shot.png'), b'png-data')
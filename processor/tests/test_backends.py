@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase, override_settings
+
+from processor import admission, events, task_state
+from processor.backends import get_backend
+
+
+class BackendTests(SimpleTestCase):
+    @override_settings(
+        TASK_STATE_URL='redis://localhost:6379/15',
+        ADMISSION_URL='redis://localhost:6379/15',
+        TASK_EVENTS_URL='redis://localhost:6379/15',
+    )
+    def test_redis_backends_share_one_client_per_url(self):
+        store = task_state.get_store()
+
+        self.assertIsInstance(store, task_state.RedisStore)
+        self.assertIs(task_state.get_store(), store)
+        self.assertIs(admission.get_store()._client, store._client)
+        self.assertIs(events.get_broker()._client, store._client)
+
+    @override_settings(TASK_STATE_URL='memory://', ADMISSION_URL='memory://')
+    def test_other_urls_get_in_process_backends(self):
+        self.assertIsInstance(task_state.get_store(), task_state.InProcessStore)
+        self.assertIsInstance(admission.get_store(), admission.InProcessStore)
+
+    def test_empty_url_disables_the_backend(self):
+        self.assertIsNone(get_backend('', task_state.RedisStore, dict))
@@ -1,3 +1,5 @@
+import json
+
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -30,3 +32,8 @@ class HomePageTests(TestCase):
     def test_home_page_uses_correct_template(self):
         response = self.client.get(reverse('home'))
         self.assertTemplateUsed(response, 'processor/home.html')
+
+    def test_home_page_polls_instead_of_streaming_under_wsgi(self):
+        response = self.client.get(reverse('home'))
+        config = json.loads(response.context['upload_config'])
+        self.assertFalse(config['serverEvents'])
@@ -0,0 +1,171 @@
+import io
+import zipfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from processor.encoding import parse_output_options
+from processor.models import CachedResult, ProcessingBatch, ProcessingTask
+from processor.result_cache import compute_content_hash
+
+
+def make_png(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (50, 50), color=color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+class BatchUploadTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        # Pre-cache the test images so the batch completes without inference
+        for color in ('red', 'blue'):
+            upload = SimpleUploadedFile(f'{color}.png', make_png(color))
+            CachedResult.objects.create(
+                content_hash=compute_content_hash(
+                    upload, settings.REMBG_MODEL, parse_output_options({})
+                ),
+                result_url=f'/media/processed/{color}.png',
+            )
+
+    def _upload(self, name, color):
+        return SimpleUploadedFile(name, make_png(color), content_type='image/png')
+
+    def test_batch_upload_creates_tasks_under_one_batch(self):
+        response = self.client.post(
+            reverse('batch_upload'),
+            {'images': [self._upload('a.png', 'red'), self._upload('b.png', 'blue')]},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(
+            [task['filename'] for task in data['tasks']], ['a.png', 'b.png']
+        )
+
+        batch = ProcessingBatch.objects.get(batch_id=data['batch_id'])
+        self.assertEqual(batch.tasks.count(), 2)
+
+    def test_batch_upload_reports_rejected_files(self):
+        response = self.client.post(
+            reverse('batch_upload'),
+            {
+                'images': [
+                    self._upload('a.png', 'red'),
+                    SimpleUploadedFile('notes.txt', b'text', content_type='text/plain'),
+                ]
+            },
+        )
+
+        data = response.json()
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['rejected'][0]['filename'], 'notes.txt')
+
+    def test_batch_upload_accepts_zip_archive(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('shots/red.png', make_png('red'))
+            archive.writestr('shots/blue.png', make_png('blue'))
+            archive.writestr('__MACOSX/shots/._red.png', b'metadata')
+
+        response = self.client.post(
+            reverse('batch_upload'),
+            {'archive': SimpleUploadedFile('shots.zip', buffer.getvalue())},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(ProcessingTask.objects.values_list('source_name', flat=True)),
+            ['blue.png', 'red.png'],
+        )
+
+    def test_batch_upload_rejects_invalid_archive(self):
+        response = self.client.post(
+            reverse('batch_upload'),
+            {'archive': SimpleUploadedFile('shots.zip', b'not a zip')},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ProcessingBatch.objects.exists())
+
+    def test_batch_upload_without_files_returns_error(self):
+        response = self.client.post(reverse('batch_upload'), {})
+
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(BATCH_MAX_FILES=1)
+    def test_batch_upload_enforces_max_files(self):
+        response = self.client.post(
+            reverse('batch_upload'),
+            {'images': [self._upload('a.png', 'red'), self._upload('b.png', 'blue')]},
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+class BatchStatusTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.batch = ProcessingBatch.objects.create(batch_id='batch-1')
+        for index, status in enumerate(['completed', 'completed', 'failed', 'pending']):
+            ProcessingTask.objects.create(
+                task_id=f'batch-task-{index}',
+                batch=self.batch,
+                status=status,
+                source_name=f'shot-{index}.jpg',
+            )
+
+    def test_batch_status_reports_counts_and_progress(self):
+        response = self.client.get(reverse('batch_status', args=['batch-1']))
+
+        data = response.json()
+        self.assertEqual(data['status'], 'processing')
+        self.assertEqual(data['total'], 4)
+        self.assertEqual(
+            data['counts'],
+            {
+                'pending': 1,
+                'processing': 0,
+                'retrying': 0,
+                'completed': 2,
+                'failed': 1,
+            },
+        )
+        self.assertEqual(data['progress'], 0.75)
+
+    def test_batch_status_for_unknown_batch_returns_404(self):
+        response = self.client.get(reverse('batch_status', args=['missing']))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_batch_download_streams_completed_results(self):
+        for task in self.batch.tasks.filter(status='completed'):
+            name = default_storage.save(
+                f'processed/{task.task_id}.png',
+                ContentFile(b'png-' + task.task_id.encode()),
+            )
+            self.addCleanup(default_storage.delete, name)
+            task.result_url = default_storage.url(name)
+            task.save()
+
+        response = self.client.get(reverse('batch_download', args=['batch-1']))
+
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(sorted(archive.namelist()), ['shot-0.png', 'shot-1.png'])
+        self.assertEqual(archive.read('shot-0.png'), b'png-batch-task-0')
+
+    def test_batch_download_without_results_returns_404(self):
+        self.batch.tasks.filter(status='completed').update(status='pending')
+
+        response = self.client.get(reverse('batch_download', args=['batch-1']))
+
+        self.assertEqual(response.status_code, 404)
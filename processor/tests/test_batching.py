@@ -0,0 +1,200 @@
+import io
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from kombu import Connection
+from PIL import Image
+
+from processor.batching import (
+    collect_batch,
+    job_from_message,
+    predict_masks,
+    process_batch,
+)
+from processor.models import ProcessingTask
+
+
+class StubSession:
+    """
+    Stands in for a rembg session: the model keeps the left half of a white
+    input and the right half of a black one, so masks show which image they
+    were computed from.
+    """
+
+    model_name = 'u2net'
+
+    def __init__(self, batch_size=None, error=None):
+        self.runs = []
+        self.error = error
+        self.inner_session = SimpleNamespace(
+            get_inputs=lambda: [SimpleNamespace(name='input', shape=[batch_size])],
+            run=self.run,
+        )
+
+    def normalize(self, image, mean, std, size):
+        brightness = np.asarray(image.convert('L')).mean() / 255
+        return {'input': np.full((1, 1, 2, 2), brightness, dtype=np.float32)}
+
+    def run(self, output_names, feeds):
+        if self.error:
+            raise self.error
+        brightness = feeds['input'][:, 0, 0, 0]
+        self.runs.append(len(brightness))
+        left = brightness[:, None, None, None] * np.ones((1, 1, 2, 1))
+        return [np.concatenate([left, 1 - left], axis=3)]
+
+
+def make_image(colour, size):
+    return Image.new('RGB', size, colour)
+
+
+class CollectBatchTests(SimpleTestCase):
+    def setUp(self):
+        self.connection = Connection('memory://')
+        self.queue = self.connection.SimpleQueue('batch-test')
+        self.addCleanup(self.connection.release)
+        self.addCleanup(self.queue.close)
+        self.queue.clear()
+
+    def _enqueue(self, count):
+        for index in range(count):
+            self.queue.put([[f'uploads/{index}.png', f'task-{index}'], {}, {}])
+
+    def test_batch_is_capped_at_max_size(self):
+        self._enqueue(5)
+
+        messages = collect_batch(self.queue, max_size=3, max_wait_ms=500)
+
+        self.assertEqual(len(messages), 3)
+
+    def test_partial_batch_is_returned_after_max_wait(self):
+        self._enqueue(2)
+
+        messages = collect_batch(self.queue, max_size=8, max_wait_ms=50)
+
+        self.assertEqual(len(messages), 2)
+
+    def test_empty_queue_returns_no_messages(self):
+        messages = collect_batch(
+            self.queue, max_size=8, max_wait_ms=50, idle_timeout=0.05
+        )
+
+        self.assertEqual(messages, [])
+
+    def test_job_from_message_returns_input_key_and_task_id(self):
+        self._enqueue(1)
+
+        message = collect_batch(self.queue, max_size=1, max_wait_ms=0)[0]
+
+        self.assertEqual(job_from_message(message), ('uploads/0.png', 'task-0', None))
+
+
+class PredictMasksTests(SimpleTestCase):
+    def test_images_are_segmented_in_one_run_and_masks_split_per_image(self):
+        session = StubSession()
+        images = [make_image('white', (40, 20)), make_image('black', (30, 60))]
+
+        masks = predict_masks(session, images)
+
+        self.assertEqual(session.runs, [2])
+        self.assertEqual([mask.size for mask in masks], [(40, 20), (30, 60)])
+        self.assertEqual(masks[0].getpixel((0, 0)), 255)
+        self.assertEqual(masks[0].getpixel((39, 0)), 0)
+        self.assertEqual(masks[1].getpixel((0, 0)), 0)
+        self.assertEqual(masks[1].getpixel((29, 0)), 255)
+
+    def test_models_with_a_fixed_batch_size_run_once_per_image(self):
+        session = StubSession(batch_size=1)
+        images = [make_image('white', (8, 8)), make_image('black', (8, 8))]
+
+        masks = predict_masks(session, images)
+
+        self.assertEqual(session.runs, [1, 1])
+        self.assertEqual(masks[0].getpixel((0, 0)), 255)
+        self.assertEqual(masks[1].getpixel((0, 0)), 0)
+
+    def test_unsupported_models_are_rejected(self):
+        session = StubSession()
+        session.model_name = 'sam'
+
+        with self.assertRaises(ValueError):
+            predict_masks(session, [make_image('white', (8, 8))])
+
+
+@override_settings(TASK_STATE_URL='')
+class ProcessBatchTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.session = StubSession()
+        self.enterContext(
+            mock.patch('processor.batching.get_session', return_value=self.session)
+        )
+
+    def stage(self, task_id, data):
+        ProcessingTask.objects.create(task_id=task_id)
+        return (
+            default_storage.save(f'uploads/{task_id}.png', ContentFile(data)),
+            task_id,
+            None,
+        )
+
+    def stage_image(self, task_id, colour):
+        data = io.BytesIO()
+        make_image(colour, (20, 10)).save(data, 'PNG')
+        return self.stage(task_id, data.getvalue())
+
+    def test_each_task_receives_its_own_cutout(self):
+        jobs = [self.stage_image('white', 'white'), self.stage_image('black', 'black')]
+
+        completed = process_batch(jobs)
+
+        self.assertEqual(completed, 2)
+        self.assertEqual(self.session.runs, [2])
+        for task_id, opaque, transparent in (
+            ('white', (0, 0), (19, 0)),
+            ('black', (19, 0), (0, 0)),
+        ):
+            task = ProcessingTask.objects.get(task_id=task_id)
+            self.assertEqual(task.status, 'completed')
+            with default_storage.open(f'processed/{task_id}.png') as result:
+                cutout = Image.open(result)
+                self.assertEqual(cutout.getpixel(opaque)[3], 255)
+                self.assertEqual(cutout.getpixel(transparent)[3], 0)
+        for input_key, _, _ in jobs:
+            self.assertFalse(default_storage.exists(input_key))
+
+    def test_undecodable_input_only_fails_its_own_task(self):
+        jobs = [self.stage_image('good', 'white'), self.stage('corrupt', b'garbage')]
+
+        with self.assertLogs('processor.batching', 'ERROR'):
+            completed = process_batch(jobs)
+
+        self.assertEqual(completed, 1)
+        self.assertEqual(self.session.runs, [1])
+        self.assertEqual(ProcessingTask.objects.get(task_id='good').status, 'completed')
+        failed = ProcessingTask.objects.get(task_id='corrupt')
+        self.assertEqual(failed.status, 'failed')
+        self.assertIn('InvalidImageError', failed.error_message)
+        self.assertFalse(default_storage.exists(jobs[1][0]))
+
+    def test_inference_error_fails_every_task_in_the_run(self):
+        self.session.error = RuntimeError('out of memory')
+        jobs = [self.stage_image('first', 'white'), self.stage_image('second', 'black')]
+
+        with self.assertLogs('processor.batching', 'ERROR'):
+            completed = process_batch(jobs)
+
+        self.assertEqual(completed, 0)
+        self.assertEqual(
+            set(ProcessingTask.objects.values_list('status', flat=True)), {'failed'}
+        )
+        for input_key, _, _ in jobs:
+            self.assertFalse(default_storage.exists(input_key))
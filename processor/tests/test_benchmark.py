@@ -0,0 +1,51 @@
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from benchmarks.pipeline import build_corpus, compare, run
+
+
+def row(stage='end_to_end', **metrics):
+    return {'case': 'png-64x48', 'stage': stage, **metrics}
+
+
+class CompareTests(SimpleTestCase):
+    def test_regressions_beyond_the_threshold_are_reported(self):
+        baseline = [row(p50_ms=100.0, p95_ms=200.0, throughput_per_s=10.0)]
+        results = [row(p50_ms=115.0, p95_ms=300.0, throughput_per_s=7.0)]
+
+        regressions = compare(results, baseline, threshold=0.2)
+
+        self.assertEqual(
+            [(r['metric'], r['change']) for r in regressions],
+            [('p95_ms', 0.5), ('throughput_per_s', -0.3)],
+        )
+
+    def test_tiny_latencies_and_unknown_rows_are_ignored(self):
+        baseline = [row('db', p50_ms=0.2, p95_ms=0.3)]
+        results = [row('db', p50_ms=0.6, p95_ms=0.9), row('decode', p50_ms=50.0)]
+
+        self.assertEqual(compare(results, baseline, threshold=0.2), [])
+
+
+@override_settings(TASK_STATE_URL='', ADMISSION_URL='', RESULT_CACHE_ENABLED=False)
+class PipelineRunTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def test_reports_each_stage_per_case(self):
+        corpus = build_corpus(sizes=[(64, 48)], formats=['jpeg', 'png'])
+
+        results = run(corpus, repeat=2, warmup=0, inference=False)
+
+        stages = {(result['case'], result['stage']) for result in results}
+        for case in ('jpeg-64x48', 'png-64x48'):
+            for stage in ('decode', 'encode', 'storage_save', 'db', 'end_to_end'):
+                self.assertIn((case, stage), stages)
+        end_to_end = results[-1]
+        self.assertEqual(end_to_end['count'], 2)
+        self.assertGreater(end_to_end['throughput_per_s'], 0)
+        self.assertGreater(end_to_end['peak_rss_mb'], 0)
@@ -1,7 +1,8 @@
-import base64
 import contextlib
 import io
 
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.test import TestCase, override_settings
 from PIL import Image
 
@@ -12,19 +13,25 @@ from processor.tasks import process_image_task
 @override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
 class CeleryTaskTests(TestCase):
     def setUp(self):
-        self.test_image_b64 = self._create_test_image_b64()
+        self.test_image_key = self._stage_test_image()
 
-    def _create_test_image_b64(self):
+    def tearDown(self):
+        if default_storage.exists(self.test_image_key):
+            default_storage.delete(self.test_image_key)
+
+    def _stage_test_image(self):
         image = Image.new('RGB', (100, 100), color='green')
         buffer = io.BytesIO()
         image.save(buffer, format='PNG')
-        return base64.b64encode(buffer.getvalue()).decode('utf-8')
+        return default_storage.save(
+            'uploads/test-input.png', ContentFile(buffer.getvalue())
+        )
 
     def test_process_image_task_completes_successfully(self):
         task_id = 'test-task-123'
         ProcessingTask.objects.create(task_id=task_id, status='pending')
 
-        result = process_image_task(self.test_image_b64, task_id)
+        result = process_image_task(self.test_image_key, task_id)
 
         self.assertEqual(result['status'], 'completed')
         self.assertIn('result_url', result)
@@ -34,7 +41,7 @@ class CeleryTaskTests(TestCase):
         self.assertIsNotNone(task.result_url)
 
     def test_process_image_task_handles_invalid_task_id(self):
-        result = process_image_task(self.test_image_b64, 'nonexistent-task')
+        result = process_image_task(self.test_image_key, 'nonexistent-task')
 
         self.assertEqual(result['status'], 'failed')
         self.assertIn('error', result)
@@ -44,9 +51,14 @@ class CeleryTaskTests(TestCase):
         task_id = 'test-task-corrupted'
         ProcessingTask.objects.create(task_id=task_id, status='pending')
 
+        corrupted_key = default_storage.save(
+            'uploads/test-corrupted.png', ContentFile(b'not an image!!!')
+        )
+        self.addCleanup(default_storage.delete, corrupted_key)
+
         with contextlib.suppress(Exception):
             process_image_task.apply_async(
-                args=('invalid-base64!!!', task_id), task_id=task_id
+                args=(corrupted_key, task_id), task_id=task_id
             )
 
         task = ProcessingTask.objects.get(task_id=task_id)
@@ -56,7 +68,7 @@ class CeleryTaskTests(TestCase):
         task_id = 'test-task-file-creation'
         ProcessingTask.objects.create(task_id=task_id, status='pending')
 
-        result = process_image_task(self.test_image_b64, task_id)
+        result = process_image_task(self.test_image_key, task_id)
 
         self.assertEqual(result['status'], 'completed')
         self.assertTrue(result['result_url'].endswith('.png'))
@@ -68,12 +80,22 @@ class CeleryTaskTests(TestCase):
 
         self.assertEqual(task.status, 'pending')
 
-        process_image_task(self.test_image_b64, task_id)
+        process_image_task(self.test_image_key, task_id)
 
         task.refresh_from_db()
         self.assertEqual(task.status, 'completed')
         self.assertIsNotNone(task.completed_at)
 
+    def test_task_discards_staged_input_after_completion(self):
+        task_id = 'test-task-discard-input'
+        ProcessingTask.objects.create(
+            task_id=task_id, status='pending', input_key=self.test_image_key
+        )
+
+        process_image_task(self.test_image_key, task_id)
+
+        self.assertFalse(default_storage.exists(self.test_image_key))
+
 
 @override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
 class CelerySignalHandlerTests(TestCase):
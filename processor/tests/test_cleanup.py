@@ -1,10 +1,19 @@
 from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.management import call_command
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.utils import timezone
 
-from processor.models import ProcessingTask
+from processor.cleanup import cleanup_lock, cleanup_old_tasks
+from processor.models import CachedResult, ProcessingTask
+from processor.staging import discard_staged
+from processor.storage import delete_stored_files
+from processor.task_state import get_store
+from processor.tasks import cleanup_old_tasks_periodic
 
 
 class TaskCleanupCommandTests(TestCase):
@@ -73,3 +82,213 @@ class TaskCleanupCommandTests(TestCase):
             self.fail(f'cleanup_old_tasks failed with no old tasks: {e}')
 
         self.assertEqual(ProcessingTask.objects.count(), 1)
+
+    def test_cleanup_discards_staged_inputs_of_old_tasks(self):
+        input_key = default_storage.save(
+            'uploads/old-pending-task.png', ContentFile(b'staged')
+        )
+        self.addCleanup(discard_staged, input_key)
+        stuck_task = ProcessingTask.objects.create(
+            task_id='old-pending-task', status='pending', input_key=input_key
+        )
+        stuck_task.created_at = timezone.now() - timedelta(hours=25)
+        stuck_task.save()
+
+        call_command('cleanup_old_tasks', '--hours=24')
+
+        self.assertFalse(default_storage.exists(input_key))
+        self.assertFalse(
+            ProcessingTask.objects.filter(task_id='old-pending-task').exists()
+        )
+
+    def test_cleanup_pages_through_tasks_in_chunks(self):
+        result_key = default_storage.save('processed/shared.png', ContentFile(b'png'))
+        self.addCleanup(discard_staged, result_key)
+        result_url = default_storage.url(result_key)
+        for index in range(5):
+            ProcessingTask.objects.create(
+                task_id=f'old-shared-{index}', status='completed', result_url=result_url
+            )
+        ProcessingTask.objects.filter(task_id__startswith='old-shared').update(
+            created_at=timezone.now() - timedelta(hours=25)
+        )
+
+        out = StringIO()
+        call_command('cleanup_old_tasks', '--hours=24', '--chunk-size=2', stdout=out)
+
+        self.assertEqual(
+            list(ProcessingTask.objects.values_list('task_id', flat=True)),
+            ['recent-task'],
+        )
+        self.assertFalse(default_storage.exists(result_key))
+        self.assertIn('Successfully deleted 7 task(s)', out.getvalue())
+        self.assertIn('tasks/s', out.getvalue())
+
+
+class PeriodicCleanupTests(TestCase):
+    def setUp(self):
+        ProcessingTask.objects.bulk_create(
+            ProcessingTask(task_id=f'old-{index}', status='failed')
+            for index in range(5)
+        )
+        ProcessingTask.objects.update(created_at=timezone.now() - timedelta(hours=2))
+
+    def test_cleanup_is_scheduled_with_celery_beat(self):
+        from remove_bg.celery import app
+
+        entry = app.conf.beat_schedule['cleanup-old-tasks']
+        self.assertEqual(entry['task'], 'processor.tasks.cleanup_old_tasks_periodic')
+
+    @override_settings(
+        CLEANUP_MAX_AGE_HOURS=1, CLEANUP_MAX_ROWS=3, CLEANUP_CHUNK_SIZE=2
+    )
+    def test_each_run_deletes_at_most_max_rows(self):
+        stats = cleanup_old_tasks_periodic()
+
+        self.assertEqual(stats['tasks'], 3)
+        self.assertFalse(stats['complete'])
+        self.assertEqual(ProcessingTask.objects.count(), 2)
+
+        stats = cleanup_old_tasks_periodic()
+
+        self.assertEqual(stats['tasks'], 2)
+        self.assertTrue(stats['complete'])
+        self.assertFalse(ProcessingTask.objects.exists())
+
+    @override_settings(CLEANUP_MAX_AGE_HOURS=1, TASK_STATE_URL='memory://')
+    def test_runs_are_skipped_while_another_holds_the_lock(self):
+        with cleanup_lock(60) as acquired:
+            self.assertTrue(acquired)
+            with self.assertLogs('processor.tasks', 'INFO'):
+                self.assertIsNone(cleanup_old_tasks_periodic())
+            self.assertEqual(ProcessingTask.objects.count(), 5)
+
+        self.assertEqual(cleanup_old_tasks_periodic()['tasks'], 5)
+
+    @override_settings(TASK_STATE_URL='memory://')
+    def test_lock_is_not_taken_when_the_store_is_down(self):
+        with (
+            mock.patch.object(get_store(), 'add', side_effect=ConnectionError),
+            self.assertLogs('processor.cleanup', 'WARNING'),
+            cleanup_lock(60) as acquired,
+        ):
+            self.assertFalse(acquired)
+
+    @override_settings(CLEANUP_MAX_AGE_HOURS=1, CLEANUP_TIME_BUDGET_SECONDS=0)
+    def test_exhausted_time_budget_stops_before_deleting(self):
+        stats = cleanup_old_tasks_periodic()
+
+        self.assertEqual(stats['tasks'], 0)
+        self.assertFalse(stats['complete'])
+        self.assertEqual(ProcessingTask.objects.count(), 5)
+
+
+class DeleteStoredFilesTests(TestCase):
+    def test_deletes_existing_files_and_skips_missing_ones(self):
+        names = [
+            default_storage.save(f'processed/delete-{index}.png', ContentFile(b'png'))
+            for index in range(3)
+        ]
+        for name in names:
+            self.addCleanup(discard_staged, name)
+
+        deleted = delete_stored_files([*names, 'processed/missing.png', ''], workers=2)
+
+        self.assertEqual(deleted, 3)
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+
+
+@override_settings(RESULT_CACHE_TTL_HOURS=24, RESULT_CACHE_MAX_ENTRIES=10)
+class ResultCacheEvictionTests(TestCase):
+    def setUp(self):
+        self.result_key = default_storage.save(
+            'processed/cached-result.png', ContentFile(b'result')
+        )
+        self.addCleanup(discard_staged, self.result_key)
+        self.result_url = default_storage.url(self.result_key)
+
+        old_task = ProcessingTask.objects.create(
+            task_id='old-cached-task', status='completed', result_url=self.result_url
+        )
+        old_task.created_at = timezone.now() - timedelta(hours=25)
+        old_task.save()
+
+    def test_cleanup_keeps_files_still_referenced_by_cache(self):
+        CachedResult.objects.create(content_hash='a' * 64, result_url=self.result_url)
+
+        call_command('cleanup_old_tasks', '--hours=24')
+
+        self.assertFalse(ProcessingTask.objects.exists())
+        self.assertTrue(default_storage.exists(self.result_key))
+
+    def test_cleanup_keeps_files_referenced_by_recent_cache_hits(self):
+        ProcessingTask.objects.create(
+            task_id='recent-cache-hit', status='completed', result_url=self.result_url
+        )
+
+        call_command('cleanup_old_tasks', '--hours=24')
+
+        self.assertTrue(default_storage.exists(self.result_key))
+
+    def test_cleanup_evicts_expired_entries_and_deletes_their_files(self):
+        CachedResult.objects.create(
+            content_hash='b' * 64,
+            result_url=self.result_url,
+            last_used_at=timezone.now() - timedelta(hours=25),
+        )
+
+        call_command('cleanup_old_tasks', '--hours=24')
+
+        self.assertFalse(CachedResult.objects.exists())
+        self.assertFalse(default_storage.exists(self.result_key))
+
+    @override_settings(RESULT_CACHE_MAX_ENTRIES=1)
+    def test_cleanup_evicts_least_recently_used_entries_over_limit(self):
+        CachedResult.objects.create(
+            content_hash='c' * 64,
+            result_url='/media/processed/older.png',
+            last_used_at=timezone.now() - timedelta(hours=2),
+        )
+        CachedResult.objects.create(
+            content_hash='d' * 64,
+            result_url=self.result_url,
+            last_used_at=timezone.now(),
+        )
+
+        call_command('cleanup_old_tasks', '--hours=24')
+
+        self.assertEqual(
+            list(CachedResult.objects.values_list('content_hash', flat=True)),
+            ['d' * 64],
+        )
+        self.assertTrue(default_storage.exists(self.result_key))
+
+    def test_eviction_counts_against_the_row_and_time_budgets(self):
+        CachedResult.objects.bulk_create(
+            CachedResult(
+                content_hash=f'{index:064x}',
+                result_url=f'/media/processed/stale-{index}.png',
+                last_used_at=timezone.now() - timedelta(hours=25 + index),
+            )
+            for index in range(5)
+        )
+        cutoff_time = timezone.now() - timedelta(hours=24)
+
+        stats = cleanup_old_tasks(cutoff_time, chunk_size=2, max_rows=3)
+
+        self.assertEqual((stats['evicted'], stats['tasks']), (3, 0))
+        self.assertFalse(stats['complete'])
+        self.assertEqual(
+            sorted(CachedResult.objects.values_list('result_url', flat=True)),
+            ['/media/processed/stale-0.png', '/media/processed/stale-1.png'],
+        )
+
+        stats = cleanup_old_tasks(cutoff_time, time_budget=0)
+
+        self.assertEqual((stats['evicted'], stats['tasks']), (0, 0))
+        self.assertEqual(CachedResult.objects.count(), 2)
+
+        stats = cleanup_old_tasks(cutoff_time)
+
+        self.assertEqual((stats['evicted'], stats['tasks']), (2, 1))
+        self.assertTrue(stats['complete'])
@@ -0,0 +1,187 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from processor import coalescing, task_state
+from processor.admission import Rejection
+from processor.events import subscribe_task
+from processor.models import ProcessingTask
+from processor.tests.test_routing import make_upload
+
+COALESCING = {
+    'TASK_STATE_URL': 'memory://',
+    'TASK_EVENTS_URL': 'memory://',
+    'COALESCE_UPLOADS': True,
+    'COALESCE_TTL': 60,
+}
+
+
+def clear_store(test):
+    task_state.get_store().clear()
+    test.addCleanup(task_state.get_store().clear)
+
+
+@override_settings(**COALESCING)
+class InFlightMarkerTests(SimpleTestCase):
+    def setUp(self):
+        clear_store(self)
+
+    def test_second_claim_returns_the_leader(self):
+        self.assertIsNone(coalescing.claim('hash-a', 'task-1'))
+        self.assertEqual(coalescing.claim('hash-a', 'task-2'), 'task-1')
+        self.assertIsNone(coalescing.claim('hash-b', 'task-3'))
+
+    def test_only_the_leader_releases_the_marker(self):
+        coalescing.claim('hash-a', 'task-1')
+
+        coalescing.release('hash-a', 'task-2')
+        self.assertEqual(coalescing.claim('hash-a', 'task-3'), 'task-1')
+
+        coalescing.release('hash-a', 'task-1')
+        self.assertIsNone(coalescing.claim('hash-a', 'task-3'))
+
+    @override_settings(COALESCE_TTL=0)
+    def test_marker_expires(self):
+        coalescing.claim('hash-a', 'task-1')
+
+        self.assertIsNone(coalescing.claim('hash-a', 'task-2'))
+
+    @override_settings(TASK_STATE_URL='')
+    def test_disabled_without_a_store(self):
+        coalescing.claim('hash-a', 'task-1')
+
+        self.assertIsNone(coalescing.claim('hash-a', 'task-2'))
+
+
+@override_settings(RESULT_CACHE_ENABLED=False, ADMISSION_ENABLED=False, **COALESCING)
+@mock.patch('processor.views.process_image_task.apply_async')
+class CoalescedUploadTests(TestCase):
+    def setUp(self):
+        clear_store(self)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def upload(self):
+        return self.client.post(reverse('home'), {'image': make_upload()}).json()
+
+    def test_identical_uploads_run_once(self, apply_async):
+        leader = self.upload()
+        follower = self.upload()
+
+        apply_async.assert_called_once()
+        self.assertEqual(follower['coalesced_with'], leader['task_id'])
+        self.assertEqual(
+            ProcessingTask.objects.get(task_id=follower['task_id']).input_key, ''
+        )
+
+    def test_followers_complete_with_the_leader(self, apply_async):
+        leader = ProcessingTask.objects.get(task_id=self.upload()['task_id'])
+        follower_id = self.upload()['task_id']
+
+        with subscribe_task(follower_id) as receive:
+            leader.mark_completed('/media/processed/leader.png')
+            event = receive(1)
+
+        self.assertEqual(event['result_url'], '/media/processed/leader.png')
+        follower = ProcessingTask.objects.get(task_id=follower_id)
+        self.assertEqual(follower.status, 'completed')
+        self.assertIsNotNone(follower.completed_at)
+        response = self.client.get(reverse('task_status', args=[follower_id]))
+        self.assertEqual(response.json()['result_url'], '/media/processed/leader.png')
+
+    def test_followers_fail_with_the_leader(self, apply_async):
+        leader = ProcessingTask.objects.get(task_id=self.upload()['task_id'])
+        follower_id = self.upload()['task_id']
+
+        leader.mark_failed('boom')
+
+        follower = ProcessingTask.objects.get(task_id=follower_id)
+        self.assertEqual(follower.status, 'failed')
+        self.assertEqual(follower.error_message, 'boom')
+
+    def test_finished_leader_releases_the_input(self, apply_async):
+        leader = ProcessingTask.objects.get(task_id=self.upload()['task_id'])
+        leader.mark_completed('/media/processed/leader.png')
+
+        self.assertNotIn('coalesced_with', self.upload())
+        self.assertEqual(apply_async.call_count, 2)
+
+    def test_follower_stored_after_the_leader_finished_is_settled(self, apply_async):
+        leader = ProcessingTask.objects.create(
+            task_id='done-leader', status='completed', result_url='/media/x.png'
+        )
+        follower = ProcessingTask.objects.create(
+            task_id='late-follower', leader_id=leader.task_id
+        )
+
+        ProcessingTask.settle_followers([follower])
+
+        follower.refresh_from_db()
+        self.assertEqual(follower.status, 'completed')
+        self.assertEqual(follower.result_url, '/media/x.png')
+
+    def test_rejected_upload_does_not_lead(self, apply_async):
+        busy = Rejection(503, 'Server busy, try again later', 5)
+        with mock.patch('processor.views._check_capacity', return_value=(busy, 5)):
+            response = self.client.post(reverse('home'), {'image': make_upload()})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertNotIn('coalesced_with', self.upload())
+
+    def test_followers_fail_when_the_leader_cannot_be_enqueued(self, apply_async):
+        def attach_follower_and_fail(**kwargs):
+            ProcessingTask.objects.create(
+                task_id='early-follower', leader_id=kwargs['task_id']
+            )
+            raise ConnectionError('broker down')
+
+        apply_async.side_effect = attach_follower_and_fail
+        with self.assertRaises(ConnectionError):
+            self.client.post(reverse('home'), {'image': make_upload()})
+
+        follower = ProcessingTask.objects.get(task_id='early-follower')
+        self.assertEqual(follower.status, 'failed')
+        self.assertEqual(
+            ProcessingTask.objects.get(task_id=follower.leader_id).status, 'failed'
+        )
+        apply_async.side_effect = None
+        self.assertNotIn('coalesced_with', self.upload())
+
+    def test_follower_of_an_abandoned_leader_is_settled(self, apply_async):
+        ProcessingTask.abandon_leader('lost-leader', 'some-hash')
+        follower = ProcessingTask.objects.create(
+            task_id='late-follower', leader_id='lost-leader'
+        )
+
+        ProcessingTask.settle_followers([follower])
+
+        follower.refresh_from_db()
+        self.assertEqual(follower.status, 'failed')
+
+    def test_failed_batch_releases_claims_and_staged_inputs(self, apply_async):
+        with mock.patch('processor.views.group') as group:
+            group.return_value.apply_async.side_effect = ConnectionError('broker down')
+            with self.assertRaises(ConnectionError):
+                self.client.post(reverse('batch_upload'), {'images': [make_upload()]})
+
+        (leader,) = ProcessingTask.objects.all()
+        self.assertEqual(leader.status, 'failed')
+        self.assertFalse(default_storage.exists(leader.input_key))
+        self.assertNotIn('coalesced_with', self.upload())
+
+    def test_batch_duplicates_are_coalesced(self, apply_async):
+        with mock.patch('processor.views.group') as group:
+            response = self.client.post(
+                reverse('batch_upload'),
+                {'images': [make_upload('a.png'), make_upload('b.png')]},
+            )
+
+        tasks = response.json()['tasks']
+        self.assertEqual(len(group.call_args.args[0]), 1)
+        follower = ProcessingTask.objects.get(task_id=tasks[1]['task_id'])
+        self.assertEqual(follower.leader_id, tasks[0]['task_id'])
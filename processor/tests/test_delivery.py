@@ -0,0 +1,170 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, override_settings
+
+from processor.delivery import delivery_url, with_delivery_url
+from processor.storage_backends import ResultsGoogleCloudStorage
+
+CONTENT = bytes(range(256)) * 4
+
+
+class LocalResultTests(SimpleTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.url = default_storage.url(
+            default_storage.save('processed/result.png', ContentFile(CONTENT))
+        )
+
+    def test_result_is_served_with_immutable_caching(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, headers={'Range': 'bytes=100-199'})
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/1024')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[100:200])
+
+        suffix = self.client.get(self.url, headers={'Range': 'bytes=-24'})
+        self.assertEqual(b''.join(suffix.streaming_content), CONTENT[-24:])
+
+        unsatisfiable = self.client.get(self.url, headers={'Range': 'bytes=2000-'})
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable['Content-Range'], 'bytes */1024')
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        response = self.client.get(
+            self.url, headers={'Range': 'bytes=0-9', 'If-Range': '"old"'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_revalidation_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(RESULT_ACCEL_REDIRECT='/protected-media/')
+    def test_accel_redirect_hands_the_file_to_nginx(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/processed/result.png'
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_only_existing_results_are_served(self):
+        default_storage.save('uploads/input.png', ContentFile(b'staged'))
+
+        for url in (
+            '/media/processed/missing.png',
+            '/media/processed/../uploads/input.png',
+            '/media/processed/%2E%2E/uploads/input.png',
+        ):
+            self.assertEqual(self.client.get(url).status_code, 404, url)
+
+
+class DeliveryUrlTests(SimpleTestCase):
+    def setUp(self):
+        self.enterContext(
+            mock.patch.dict('processor.delivery._signed_urls', clear=True)
+        )
+
+    def test_stored_url_is_used_without_signing(self):
+        self.assertEqual(
+            delivery_url('/media/processed/a.png'), '/media/processed/a.png'
+        )
+
+    @override_settings(RESULT_SIGNED_URL_TTL=600)
+    def test_gcs_results_get_signed_urls(self):
+        signer = mock.Mock()
+        signer.url.return_value = (
+            'https://storage.googleapis.com/b/processed/a.png?X-Goog-Signature=s'
+        )
+
+        with (
+            mock.patch('processor.delivery.is_gcs_storage', return_value=True),
+            mock.patch('processor.delivery._signing_storage', return_value=signer),
+            mock.patch(
+                'processor.delivery.storage_name_from_url',
+                return_value='processed/a.png',
+            ),
+        ):
+            payload = with_delivery_url(
+                {
+                    'status': 'completed',
+                    'result_url': 'https://storage.googleapis.com/b/processed/a.png',
+                }
+            )
+
+        signer.url.assert_called_once_with('processed/a.png')
+        self.assertIn('X-Goog-Signature', payload['result_url'])
+
+    @override_settings(RESULT_SIGNED_URL_TTL=600)
+    def test_signing_errors_fall_back_to_the_stored_url(self):
+        with (
+            mock.patch('processor.delivery.is_gcs_storage', return_value=True),
+            mock.patch('processor.delivery._signing_storage', side_effect=OSError),
+        ):
+            self.assertEqual(
+                delivery_url('https://x/processed/a.png'), 'https://x/processed/a.png'
+            )
+
+    @override_settings(RESULT_SIGNED_URL_TTL=600)
+    def test_signed_urls_are_reused_for_half_their_ttl(self):
+        signer = mock.Mock()
+        signer.url.side_effect = lambda name: (
+            f'https://x/{name}?sig={signer.url.call_count}'
+        )
+        self.enterContext(
+            mock.patch('processor.delivery.is_gcs_storage', return_value=True)
+        )
+        self.enterContext(
+            mock.patch('processor.delivery._signing_storage', return_value=signer)
+        )
+        clock = self.enterContext(
+            mock.patch('processor.delivery.time.monotonic', return_value=1000)
+        )
+
+        first = delivery_url('/media/processed/a.png')
+        again = delivery_url('/media/processed/a.png')
+        other = delivery_url('/media/processed/b.png')
+        clock.return_value = 1300
+        renewed = delivery_url('/media/processed/a.png')
+
+        self.assertEqual(again, first)
+        self.assertNotIn(other, (first, renewed))
+        self.assertNotEqual(renewed, first)
+        self.assertEqual(signer.url.call_count, 3)
+
+
+class ResultsGoogleCloudStorageTests(SimpleTestCase):
+    @override_settings(RESULT_CACHE_CONTROL='public, max-age=60')
+    def test_only_results_are_stored_with_result_caching(self):
+        storage = ResultsGoogleCloudStorage(
+            bucket_name='bucket', location='media', object_parameters={'metadata': {}}
+        )
+
+        result = storage.get_object_parameters(
+            storage._normalize_name('processed/a.png')
+        )
+        staged = storage.get_object_parameters(storage._normalize_name('uploads/a.png'))
+
+        self.assertEqual(
+            result, {'metadata': {}, 'cache_control': 'public, max-age=60'}
+        )
+        self.assertEqual(staged, {'metadata': {}})
@@ -0,0 +1,95 @@
+import io
+import shutil
+import tempfile
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from processor.encoding import available_formats, encode_image, parse_output_options
+from processor.models import ProcessingTask
+from processor.tasks import save_result_image
+
+
+def make_cutout():
+    image = Image.new('RGBA', (40, 30), (200, 80, 40, 0))
+    image.paste((200, 80, 40, 255), (10, 5, 30, 25))
+    return image
+
+
+class OutputOptionsTests(SimpleTestCase):
+    def test_defaults_to_png(self):
+        self.assertEqual(
+            parse_output_options({}),
+            {'format': 'png', 'mask_only': False, 'encoder': {}},
+        )
+
+    def test_only_options_for_the_chosen_format_are_kept(self):
+        output = parse_output_options(
+            {'format': 'WEBP', 'quality': '80', 'compress_level': '9', 'mask_only': '1'}
+        )
+
+        self.assertEqual(output['format'], 'webp')
+        self.assertTrue(output['mask_only'])
+        self.assertEqual(output['encoder'], {'quality': 80})
+
+    def test_invalid_options_are_rejected(self):
+        for data in (
+            {'format': 'gif'},
+            {'format': 'webp', 'quality': '0'},
+            {'format': 'webp', 'quality': 'high'},
+            {'compress_level': '10'},
+        ):
+            with self.subTest(data=data), self.assertRaises(ValueError):
+                parse_output_options(data)
+
+    def test_encoded_images_round_trip(self):
+        for output_format in available_formats():
+            with self.subTest(output_format=output_format):
+                data, extension = encode_image(make_cutout(), output_format)
+
+                self.assertEqual(extension, f'.{output_format}')
+                decoded = Image.open(io.BytesIO(data))
+                self.assertEqual(decoded.size, (40, 30))
+
+    def test_lossless_webp_keeps_alpha(self):
+        data, _ = encode_image(make_cutout(), 'webp', {'lossless': True})
+
+        decoded = Image.open(io.BytesIO(data)).convert('RGBA')
+        self.assertEqual(decoded.getpixel((0, 0))[3], 0)
+        self.assertEqual(decoded.getpixel((20, 15))[3], 255)
+
+
+class SaveResultImageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def test_mask_only_stores_single_channel_alpha(self):
+        task = ProcessingTask.objects.create(task_id='mask-task', mask_only=True)
+
+        result_url = save_result_image(task, make_cutout())
+
+        self.assertTrue(result_url.endswith('processed/mask-task.png'))
+        with default_storage.open('processed/mask-task.png') as stored:
+            mask = Image.open(stored)
+            mask.load()
+        self.assertEqual(mask.mode, 'L')
+        self.assertEqual(mask.size, (40, 30))
+
+
+class UploadOutputOptionsTests(TestCase):
+    def test_invalid_output_format_is_rejected(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (20, 20)).save(buffer, format='PNG')
+        upload = SimpleUploadedFile(
+            'a.png', buffer.getvalue(), content_type='image/png'
+        )
+
+        response = self.client.post(reverse('home'), {'image': upload, 'format': 'bmp'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ProcessingTask.objects.exists())
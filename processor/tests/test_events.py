@@ -0,0 +1,95 @@
+import threading
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from processor.events import publish_task_status, subscribe_task
+from processor.models import ProcessingTask
+
+
+@override_settings(TASK_EVENTS_URL='memory://')
+class TaskEventPublishingTests(TestCase):
+    def test_mark_methods_publish_transitions(self):
+        task = ProcessingTask.objects.create(task_id='events-task', status='pending')
+
+        with subscribe_task('events-task') as receive:
+            task.mark_processing()
+            task.mark_completed('/media/processed/events-task.png')
+
+            self.assertEqual(receive(1)['status'], 'processing')
+            completed = receive(1)
+
+        self.assertEqual(completed['status'], 'completed')
+        self.assertEqual(completed['result_url'], '/media/processed/events-task.png')
+
+    def test_receive_times_out_without_transitions(self):
+        with subscribe_task('quiet-task') as receive:
+            self.assertIsNone(receive(0.01))
+
+
+@override_settings(TASK_EVENTS_URL='memory://', TASK_EVENTS_HEARTBEAT=0.05)
+class TaskStatusStreamingTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.task = ProcessingTask.objects.create(
+            task_id='stream-task', status='pending'
+        )
+
+    def _publish_later(self, payload, delay=0.2):
+        timer = threading.Timer(
+            delay, publish_task_status, args=('stream-task', payload)
+        )
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+    def test_event_stream_for_finished_task_sends_one_event(self):
+        self.task.mark_completed('/media/processed/stream-task.png')
+
+        response = self.client.get(reverse('task_events', args=['stream-task']))
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('event: status'), 1)
+        self.assertIn('"status": "completed"', body)
+
+    def test_event_stream_pushes_transitions_until_terminal(self):
+        self._publish_later(
+            {'status': 'completed', 'result_url': '/media/x.png', 'error': ''}
+        )
+
+        response = self.client.get(reverse('task_events', args=['stream-task']))
+        body = b''.join(response.streaming_content).decode()
+
+        self.assertLess(body.index('"pending"'), body.index('"completed"'))
+
+    def test_event_stream_for_unknown_task_returns_404(self):
+        response = self.client.get(reverse('task_events', args=['missing']))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_long_poll_returns_on_transition(self):
+        self._publish_later(
+            {'status': 'processing', 'result_url': '', 'error': ''}, delay=0.1
+        )
+
+        response = self.client.get(
+            reverse('task_status', args=['stream-task']), {'wait': 5}
+        )
+
+        self.assertEqual(response.json()['status'], 'processing')
+
+    def test_long_poll_returns_immediately_when_status_differs(self):
+        response = self.client.get(
+            reverse('task_status', args=['stream-task']),
+            {'wait': 5, 'since': 'processing'},
+        )
+
+        self.assertEqual(response.json()['status'], 'pending')
+
+    def test_long_poll_times_out_with_current_status(self):
+        response = self.client.get(
+            reverse('task_status', args=['stream-task']), {'wait': 0.1}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'pending')
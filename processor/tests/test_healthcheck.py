@@ -0,0 +1,82 @@
+import importlib.util
+import threading
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+script = Path(__file__).resolve().parents[2] / 'scripts' / 'celery_healthcheck.py'
+spec = importlib.util.spec_from_file_location('celery_healthcheck', script)
+healthcheck = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(healthcheck)
+
+
+class InferenceServerSupervisionTests(SimpleTestCase):
+    def setUp(self):
+        self.enterContext(
+            mock.patch.dict(healthcheck.inference_server, process=None, restarts=0)
+        )
+        self.enterContext(
+            mock.patch.object(healthcheck, 'INFERENCE_SERVER_RESTART_DELAY', 0)
+        )
+        self.stopping = threading.Event()
+        self.addCleanup(self.stopping.set)
+
+    def dead_server(self):
+        return mock.Mock(pid=1, exitcode=1, **{'is_alive.return_value': False})
+
+    def live_server(self):
+        server = mock.Mock(pid=2, exitcode=None, **{'is_alive.return_value': True})
+        server.join.side_effect = lambda: self.stopping.wait()
+        return server
+
+    def test_exited_server_is_restarted(self):
+        replacement = self.live_server()
+        healthcheck.inference_server['process'] = self.dead_server()
+
+        def spawn():
+            healthcheck.inference_server['process'] = replacement
+
+        supervisor = threading.Thread(
+            target=healthcheck.supervise_inference_server, args=(self.stopping,)
+        )
+        with (
+            mock.patch.object(healthcheck, 'spawn_inference_server', spawn),
+            self.assertLogs(healthcheck.logger, 'ERROR'),
+        ):
+            supervisor.start()
+            for _ in range(100):
+                if replacement.join.called:
+                    break
+                self.stopping.wait(0.05)
+            self.stopping.set()
+            supervisor.join(timeout=5)
+
+        self.assertFalse(supervisor.is_alive())
+        self.assertIs(healthcheck.inference_server['process'], replacement)
+        self.assertEqual(healthcheck.inference_server['restarts'], 1)
+
+    def test_server_is_not_restarted_while_stopping(self):
+        spawn = self.enterContext(
+            mock.patch.object(healthcheck, 'spawn_inference_server')
+        )
+        healthcheck.inference_server['process'] = self.dead_server()
+        self.stopping.set()
+
+        healthcheck.supervise_inference_server(self.stopping)
+
+        spawn.assert_not_called()
+
+    @mock.patch.dict(healthcheck.startup, consuming=True, concurrency=1)
+    @mock.patch('processor.warmup.ready_processes', return_value={1: {}})
+    def test_worker_is_ready_only_while_the_server_runs(self, ready_processes):
+        healthcheck.inference_server['process'] = self.live_server()
+        self.enterContext(mock.patch.dict('os.environ', WORKER_READY_DIR='/tmp'))
+
+        self.assertTrue(healthcheck.readiness()['ready'])
+
+        healthcheck.inference_server['process'] = self.dead_server()
+        report = healthcheck.readiness()
+
+        self.assertFalse(report['ready'])
+        self.assertEqual(report['inference_server'], {'alive': False, 'restarts': 0})
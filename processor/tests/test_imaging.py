@@ -0,0 +1,68 @@
+from django.test import SimpleTestCase, override_settings
+from PIL import Image, ImageChops, ImageDraw
+
+from processor.imaging import apply_mask, remove_background, select_mode
+
+
+class CircleSession:
+    """Stands in for a rembg session: the foreground is a centered circle."""
+
+    def __init__(self):
+        self.predicted_sizes = []
+
+    def predict(self, img):
+        self.predicted_sizes.append(img.size)
+        mask = Image.new('L', img.size, 0)
+        width, height = img.size
+        ImageDraw.Draw(mask).ellipse(
+            (width // 4, height // 4, 3 * width // 4, 3 * height // 4), fill=255
+        )
+        return [mask]
+
+
+def make_image(size):
+    image = Image.new('RGB', size, (30, 90, 160))
+    width, height = size
+    ImageDraw.Draw(image).ellipse(
+        (width // 4, height // 4, 3 * width // 4, 3 * height // 4),
+        fill=(240, 200, 40),
+    )
+    return image
+
+
+@override_settings(INFERENCE_MAX_SIDE=256, INFERENCE_TILE_HEIGHT=64)
+class LargeImageInferenceTests(SimpleTestCase):
+    @override_settings(INFERENCE_MODE='auto', INFERENCE_LARGE_IMAGE_MEGAPIXELS=1)
+    def test_auto_mode_switches_to_tiled_above_threshold(self):
+        self.assertEqual(select_mode(Image.new('RGB', (800, 600))), 'full')
+        self.assertEqual(select_mode(Image.new('RGB', (1600, 1200))), 'tiled')
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            select_mode(Image.new('RGB', (10, 10)), 'fastest')
+
+    def test_segmentation_runs_on_downscaled_copy(self):
+        session = CircleSession()
+
+        output = remove_background(make_image((1024, 768)), session, 'downscale')
+
+        self.assertEqual(session.predicted_sizes, [(256, 192)])
+        self.assertEqual(output.size, (1024, 768))
+        self.assertEqual(output.mode, 'RGBA')
+
+    def test_refined_mask_follows_foreground(self):
+        output = remove_background(make_image((1024, 768)), CircleSession(), 'tiled')
+        alpha = output.getchannel('A')
+
+        self.assertEqual(alpha.getpixel((512, 384)), 255)
+        self.assertEqual(alpha.getpixel((10, 10)), 0)
+
+    def test_tiled_output_matches_single_pass(self):
+        image = make_image((640, 480))
+        mask = CircleSession().predict(image.resize((160, 120)))[0]
+
+        single_pass = apply_mask(image, mask, tile_height=image.height)
+        tiled = apply_mask(image, mask, tile_height=64)
+
+        difference = ImageChops.difference(single_pass, tiled).getextrema()
+        self.assertTrue(all(high <= 2 for _, high in difference))
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from processor import inference_server
+from processor.tests.test_imaging import CircleSession
+
+
+def cutout(image, session, mode=None):
+    # rembg run from a non-main thread keeps the test process alive at exit
+    output = image.convert('RGBA')
+    output.putalpha(session.predict(image)[0])
+    return output
+
+
+class InferenceServerTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.session = CircleSession()
+        patcher = mock.patch(
+            'processor.sessions.get_session', side_effect=cls.session_for
+        )
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+        patcher = mock.patch('processor.imaging.remove_background', cutout)
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+
+        directory = tempfile.mkdtemp()
+        cls.address = os.path.join(directory, 'inference.sock')
+        ready = threading.Event()
+        threading.Thread(
+            target=inference_server.serve, args=(cls.address, ready), daemon=True
+        ).start()
+        ready.wait(5)
+
+    @classmethod
+    def session_for(cls, model_name=None):
+        if model_name == 'broken':
+            raise ValueError('Unknown model "broken"')
+        return cls.session
+
+    def remove(self, image, model_name=None):
+        with override_settings(INFERENCE_SERVER_ADDRESS=self.address):
+            return inference_server.remote_remove_background(image, model_name, 'full')
+
+    def test_returns_cutout_of_the_same_size(self):
+        output = self.remove(Image.new('RGB', (64, 48), 'red'))
+
+        self.assertEqual(output.mode, 'RGBA')
+        self.assertEqual(output.size, (64, 48))
+        self.assertEqual(output.getpixel((32, 24)), (255, 0, 0, 255))
+        self.assertEqual(output.getpixel((0, 0))[3], 0)
+
+    def test_connection_is_reused_across_requests(self):
+        for size in ((16, 16), (40, 30), (16, 16)):
+            self.assertEqual(self.remove(Image.new('L', size)).size, size)
+
+        key = (self.address, os.getpid())
+        self.assertEqual(
+            [address for address, _ in inference_server._clients].count(self.address),
+            1,
+        )
+        self.assertIsNotNone(inference_server._clients[key]._connection)
+
+    def test_server_errors_are_raised_in_the_worker(self):
+        with self.assertRaisesRegex(RuntimeError, 'Unknown model'):
+            self.remove(Image.new('RGB', (8, 8)), 'broken')
+
+        # The connection stays usable after a failed request
+        self.assertEqual(self.remove(Image.new('RGB', (8, 8))).size, (8, 8))
+
+    @mock.patch('processor.tasks.get_session')
+    def test_tasks_use_the_server_when_configured(self, get_session):
+        from processor.tasks import run_inference
+
+        with override_settings(INFERENCE_SERVER_ADDRESS=self.address):
+            output = run_inference(Image.new('RGB', (20, 10)), None)
+
+        self.assertEqual(output.size, (20, 10))
+        get_session.assert_not_called()
+
+    @mock.patch('processor.tasks.remove_background', cutout)
+    @mock.patch('processor.tasks.get_session')
+    @mock.patch('processor.inference_server.os.statvfs')
+    def test_images_too_large_for_shared_memory_run_in_process(
+        self, statvfs, get_session
+    ):
+        from processor.tasks import run_inference
+
+        get_session.return_value = self.session
+        statvfs.return_value = mock.Mock(f_bavail=10, f_frsize=4096)
+
+        with (
+            override_settings(INFERENCE_SERVER_ADDRESS=self.address),
+            self.assertLogs('processor.tasks', 'WARNING'),
+        ):
+            output = run_inference(Image.new('RGB', (200, 100)), None)
+
+        self.assertEqual(output.size, (200, 100))
+        get_session.assert_called_once_with(None)
+        self.assertTrue(inference_server.fits_shared_memory(Image.new('RGB', (64, 64))))
@@ -0,0 +1,83 @@
+import time
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from prometheus_client import REGISTRY
+
+from processor.metrics import collect_stage_timings, observe_stage
+from processor.models import ProcessingTask
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class MetricsTests(TestCase):
+    def test_metrics_endpoint_exports_pipeline_metrics(self):
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        for name in (
+            'processor_queue_wait_seconds',
+            'processor_stage_seconds',
+            'processor_input_megapixels',
+            'processor_output_bytes',
+            'processor_task_status_total',
+        ):
+            self.assertIn(f'# TYPE {name}', body)
+
+    def test_status_transitions_are_counted(self):
+        task = ProcessingTask.objects.create(task_id='metrics-task')
+        before = sample('processor_task_status_total', status='completed')
+
+        task.mark_completed('/media/processed/metrics-task.png')
+
+        self.assertEqual(
+            sample('processor_task_status_total', status='completed'), before + 1
+        )
+
+    def test_queue_wait_is_observed_once_when_processing_starts(self):
+        task = ProcessingTask.objects.create(task_id='queued-task')
+        ProcessingTask.objects.filter(pk=task.pk).update(
+            created_at=timezone.now() - timedelta(seconds=5)
+        )
+        task.refresh_from_db()
+        count = sample('processor_queue_wait_seconds_count')
+        total = sample('processor_queue_wait_seconds_sum')
+
+        task.mark_processing()
+        task.mark_failed('boom')
+        task.mark_processing()  # A retry does not count as queue wait again
+
+        self.assertEqual(sample('processor_queue_wait_seconds_count'), count + 1)
+        self.assertGreaterEqual(sample('processor_queue_wait_seconds_sum') - total, 5)
+
+    def test_observe_stage_records_duration(self):
+        before = sample('processor_stage_seconds_count', stage='encode')
+
+        with observe_stage('encode'):
+            pass
+
+        self.assertEqual(
+            sample('processor_stage_seconds_count', stage='encode'), before + 1
+        )
+
+    def test_stage_timings_are_collected_per_block(self):
+        with collect_stage_timings() as timings:
+            with observe_stage('encode'):
+                time.sleep(0.01)
+            with observe_stage('encode'):
+                pass
+            with observe_stage('decode'):
+                pass
+
+        with observe_stage('encode'):  # Outside the collection
+            time.sleep(0.01)
+
+        self.assertEqual(set(timings), {'encode', 'decode'})
+        self.assertGreaterEqual(timings['encode'], 10)
+        self.assertLess(timings['encode'], 20)
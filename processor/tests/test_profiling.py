@@ -0,0 +1,68 @@
+import pstats
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from processor.models import ProcessingTask
+from processor.profiling import profile_name
+from processor.tasks import process_image_task
+from processor.tests.test_uploads import make_upload
+
+
+def cutout(input_image, model_name):
+    return input_image.convert('RGBA')
+
+
+@override_settings(TASK_STATE_URL='', ADMISSION_URL='')
+@mock.patch('processor.tasks.run_inference', cutout)
+class TaskTimingTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.task = ProcessingTask.objects.create(task_id='timed-task')
+        self.key = default_storage.save('uploads/timed.png', make_upload())
+
+    def run_task(self):
+        return process_image_task.apply(args=(self.key, 'timed-task')).result
+
+    def test_stage_timings_are_stored_and_logged(self):
+        with self.assertLogs('processor.tasks', 'INFO') as logs:
+            self.assertEqual(self.run_task()['status'], 'completed')
+
+        self.task.refresh_from_db()
+        self.assertEqual(
+            set(self.task.timings), {'decode', 'encode', 'storage_save', 'total'}
+        )
+        self.assertGreaterEqual(self.task.timings['total'], self.task.timings['encode'])
+        completed = next(
+            r for r in logs.records if r.msg == 'Image processing completed'
+        )
+        self.assertEqual(completed.timings, self.task.timings)
+
+    def test_failed_attempts_keep_the_timings(self):
+        default_storage.delete(self.key)
+        default_storage.save(self.key, ContentFile(b'garbage'))
+
+        self.assertEqual(self.run_task()['status'], 'failed')
+
+        self.task.refresh_from_db()
+        self.assertIn('decode', self.task.timings)
+
+    def test_profiles_are_not_taken_by_default(self):
+        self.run_task()
+
+        self.assertFalse(default_storage.exists(profile_name('timed-task')))
+
+    @override_settings(TASK_PROFILE_SAMPLE_RATE=1.0)
+    def test_sampled_tasks_save_a_profile(self):
+        self.run_task()
+
+        with default_storage.open(profile_name('timed-task')) as profile:
+            path = profile.name
+        functions = {name for _, _, name in pstats.Stats(path).stats}
+        self.assertIn('open_staged_image', functions)
@@ -0,0 +1,101 @@
+from unittest import mock
+
+from celery.exceptions import Retry
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+
+from processor.models import ProcessingTask
+from processor.retries import is_transient, retry_delay
+from processor.staging import InvalidImageError, discard_staged, open_staged_image
+from processor.tasks import process_image_task
+from processor.tests.test_metrics import sample
+
+
+class RetryPolicyTests(SimpleTestCase):
+    def test_errors_are_classified(self):
+        for exc in (ConnectionError(), TimeoutError(), MemoryError(), RuntimeError()):
+            self.assertTrue(is_transient(exc), exc)
+        for exc in (
+            InvalidImageError(),
+            Image.DecompressionBombError(),
+            FileNotFoundError(),
+            ValueError(),
+        ):
+            self.assertFalse(is_transient(exc), exc)
+
+    @override_settings(TASK_RETRY_BACKOFF_BASE=10, TASK_RETRY_BACKOFF_MAX=300)
+    def test_backoff_doubles_with_jitter_up_to_the_cap(self):
+        for retries, low, high in ((0, 5, 10), (2, 20, 40), (10, 150, 300)):
+            delays = [retry_delay(retries) for _ in range(50)]
+            self.assertGreaterEqual(min(delays), low)
+            self.assertLessEqual(max(delays), high)
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_corrupt_input_raises_invalid_image(self):
+        key = default_storage.save('uploads/corrupt.png', ContentFile(b'not an image'))
+        self.addCleanup(default_storage.delete, key)
+
+        with self.assertRaises(InvalidImageError):
+            open_staged_image(key)
+
+
+@override_settings(TASK_STATE_URL='')
+class TaskRetryTests(TestCase):
+    def setUp(self):
+        self.task = ProcessingTask.objects.create(task_id='retry-task')
+        self.key = default_storage.save('uploads/retry.png', ContentFile(b'garbage'))
+        self.addCleanup(discard_staged, self.key)
+
+    def run_task(self):
+        return process_image_task.apply(args=(self.key, 'retry-task')).result
+
+    @mock.patch.object(process_image_task, 'retry')
+    def test_permanent_errors_fail_without_retrying(self, retry):
+        wasted = sample('processor_failed_attempt_seconds_total', outcome='failed')
+
+        result = self.run_task()
+
+        self.assertEqual(result['status'], 'failed')
+        retry.assert_not_called()
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'failed')
+        self.assertFalse(default_storage.exists(self.key))
+        self.assertGreater(
+            sample('processor_failed_attempt_seconds_total', outcome='failed'), wasted
+        )
+
+    @mock.patch.object(process_image_task, 'retry', side_effect=Retry())
+    @mock.patch('processor.tasks.open_staged_image', side_effect=ConnectionError)
+    def test_transient_errors_are_retried_with_backoff(self, open_staged, retry):
+        errors = sample(
+            'processor_task_errors_total',
+            classification='transient',
+            error_type='ConnectionError',
+        )
+
+        self.run_task()
+
+        self.assertGreater(retry.call_args.kwargs['countdown'], 0)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'retrying')
+        self.assertIn('ConnectionError', self.task.error_message)
+        self.assertTrue(default_storage.exists(self.key))  # Kept for the retry
+        self.assertEqual(
+            sample(
+                'processor_task_errors_total',
+                classification='transient',
+                error_type='ConnectionError',
+            ),
+            errors + 1,
+        )
+
+    @mock.patch.object(process_image_task, 'retry')
+    @mock.patch('processor.tasks.open_staged_image', side_effect=ConnectionError)
+    def test_transient_errors_fail_after_the_last_retry(self, open_staged, retry):
+        with mock.patch.object(process_image_task, 'max_retries', 0):
+            result = self.run_task()
+
+        self.assertEqual(result['status'], 'failed')
+        retry.assert_not_called()
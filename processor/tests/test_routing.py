@@ -0,0 +1,82 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from remove_bg.celery import app, route_task
+
+TASK_NAME = 'processor.tasks.process_image_task'
+
+
+def make_upload(name='photo.png'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (20, 20), 'blue').save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class RouteTaskTests(SimpleTestCase):
+    def test_jobs_are_routed_by_priority(self):
+        self.assertEqual(
+            route_task(TASK_NAME, (), {'priority': 'bulk'}, {}), {'queue': 'bulk'}
+        )
+        self.assertEqual(route_task(TASK_NAME, (), {}, {}), {'queue': 'interactive'})
+
+    @override_settings(INFERENCE_BATCH_ENABLED=True, INFERENCE_BATCH_QUEUE='batch')
+    def test_bulk_jobs_use_the_batched_queue_when_enabled(self):
+        self.assertEqual(
+            route_task(TASK_NAME, (), {'priority': 'bulk'}, {}), {'queue': 'batch'}
+        )
+        self.assertEqual(
+            route_task(TASK_NAME, (), {'priority': 'interactive'}, {}),
+            {'queue': 'interactive'},
+        )
+
+    def test_router_is_configured_on_the_app(self):
+        route = app.amqp.router.route({}, TASK_NAME, (), {'priority': 'bulk'})
+
+        self.assertEqual(route['queue'].name, 'bulk')
+
+    def test_periodic_cleanup_is_not_queued_behind_bulk_jobs(self):
+        route = app.amqp.router.route(
+            {}, 'processor.tasks.cleanup_old_tasks_periodic', (), {}
+        )
+
+        self.assertEqual(route['queue'].name, 'interactive')
+
+
+@mock.patch('processor.views.process_image_task.apply_async')
+class UploadPriorityTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def test_web_uploads_default_to_interactive(self, apply_async):
+        with override_settings(RESULT_CACHE_ENABLED=False):
+            response = self.client.post(reverse('home'), {'image': make_upload()})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            apply_async.call_args.kwargs['kwargs'], {'priority': 'interactive'}
+        )
+
+    def test_priority_can_be_requested(self, apply_async):
+        with override_settings(RESULT_CACHE_ENABLED=False):
+            self.client.post(
+                reverse('home'), {'image': make_upload(), 'priority': 'bulk'}
+            )
+
+        self.assertEqual(apply_async.call_args.kwargs['kwargs'], {'priority': 'bulk'})
+
+    def test_unknown_priority_is_rejected(self, apply_async):
+        response = self.client.post(
+            reverse('home'), {'image': make_upload(), 'priority': 'urgent'}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        apply_async.assert_not_called()
@@ -0,0 +1,47 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from processor import sessions
+
+
+class SessionRegistryTests(SimpleTestCase):
+    def setUp(self):
+        sessions._sessions.clear()
+        self.addCleanup(sessions._sessions.clear)
+
+    def test_importing_views_does_not_load_a_model(self):
+        import processor.views  # noqa: F401
+
+        self.assertEqual(sessions.loaded_models(), [])
+
+    @mock.patch('processor.sessions.new_session')
+    def test_session_is_loaded_once_per_process(self, new_session):
+        first = sessions.get_session('u2netp')
+        second = sessions.get_session('u2netp')
+
+        self.assertIs(first, second)
+        new_session.assert_called_once_with('u2netp')
+        self.assertEqual(sessions.loaded_models(), ['u2netp'])
+
+    @mock.patch('processor.sessions.new_session')
+    def test_public_names_map_to_rembg_sessions(self, new_session):
+        sessions.get_session('isnet')
+
+        new_session.assert_called_once_with('isnet-general-use')
+
+    @override_settings(REMBG_MODEL='silueta')
+    @mock.patch('processor.sessions.new_session')
+    def test_default_model_comes_from_settings(self, new_session):
+        sessions.get_session()
+
+        new_session.assert_called_once_with('silueta')
+
+    def test_unknown_model_is_rejected(self):
+        with self.assertRaises(ValueError):
+            sessions.resolve_model_name('not-a-model')
+
+    @override_settings(REMBG_MODELS=['u2net'])
+    def test_disabled_model_is_rejected(self):
+        with self.assertRaises(ValueError):
+            sessions.resolve_model_name('u2netp')
@@ -0,0 +1,105 @@
+from unittest import mock
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from processor import task_state
+from processor.models import ProcessingBatch, ProcessingTask
+
+
+@override_settings(TASK_STATE_URL='memory://', TASK_STATE_TTL=60)
+class HotTaskStateTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        task_state.get_store().clear()
+        self.addCleanup(task_state.get_store().clear)
+        self.task = ProcessingTask.objects.create(task_id='hot-task')
+
+    def status(self):
+        return self.client.get(reverse('task_status', args=['hot-task'])).json()
+
+    def test_processing_is_not_written_to_the_database(self):
+        self.task.mark_processing()
+
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'pending')
+        self.assertEqual(self.status()['status'], 'processing')
+
+    def test_terminal_state_is_written_to_both(self):
+        self.task.mark_processing()
+        self.task.mark_completed('/media/processed/hot-task.png')
+
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'completed')
+        self.assertEqual(self.status()['result_url'], '/media/processed/hot-task.png')
+
+    def test_status_falls_back_to_the_database(self):
+        self.assertEqual(self.status()['status'], 'pending')
+
+        response = self.client.get(reverse('task_status', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(TASK_STATE_TTL=0)
+    def test_expired_state_is_ignored(self):
+        self.task.mark_processing()
+
+        self.assertEqual(self.status()['status'], 'pending')
+
+    def test_store_outage_writes_the_database(self):
+        with mock.patch.object(
+            task_state.InProcessStore, 'set', side_effect=ConnectionError
+        ):
+            self.task.mark_processing()
+
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'processing')
+
+    def test_failed_terminal_write_clears_the_transient_state(self):
+        self.task.mark_processing()
+
+        with (
+            mock.patch.object(
+                task_state.InProcessStore, 'set', side_effect=ConnectionError
+            ),
+            self.assertLogs('processor.task_state', 'WARNING'),
+        ):
+            self.task.mark_failed('Model crashed')
+
+        self.assertEqual(self.status()['status'], 'failed')
+
+    def test_batch_progress_counts_hot_processing_tasks(self):
+        batch = ProcessingBatch.objects.create(batch_id='hot-batch')
+        tasks = [
+            ProcessingTask.objects.create(task_id=f'hot-batch-{index}', batch=batch)
+            for index in range(3)
+        ]
+        tasks[0].mark_processing()
+        tasks[1].mark_processing()
+        tasks[1].mark_completed('/media/processed/hot-batch-1.png')
+
+        counts = batch.progress()['counts']
+
+        self.assertEqual(
+            counts,
+            {
+                'pending': 1,
+                'processing': 1,
+                'retrying': 0,
+                'completed': 1,
+                'failed': 0,
+            },
+        )
+
+
+@override_settings(TASK_STATE_URL='')
+class DisabledTaskStateTests(TestCase):
+    def test_every_transition_is_written_to_the_database(self):
+        task = ProcessingTask.objects.create(task_id='cold-task')
+
+        task.mark_processing()
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'processing')
+        self.assertEqual(
+            ProcessingTask.current_status('cold-task'), task.status_payload()
+        )
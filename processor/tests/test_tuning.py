@@ -0,0 +1,89 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from processor import tuning
+
+
+class CgroupCpuLimitTests(SimpleTestCase):
+    def setUp(self):
+        self.root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+    def test_reads_cgroup_v2_quota(self):
+        (self.root / 'cpu.max').write_text('250000 100000\n')
+
+        self.assertEqual(tuning.cgroup_cpu_limit(self.root), 2.5)
+
+    def test_unlimited_cgroup_v2_quota(self):
+        (self.root / 'cpu.max').write_text('max 100000\n')
+
+        self.assertIsNone(tuning.cgroup_cpu_limit(self.root))
+
+    def test_reads_cgroup_v1_quota(self):
+        (self.root / 'cpu').mkdir()
+        (self.root / 'cpu' / 'cpu.cfs_quota_us').write_text('400000\n')
+        (self.root / 'cpu' / 'cpu.cfs_period_us').write_text('100000\n')
+
+        self.assertEqual(tuning.cgroup_cpu_limit(self.root), 4)
+
+    def test_missing_cgroup_files_mean_no_limit(self):
+        self.assertIsNone(tuning.cgroup_cpu_limit(self.root))
+
+
+@override_settings(WORKER_CONCURRENCY='auto', ONNX_INTRA_OP_THREADS='auto')
+class AutoTuningTests(SimpleTestCase):
+    def test_auto_splits_cpus_between_processes(self):
+        for cpus, processes, threads in ((4, 2, 2), (7, 3, 2), (16, 8, 2)):
+            with (
+                self.subTest(cpus=cpus),
+                mock.patch.object(tuning, 'available_cpus', return_value=cpus),
+            ):
+                self.assertEqual(tuning.worker_concurrency(), processes)
+                self.assertEqual(tuning.onnx_thread_counts(), (threads, 1))
+
+    def test_auto_keeps_the_former_default_on_small_machines(self):
+        for cpus in (1, 2, 3):
+            with (
+                self.subTest(cpus=cpus),
+                mock.patch.object(tuning, 'available_cpus', return_value=cpus),
+            ):
+                self.assertEqual(tuning.worker_concurrency(), 2)
+                self.assertEqual(tuning.onnx_thread_counts(), (1, 1))
+
+    @override_settings(WORKER_CONCURRENCY='3', ONNX_INTRA_OP_THREADS='4')
+    def test_explicit_values_win(self):
+        self.assertEqual(tuning.worker_concurrency(), 3)
+        self.assertEqual(tuning.onnx_thread_counts(), (4, 1))
+
+    def test_available_cpus_respects_cgroup_limit(self):
+        with mock.patch.object(tuning, 'cgroup_cpu_limit', return_value=0.5):
+            self.assertEqual(tuning.available_cpus(), 1)
+
+
+@override_settings(
+    WORKER_CONCURRENCY='1',
+    ONNX_INTRA_OP_THREADS='3',
+    ONNX_INTER_OP_THREADS=2,
+    ONNX_GRAPH_OPTIMIZATION='basic',
+    ONNX_ENABLE_MEM_ARENA=False,
+)
+class SessionOptionsTests(SimpleTestCase):
+    def test_session_options_follow_settings(self):
+        import onnxruntime as ort
+
+        options = tuning.session_options()
+
+        self.assertEqual(options.intra_op_num_threads, 3)
+        self.assertEqual(options.inter_op_num_threads, 2)
+        self.assertEqual(
+            options.graph_optimization_level,
+            ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        )
+        self.assertFalse(options.enable_cpu_mem_arena)
+
+    @override_settings(ONNX_GRAPH_OPTIMIZATION='max')
+    def test_unknown_optimization_level_is_rejected(self):
+        with self.assertRaises(ValueError):
+            tuning.session_options()
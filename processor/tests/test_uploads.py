@@ -0,0 +1,74 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from processor.staging import open_staged_image, stage_upload
+from processor.views import validate_image_file
+
+
+def make_upload(size=(60, 40), image_format='PNG', name='photo.png'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'green').save(buffer, format=image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ValidateImageFileTests(TestCase):
+    def test_valid_image_is_accepted_and_rewound(self):
+        upload = make_upload()
+
+        self.assertEqual(validate_image_file(upload), (True, None))
+        self.assertEqual(upload.tell(), 0)
+
+    @override_settings(MAX_IMAGE_PIXELS=1000)
+    def test_pixel_count_is_checked_from_the_header(self):
+        is_valid, error = validate_image_file(make_upload(size=(50, 50)))
+
+        self.assertFalse(is_valid)
+        self.assertIn('megapixels', error)
+
+    def test_format_must_match_the_header(self):
+        upload = make_upload(image_format='GIF')
+
+        is_valid, _ = validate_image_file(upload)
+
+        self.assertFalse(is_valid)
+
+    def test_non_image_is_rejected(self):
+        upload = SimpleUploadedFile('photo.png', b'not an image', 'image/png')
+
+        is_valid, _ = validate_image_file(upload)
+
+        self.assertFalse(is_valid)
+
+
+class StagingTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def test_spooled_upload_is_moved_into_storage(self):
+        upload = TemporaryUploadedFile('photo.png', 'image/png', 0, None)
+        self.addCleanup(upload.close)
+        upload.write(make_upload().read())
+        upload.flush()
+        spooled_path = upload.temporary_file_path()
+
+        input_key = stage_upload(upload, 'task-1')
+
+        self.assertFalse(os.path.exists(spooled_path))
+        self.assertEqual(open_staged_image(input_key).size, (60, 40))
+
+    def test_staged_image_is_decoded_after_storage_is_closed(self):
+        input_key = stage_upload(make_upload(size=(30, 20)), 'task-2')
+
+        image = open_staged_image(input_key)
+
+        self.assertEqual(image.getpixel((0, 0)), (0, 128, 0))
+        self.assertTrue(default_storage.exists(input_key))
@@ -0,0 +1,105 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from processor import warmup
+from processor.tests.test_metrics import sample
+
+
+@override_settings(
+    WORKER_WARMUP=True, WORKER_WARMUP_MODELS=['u2net'], INFERENCE_SERVER_ADDRESS=''
+)
+@mock.patch('processor.warmup.get_session')
+class WarmUpTests(SimpleTestCase):
+    def setUp(self):
+        self.ready_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.ready_dir, ignore_errors=True)
+        self.enterContext(mock.patch.dict(os.environ, WORKER_READY_DIR=self.ready_dir))
+
+    def test_models_are_loaded_and_run_once(self, get_session):
+        run_inference = mock.Mock()
+
+        timings = warmup.warm_up(run_inference)
+
+        get_session.assert_called_once_with('u2net')
+        image, model_name = run_inference.call_args.args
+        self.assertEqual((image.size, model_name), (warmup.WARMUP_IMAGE_SIZE, 'u2net'))
+        self.assertEqual(set(timings), {'model_load', 'first_inference'})
+
+    @override_settings(INFERENCE_SERVER_ADDRESS='/tmp/inference.sock')
+    def test_inference_server_loads_the_models(self, get_session):
+        run_inference = mock.Mock()
+
+        timings = warmup.warm_up(run_inference)
+
+        get_session.assert_not_called()
+        run_inference.assert_called_once()
+        self.assertEqual(set(timings), {'first_inference'})
+
+    def test_warm_process_is_marked_ready(self, get_session):
+        warmup.warm_up_worker_process(mock.Mock())
+
+        processes = warmup.ready_processes(self.ready_dir)
+
+        self.assertEqual(list(processes), [os.getpid()])
+        self.assertIn('warm_up', processes[os.getpid()])
+
+        warmup.clear_ready()
+
+        self.assertEqual(warmup.ready_processes(self.ready_dir), {})
+
+    @mock.patch('processor.warmup.WARMUP_RETRY_DELAY', 0)
+    def test_failed_warm_up_is_retried(self, get_session):
+        get_session.side_effect = [OSError('model download failed'), None]
+
+        with self.assertLogs('processor.warmup', 'WARNING'):
+            self.assertTrue(warmup.warm_up_worker_process(mock.Mock()))
+
+        self.assertEqual(get_session.call_count, 2)
+        self.assertIn(os.getpid(), warmup.ready_processes(self.ready_dir))
+
+    @mock.patch('processor.warmup.WARMUP_RETRY_DELAY', 0)
+    def test_process_that_cannot_warm_up_is_not_ready(self, get_session):
+        get_session.side_effect = OSError('model download failed')
+        failures = sample('processor_worker_warmup_failures_total')
+
+        with self.assertLogs('processor.warmup', 'ERROR'):
+            self.assertFalse(warmup.warm_up_worker_process(mock.Mock()))
+
+        self.assertEqual(get_session.call_count, warmup.WARMUP_ATTEMPTS)
+        self.assertEqual(sample('processor_worker_warmup_failures_total'), failures + 1)
+        self.assertEqual(warmup.ready_processes(self.ready_dir), {})
+
+    @mock.patch('processor.tasks.os._exit')
+    def test_process_that_cannot_warm_up_exits(self, exit_process, get_session):
+        from processor.tasks import worker_process_init_handler
+
+        with mock.patch(
+            'processor.tasks.warm_up_worker_process', return_value=False
+        ) as warm_up:
+            worker_process_init_handler()
+
+        warm_up.assert_called_once()
+        exit_process.assert_called_once_with(1)
+
+    @override_settings(WORKER_WARMUP=False)
+    def test_disabled_warm_up_marks_ready_at_once(self, get_session):
+        warmup.warm_up_worker_process(mock.Mock())
+
+        get_session.assert_not_called()
+        self.assertEqual(warmup.ready_processes(self.ready_dir), {os.getpid(): {}})
+
+    def test_markers_of_dead_processes_are_removed(self, get_session):
+        dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+        dead.wait()
+        marker = Path(self.ready_dir) / str(dead.pid)
+        marker.write_text('{}')
+
+        self.assertEqual(warmup.ready_processes(self.ready_dir), {})
+        self.assertFalse(marker.exists())
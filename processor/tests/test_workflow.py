@@ -1,12 +1,15 @@
 import io
 import time
 
+from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from PIL import Image
 
-from processor.models import ProcessingTask
+from processor.encoding import parse_output_options
+from processor.models import CachedResult, ProcessingTask
+from processor.result_cache import compute_content_hash
 
 
 @override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
@@ -69,6 +72,26 @@ class AsyncWorkflowIntegrationTests(TestCase):
             task = ProcessingTask.objects.get(task_id=task_id)
             self.assertEqual(task.status, 'completed')
 
+    def test_identical_upload_is_served_from_result_cache(self):
+        content_hash = compute_content_hash(
+            self.test_image, settings.REMBG_MODEL, parse_output_options({})
+        )
+        CachedResult.objects.create(
+            content_hash=content_hash, result_url='/media/processed/cached.png'
+        )
+
+        response = self.client.post(reverse('home'), {'image': self.test_image})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(data['result_url'], '/media/processed/cached.png')
+
+        task = ProcessingTask.objects.get(task_id=data['task_id'])
+        self.assertEqual(task.status, 'completed')
+        self.assertEqual(task.input_key, '')
+        self.assertEqual(CachedResult.objects.get().hit_count, 1)
+
 
 @override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
 class ErrorHandlingIntegrationTests(TestCase):
@@ -0,0 +1,102 @@
+import math
+import os
+from pathlib import Path
+
+from django.conf import settings
+
+CGROUP_ROOT = Path('/sys/fs/cgroup')
+
+# Fewest processes ``auto`` picks: the former fixed default, so one job's
+# decode, encode and storage I/O still overlap another's inference
+MIN_AUTO_CONCURRENCY = 2
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    'disabled': 'ORT_DISABLE_ALL',
+    'basic': 'ORT_ENABLE_BASIC',
+    'extended': 'ORT_ENABLE_EXTENDED',
+    'all': 'ORT_ENABLE_ALL',
+}
+
+
+def cgroup_cpu_limit(root: Path = CGROUP_ROOT) -> float | None:
+    """
+    CPU limit of the container from its cgroup quota, or None if unlimited.
+
+    Reads ``cpu.max`` (cgroup v2) or ``cpu.cfs_quota_us``/``cpu.cfs_period_us``
+    (cgroup v1). Cloud Run and Kubernetes CPU limits show up here, while
+    ``os.cpu_count()`` reports every core of the host.
+    """
+    try:
+        quota, period = (root / 'cpu.max').read_text().split()[:2]
+        if quota != 'max':
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    try:
+        quota = int((root / 'cpu' / 'cpu.cfs_quota_us').read_text())
+        period = int((root / 'cpu' / 'cpu.cfs_period_us').read_text())
+    except (OSError, ValueError):
+        return None
+    return quota / period if quota > 0 and period > 0 else None
+
+
+def available_cpus() -> int:
+    """Whole CPUs this process may use: affinity mask capped by the cgroup quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS
+        cpus = os.cpu_count() or 1
+
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.floor(limit))
+    return max(1, cpus)
+
+
+def worker_concurrency() -> int:
+    """
+    Number of prefork worker processes (WORKER_CONCURRENCY).
+
+    ``auto`` runs one process per two CPUs, and at least MIN_AUTO_CONCURRENCY:
+    each process keeps its own model session in memory, and two intra-op
+    threads per session recover most of the speed-up of a larger thread pool.
+    """
+    if settings.WORKER_CONCURRENCY != 'auto':
+        return max(1, int(settings.WORKER_CONCURRENCY))
+    return max(MIN_AUTO_CONCURRENCY, available_cpus() // 2)
+
+
+def onnx_thread_counts() -> tuple[int, int]:
+    """
+    ONNX Runtime ``(intra_op, inter_op)`` threads per session.
+
+    ``auto`` splits the available CPUs evenly across worker processes so the
+    pool never runs more inference threads than there are CPUs.
+    """
+    intra_op = settings.ONNX_INTRA_OP_THREADS
+    if intra_op == 'auto':
+        intra_op = max(1, available_cpus() // worker_concurrency())
+    return int(intra_op), settings.ONNX_INTER_OP_THREADS
+
+
+def session_options():
+    """Build onnxruntime SessionOptions from the ONNX_* settings."""
+    import onnxruntime as ort
+
+    level = settings.ONNX_GRAPH_OPTIMIZATION
+    if level not in GRAPH_OPTIMIZATION_LEVELS:
+        allowed = ', '.join(GRAPH_OPTIMIZATION_LEVELS)
+        raise ValueError(f'Unknown ONNX_GRAPH_OPTIMIZATION "{level}" ({allowed})')
+
+    intra_op, inter_op = onnx_thread_counts()
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_op
+    options.inter_op_num_threads = inter_op
+    options.graph_optimization_level = getattr(
+        ort.GraphOptimizationLevel, GRAPH_OPTIMIZATION_LEVELS[level]
+    )
+    options.enable_cpu_mem_arena = settings.ONNX_ENABLE_MEM_ARENA
+    options.enable_mem_pattern = settings.ONNX_ENABLE_MEM_ARENA
+    return options
@@ -1,9 +1,21 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
+from .delivery import RESULTS_DIR
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('health/', views.health_check, name='health'),
+    path('metrics/', views.metrics, name='metrics'),
     path('task/<str:task_id>/status/', views.get_task_status, name='task_status'),
+    path('task/<str:task_id>/events/', views.task_events, name='task_events'),
+    path('batch/', views.batch_upload, name='batch_upload'),
+    path('batch/<str:batch_id>/status/', views.get_batch_status, name='batch_status'),
+    path('batch/<str:batch_id>/download/', views.download_batch, name='batch_download'),
+    path(
+        f'{settings.MEDIA_URL.lstrip("/")}{RESULTS_DIR}/<path:name>',
+        views.result_file,
+        name='result_file',
+    ),
 ]
@@ -1,41 +1,190 @@
-import base64
 import json
+import logging
 import os
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from itertools import chain
 
+from asgiref.sync import sync_to_async
+from celery import group
 from django.conf import settings
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from PIL import Image, UnidentifiedImageError
 
-from processor.models import ProcessingTask
+from processor.admission import check_capacity, check_rate_limit
+from processor.batch_uploads import (
+    archive_entries,
+    iter_archive_files,
+    stream_results_zip,
+)
+from processor.coalescing import claim
+from processor.delivery import delivery_url, serve_result, with_delivery_url
+from processor.encoding import parse_output_options
+from processor.events import TERMINAL_STATUSES, subscribe_task
+from processor.metrics import (
+    ADMISSION_REJECTIONS_TOTAL,
+    ESTIMATED_WAIT_SECONDS,
+    TASK_STATUS_TOTAL,
+    export_metrics,
+)
+from processor.models import ProcessingBatch, ProcessingTask
+from processor.result_cache import (
+    alookup_cached_result,
+    compute_content_hash,
+    lookup_cached_result,
+)
+from processor.sessions import resolve_model_name
+from processor.staging import discard_staged, stage_upload
 from processor.tasks import process_image_task
+from remove_bg.celery import TASK_PRIORITIES
+
+logger = logging.getLogger(__name__)
 
 
 def health_check(request):
     return JsonResponse({'status': 'OK'})
 
 
-def get_task_status(request, task_id):
+def metrics(request):
+    """Prometheus scrape endpoint for the web processes."""
+    body, content_type = export_metrics()
+    return HttpResponse(body, content_type=content_type)
+
+
+async def get_task_status(request, task_id):
     """
     API endpoint to check the status of a background processing task.
 
     Returns JSON with current task status, result URL (if completed), and error (if failed).
+    With ``?wait=<seconds>`` the request long-polls: it returns as soon as the
+    task moves past ``?since=<status>`` (default: its current status) or when
+    the wait (capped at TASK_STATUS_MAX_WAIT) runs out. Under ASGI a waiting
+    request holds one of ASYNC_VIEW_THREADS threads, not a server worker.
     """
     try:
-        task = ProcessingTask.objects.get(task_id=task_id)
+        wait = min(float(request.GET.get('wait', 0)), settings.TASK_STATUS_MAX_WAIT)
+    except ValueError:
+        return JsonResponse({'error': 'wait must be a number of seconds'}, status=400)
+
+    try:
+        if wait > 0:
+            response_data = await _wait_for_status(
+                task_id, request.GET.get('since'), wait
+            )
+        else:
+            # Plain polls stay a single state lookup
+            response_data = await ProcessingTask.acurrent_status(task_id)
+    except ProcessingTask.DoesNotExist:
+        return JsonResponse({'error': 'Task not found'}, status=404)
 
-        response_data = {
-            'status': task.status,
-            'result_url': task.result_url,
-            'error': task.error_message,
-        }
+    return JsonResponse(await run_blocking(with_delivery_url, response_data))
 
-        return JsonResponse(response_data)
 
+async def _wait_for_status(task_id, since, wait):
+    """Status of a task once it moves past ``since``, or after ``wait`` seconds."""
+    # Subscribe before reading the state so no transition is missed
+    subscription = subscribe_task(task_id)
+    receive = await run_blocking(subscription.__enter__)
+    try:
+        response_data = await ProcessingTask.acurrent_status(task_id)
+        status = response_data['status']
+        since = since or status
+
+        if status == since and status not in TERMINAL_STATUSES:
+            deadline = time.monotonic() + wait
+            while (remaining := deadline - time.monotonic()) > 0:
+                payload = await run_blocking(receive, remaining)
+                if payload is not None and payload['status'] != since:
+                    return payload
+        return response_data
+    finally:
+        await run_blocking(subscription.__exit__, None, None, None)
+
+
+def task_events(request, task_id):
+    """
+    Server-Sent Events stream of a task's state transitions.
+
+    Sends the current state first, then one ``status`` event per transition.
+    The stream ends after a terminal state or TASK_EVENTS_STREAM_TIMEOUT seconds;
+    EventSource clients reconnect on their own. Under WSGI a stream holds a
+    sync worker throughout, so the upload page only uses it under ASGI.
+    """
+    try:
+        ProcessingTask.current_status(task_id)
     except ProcessingTask.DoesNotExist:
         return JsonResponse({'error': 'Task not found'}, status=404)
 
+    # Under ASGI, Django buffers a sync iterator whole before sending it
+    stream = _aevent_stream if is_asgi(request) else _event_stream
+    response = StreamingHttpResponse(stream(task_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx, Cloud Run)
+    return response
+
+
+def _event_stream(task_id):
+    with subscribe_task(task_id) as receive:
+        payload = ProcessingTask.current_status(task_id)
+        yield _sse_event(payload)
+
+        deadline = time.monotonic() + settings.TASK_EVENTS_STREAM_TIMEOUT
+        while payload['status'] not in TERMINAL_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+
+            message = receive(min(remaining, settings.TASK_EVENTS_HEARTBEAT))
+            if message is None:
+                yield ': keepalive\n\n'
+                continue
+
+            payload = message
+            yield _sse_event(payload)
+
+
+async def _aevent_stream(task_id):
+    """_event_stream for ASGI: waits for events off the event loop."""
+    subscription = subscribe_task(task_id)
+    receive = await run_blocking(subscription.__enter__)
+    try:
+        payload = await ProcessingTask.acurrent_status(task_id)
+        yield await run_blocking(_sse_event, payload)
+
+        deadline = time.monotonic() + settings.TASK_EVENTS_STREAM_TIMEOUT
+        while payload['status'] not in TERMINAL_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+
+            message = await run_blocking(
+                receive, min(remaining, settings.TASK_EVENTS_HEARTBEAT)
+            )
+            if message is None:
+                yield ': keepalive\n\n'
+                continue
+
+            payload = message
+            yield await run_blocking(_sse_event, payload)
+    finally:
+        await run_blocking(subscription.__exit__, None, None, None)
+
+
+def result_file(request, name):
+    """Serve a processed image from local storage (see processor.delivery)."""
+    return serve_result(request, name)
+
+
+def _sse_event(payload):
+    return f'event: status\ndata: {json.dumps(with_delivery_url(payload))}\n\n'
+
 
 def validate_image_file(uploaded_file):
     """
@@ -58,44 +207,401 @@ def validate_image_file(uploaded_file):
     if uploaded_file.content_type not in settings.ALLOWED_IMAGE_TYPES:
         return False, 'Invalid file format. Please upload a valid image file'
 
+    # Only the header is parsed here; pixels are decoded once, in the worker
     try:
-        img = Image.open(uploaded_file)
-        img.verify()
-        uploaded_file.seek(0)  # Reset file pointer after verify() consumes it
-        return True, None
-    except UnidentifiedImageError:
+        with Image.open(uploaded_file) as img:
+            image_format = img.format
+            width, height = img.size
+    except (UnidentifiedImageError, Image.DecompressionBombError):
         return False, 'Unable to process file. Please upload a valid image'
     except Exception as e:
         return False, f'Error validating image: {e!s}'
+    finally:
+        uploaded_file.seek(0)
+
+    if image_format not in settings.ALLOWED_IMAGE_FORMATS:
+        return False, 'Invalid file format. Please upload a valid image file'
+
+    if width * height > settings.MAX_IMAGE_PIXELS:
+        max_megapixels = settings.MAX_IMAGE_PIXELS / 1_000_000
+        return False, f'Image exceeds maximum of {max_megapixels:.0f} megapixels'
+
+    return True, None
+
+
+async def home(request):
+    """
+    Upload page, and single-image upload (POST).
+
+    Async so that under ASGI a slow upload does not hold a server worker:
+    database access uses the async ORM and blocking work (parsing and hashing
+    the spooled upload, Redis, staging, enqueueing) runs in executor threads.
+    """
+    if request.method != 'POST':
+        return await sync_to_async(render)(
+            request, 'processor/home.html', _home_context(request)
+        )
+
+    rejection = await run_blocking(check_rate_limit, request)
+    if rejection is not None:
+        return _rejected(rejection)
+
+    upload = await run_blocking(_parse_upload, request)
+    if isinstance(upload, HttpResponse):
+        return upload
+    uploaded_file, model_name, output, priority, content_hash = upload
+    task_id = str(uuid.uuid4())
 
+    cached = await alookup_cached_result(content_hash)
+    if cached is not None:
+        await ProcessingTask.objects.acreate(
+            task_id=task_id,
+            status='completed',
+            result_url=cached.result_url,
+            content_hash=content_hash,
+            completed_at=timezone.now(),
+            **_output_fields(output),
+        )
+        TASK_STATUS_TOTAL.labels(status='completed').inc()
+        return JsonResponse(
+            {
+                'task_id': task_id,
+                'status': 'completed',
+                'result_url': await run_blocking(delivery_url, cached.result_url),
+            }
+        )
+
+    # Before claiming: a rejected upload must not hold the in-flight marker
+    rejection, estimated_wait = await run_blocking(_check_capacity, priority)
+    if rejection is not None:
+        return _rejected(rejection)
+
+    leader_id = await run_blocking(claim, content_hash, task_id)
+    if leader_id is not None:
+        # The same input is already being processed: wait for that job
+        task = await ProcessingTask.objects.acreate(
+            task_id=task_id,
+            status='pending',
+            content_hash=content_hash,
+            leader_id=leader_id,
+            **_output_fields(output),
+        )
+        TASK_STATUS_TOTAL.labels(status='pending').inc()
+        await sync_to_async(ProcessingTask.settle_followers)([task])
+        return JsonResponse(
+            {'task_id': task_id, 'status': 'pending', 'coalesced_with': leader_id}
+        )
+
+    task = ProcessingTask(
+        task_id=task_id,
+        status='pending',
+        content_hash=content_hash,
+        **_output_fields(output),
+    )
+    try:
+        task.input_key = await run_blocking(stage_upload, uploaded_file, task_id)
+        await task.asave(force_insert=True)
+        TASK_STATUS_TOTAL.labels(status='pending').inc()
 
-def home(request):
-    if request.method == 'POST':
-        uploaded_file = request.FILES.get('image')
+        # Thread-sensitive like the async ORM: an eagerly run task (tests,
+        # CELERY_TASK_ALWAYS_EAGER) must share this request's DB connection
+        await sync_to_async(process_image_task.apply_async)(
+            args=(task.input_key, task_id, model_name),
+            kwargs={'priority': priority},
+            task_id=task_id,
+        )
+    except Exception:
+        await sync_to_async(_abandon_uploads)([task])
+        raise
 
-        is_valid, error_message = validate_image_file(uploaded_file)
-        if not is_valid:
-            return JsonResponse({'error': error_message}, status=400)
+    response_data = {'task_id': task_id, 'status': 'pending'}
+    if estimated_wait is not None:
+        response_data['estimated_wait'] = round(estimated_wait, 1)
+    return JsonResponse(response_data)
 
-        image_bytes = uploaded_file.read()
-        image_data_b64 = base64.b64encode(image_bytes).decode('utf-8')
 
-        task_id = str(uuid.uuid4())
+def is_asgi(request):
+    return isinstance(request, ASGIRequest)
+
+
+async def aiter_blocking(iterator):
+    """Consume a blocking iterator off the event loop, one item at a time."""
+    done = object()
+    try:
+        while (item := await run_blocking(next, iterator, done)) is not done:
+            yield item
+    finally:
+        if hasattr(iterator, 'close'):
+            await run_blocking(iterator.close)
 
-        ProcessingTask.objects.create(task_id=task_id, status='pending')
 
-        process_image_task.apply_async(args=(image_data_b64, task_id), task_id=task_id)
+def run_blocking(func, *args, **kwargs):
+    """Run blocking I/O off the event loop, concurrently with other requests."""
+    return sync_to_async(func, thread_sensitive=False, executor=_blocking_executor())(
+        *args, **kwargs
+    )
 
-        return JsonResponse({'task_id': task_id, 'status': 'pending'})
 
-    context = {
+@cache
+def _blocking_executor():
+    # Sized apart from the event loop's default executor: a waiting long-poll
+    # holds one of these threads for up to TASK_STATUS_MAX_WAIT
+    return ThreadPoolExecutor(
+        settings.ASYNC_VIEW_THREADS, thread_name_prefix='async-view'
+    )
+
+
+def _home_context(request):
+    return {
         'upload_config': json.dumps(
             {
                 'maxFileSize': settings.MAX_UPLOAD_SIZE,
                 'allowedTypes': settings.ALLOWED_IMAGE_TYPES,
                 'allowedExtensions': settings.ALLOWED_IMAGE_EXTENSIONS,
+                # A sync worker would be held for a whole event stream
+                'serverEvents': is_asgi(request),
             }
         )
     }
 
-    return render(request, 'processor/home.html', context)
+
+def _parse_upload(request):
+    """
+    Validate a single-image upload request.
+
+    Returns ``(file, model name, output options, priority, content hash)``,
+    or a 400 JsonResponse.
+    """
+    uploaded_file = request.FILES.get('image')
+
+    is_valid, error_message = validate_image_file(uploaded_file)
+    if not is_valid:
+        return JsonResponse({'error': error_message}, status=400)
+
+    try:
+        model_name = resolve_model_name(request.POST.get('model'))
+        output = parse_output_options(request.POST)
+        priority = resolve_priority(request.POST.get('priority'), 'interactive')
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    content_hash = (
+        compute_content_hash(uploaded_file, model_name, output)
+        if settings.RESULT_CACHE_ENABLED or settings.COALESCE_UPLOADS
+        else ''
+    )
+    return uploaded_file, model_name, output, priority, content_hash
+
+
+def _output_fields(output):
+    """ProcessingTask fields for options returned by parse_output_options."""
+    return {
+        'output_format': output['format'],
+        'mask_only': output['mask_only'],
+        'output_options': output['encoder'],
+    }
+
+
+def _abandon_uploads(leaders):
+    """
+    Clean up after uploads that claimed an in-flight marker but failed to be
+    enqueued: discard their staged inputs and fail them, with any identical
+    uploads coalesced into them meanwhile.
+    """
+    for task in leaders:
+        discard_staged(task.input_key)
+        ProcessingTask.abandon_leader(task.task_id, task.content_hash)
+
+
+def _check_capacity(priority, jobs=1):
+    """Admission check that lets uploads through when the broker is unreachable."""
+    if not settings.ADMISSION_ENABLED:
+        return None, None
+    try:
+        rejection, estimated_wait = check_capacity(priority, jobs)
+    except Exception:
+        logger.warning('Queue depth unavailable; admitting upload', exc_info=True)
+        return None, None
+
+    ESTIMATED_WAIT_SECONDS.observe(estimated_wait)
+    return rejection, estimated_wait
+
+
+def _rejected(rejection):
+    ADMISSION_REJECTIONS_TOTAL.labels(status=rejection.status).inc()
+    response = JsonResponse(
+        {'error': rejection.error, 'retry_after': rejection.retry_after},
+        status=rejection.status,
+    )
+    response['Retry-After'] = str(rejection.retry_after)
+    return response
+
+
+def resolve_priority(priority, default):
+    """Validate the ``priority`` form field (queue class) of an upload."""
+    priority = priority or default
+    if priority not in TASK_PRIORITIES:
+        allowed = ', '.join(TASK_PRIORITIES)
+        raise ValueError(f'Unknown priority "{priority}". Allowed: {allowed}')
+    return priority
+
+
+@csrf_exempt  # Machine clients (catalog ingest) post without a CSRF token
+@require_POST
+def batch_upload(request):
+    """
+    Accept many images (``images`` fields and/or one ``archive`` zip) at once.
+
+    Creates all tasks with one bulk insert, enqueues them as a Celery group
+    and returns a single batch id. Invalid files are reported in ``rejected``
+    without failing the rest of the batch. Batches are queued with ``bulk``
+    priority unless the request asks for ``interactive``.
+    """
+    try:
+        model_name = resolve_model_name(request.POST.get('model'))
+        output = parse_output_options(request.POST)
+        priority = resolve_priority(request.POST.get('priority'), 'bulk')
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    uploaded_files = request.FILES.getlist('images')
+    archive = request.FILES.get('archive')
+    file_count = len(uploaded_files)
+
+    if archive:
+        if archive.size > settings.BATCH_MAX_ARCHIVE_SIZE:
+            max_mb = settings.BATCH_MAX_ARCHIVE_SIZE / (1024 * 1024)
+            return JsonResponse(
+                {'error': f'Archive exceeds maximum allowed size of {max_mb:.0f}MB'},
+                status=400,
+            )
+        try:
+            entries = archive_entries(archive)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        file_count += len(entries)
+        uploaded_files = chain(uploaded_files, iter_archive_files(archive, entries))
+
+    if file_count == 0:
+        return JsonResponse({'error': 'No files were uploaded'}, status=400)
+
+    if file_count > settings.BATCH_MAX_FILES:
+        return JsonResponse(
+            {'error': f'A batch can contain at most {settings.BATCH_MAX_FILES} files'},
+            status=400,
+        )
+
+    # One token per image, so batches cannot bypass the per-client limit
+    rejection = check_rate_limit(request, file_count)
+    if rejection is not None:
+        return _rejected(rejection)
+
+    # Counts every file; cache hits among them never reach the queue
+    rejection, estimated_wait = _check_capacity(priority, file_count)
+    if rejection is not None:
+        return _rejected(rejection)
+
+    batch = ProcessingBatch.objects.create(batch_id=str(uuid.uuid4()))
+    tasks = []
+    signatures = []
+    rejected = []
+
+    leaders = []  # Tasks that claimed an in-flight marker
+    try:
+        for uploaded_file in uploaded_files:
+            is_valid, error_message = validate_image_file(uploaded_file)
+            if not is_valid:
+                rejected.append(
+                    {'filename': uploaded_file.name, 'error': error_message}
+                )
+                continue
+
+            task_id = str(uuid.uuid4())
+            task = ProcessingTask(
+                task_id=task_id,
+                batch=batch,
+                source_name=uploaded_file.name[:255],
+                **_output_fields(output),
+            )
+            if settings.RESULT_CACHE_ENABLED or settings.COALESCE_UPLOADS:
+                task.content_hash = compute_content_hash(
+                    uploaded_file, model_name, output
+                )
+
+            cached = lookup_cached_result(task.content_hash)
+            if cached is not None:
+                task.status = 'completed'
+                task.result_url = cached.result_url
+                task.completed_at = timezone.now()
+            elif leader_id := claim(task.content_hash, task_id):
+                task.leader_id = leader_id
+            else:
+                leaders.append(task)
+                task.input_key = stage_upload(uploaded_file, task_id)
+                signatures.append(
+                    process_image_task.si(
+                        task.input_key, task_id, model_name, priority=priority
+                    ).set(task_id=task_id)
+                )
+            tasks.append(task)
+
+        if not tasks:
+            batch.delete()
+            return JsonResponse(
+                {'error': 'No valid images in batch', 'rejected': rejected}, status=400
+            )
+
+        ProcessingTask.objects.bulk_create(tasks)
+        for task in tasks:
+            TASK_STATUS_TOTAL.labels(status=task.status).inc()
+        ProcessingTask.settle_followers(tasks)
+        if signatures:
+            group(signatures).apply_async()
+    except Exception:
+        _abandon_uploads(leaders)
+        raise
+
+    response_data = {
+        **batch.progress(),
+        'tasks': [
+            {'task_id': task.task_id, 'filename': task.source_name} for task in tasks
+        ],
+        'rejected': rejected,
+    }
+    if estimated_wait is not None:
+        response_data['estimated_wait'] = round(estimated_wait, 1)
+    return JsonResponse(response_data)
+
+
+def get_batch_status(request, batch_id):
+    """Aggregate status and progress counts for a batch upload."""
+    try:
+        batch = ProcessingBatch.objects.get(batch_id=batch_id)
+        return JsonResponse(batch.progress())
+
+    except ProcessingBatch.DoesNotExist:
+        return JsonResponse({'error': 'Batch not found'}, status=404)
+
+
+def download_batch(request, batch_id):
+    """Stream a zip of the batch results completed so far."""
+    try:
+        batch = ProcessingBatch.objects.get(batch_id=batch_id)
+    except ProcessingBatch.DoesNotExist:
+        return JsonResponse({'error': 'Batch not found'}, status=404)
+
+    completed_tasks = batch.tasks.filter(status='completed').order_by('id')
+    if not completed_tasks.exists():
+        return JsonResponse({'error': 'No completed results yet'}, status=404)
+
+    if is_asgi(request):
+        # Read the rows now: the archive is built in executor threads, which
+        # do not share this request's database connection
+        content = aiter_blocking(stream_results_zip(list(completed_tasks)))
+    else:
+        content = stream_results_zip(completed_tasks.iterator())
+    response = StreamingHttpResponse(content, content_type='application/zip')
+    response['Content-Disposition'] = (
+        f'attachment; filename="batch-{batch.batch_id[:8]}.zip"'
+    )
+    return response
@@ -0,0 +1,154 @@
+"""
+Worker warm-up and readiness.
+
+Each Celery pool process loads the WORKER_WARMUP_MODELS sessions and runs one
+dummy inference on ``worker_process_init``, before it takes tasks, so no job
+pays the model load. A process that is warm writes a marker named after its
+pid to WORKER_READY_DIR (created by scripts/celery_healthcheck.py before the
+pool forks), whose /ready endpoint counts the markers of live processes. The
+duration of each phase is logged and exported as
+processor_worker_startup_seconds. A warm-up that still fails after
+WARMUP_ATTEMPTS is logged and counted in
+processor_worker_warmup_failures_total; the process then exits, so the pool
+replaces it with one that tries again, and is never marked ready.
+"""
+
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from PIL import Image
+
+from processor.metrics import WORKER_STARTUP_SECONDS, WORKER_WARMUP_FAILURES_TOTAL
+from processor.sessions import get_session
+
+logger = logging.getLogger(__name__)
+
+WARMUP_IMAGE_SIZE = (64, 64)
+# Attempts stay well within WORKER_WARMUP_TIMEOUT, after which Celery kills
+# the starting process
+WARMUP_ATTEMPTS = 3
+WARMUP_RETRY_DELAY = 1  # Seconds
+
+
+@contextmanager
+def startup_phase(phase: str, timings: dict):
+    """Record the seconds spent in the enclosed block as startup ``phase``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        WORKER_STARTUP_SECONDS.labels(phase=phase).observe(elapsed)
+        timings[phase] = round(timings.get(phase, 0) + elapsed, 3)
+
+
+def warm_up(run_inference) -> dict:
+    """
+    Load each warm-up model and run one inference through ``run_inference``.
+
+    With a shared inference server the sessions live there, so only the
+    inference is run (which loads them in the server). Returns the seconds
+    spent per phase, summed over the models.
+    """
+    timings = {}
+    image = Image.new('RGB', WARMUP_IMAGE_SIZE, 'white')
+    for model_name in settings.WORKER_WARMUP_MODELS:
+        if not settings.INFERENCE_SERVER_ADDRESS:
+            with startup_phase('model_load', timings):
+                get_session(model_name)
+        with startup_phase('first_inference', timings):
+            run_inference(image, model_name)
+    return timings
+
+
+def warm_up_worker_process(run_inference) -> bool:
+    """
+    Warm up this pool process and mark it ready; returns whether it is.
+
+    A failed warm-up is retried up to WARMUP_ATTEMPTS times. A process that
+    never warms up is not marked ready, so /ready keeps answering 503.
+    """
+    timings = {}
+    if settings.WORKER_WARMUP:
+        for attempt in range(1, WARMUP_ATTEMPTS + 1):
+            try:
+                with startup_phase('warm_up', timings):
+                    timings.update(warm_up(run_inference))
+            except Exception:
+                logger.warning(
+                    'Worker warm-up failed',
+                    extra={'pid': os.getpid(), 'attempt': attempt},
+                    exc_info=True,
+                )
+                if attempt < WARMUP_ATTEMPTS:
+                    time.sleep(WARMUP_RETRY_DELAY)
+            else:
+                logger.info(
+                    'Worker process warm', extra={'pid': os.getpid(), **timings}
+                )
+                break
+        else:
+            logger.error(
+                'Worker process could not warm up',
+                extra={'pid': os.getpid(), 'attempts': WARMUP_ATTEMPTS},
+            )
+            WORKER_WARMUP_FAILURES_TOTAL.inc()
+            return False
+    mark_ready(timings)
+    return True
+
+
+def _marker(pid: int) -> Path | None:
+    ready_dir = os.environ.get('WORKER_READY_DIR')
+    return Path(ready_dir) / str(pid) if ready_dir else None
+
+
+def mark_ready(timings: dict) -> None:
+    path = _marker(os.getpid())
+    if path is None:
+        return
+    partial = path.with_suffix('.tmp')
+    partial.write_text(json.dumps(timings))
+    partial.replace(path)
+
+
+def clear_ready() -> None:
+    path = _marker(os.getpid())
+    if path is not None:
+        path.unlink(missing_ok=True)
+
+
+def ready_processes(ready_dir: str) -> dict[int, dict]:
+    """
+    Warm-up timings of the live processes that marked themselves ready.
+
+    Markers of processes that died without clearing them are removed.
+    """
+    processes = {}
+    for path in Path(ready_dir).glob('*'):
+        if not path.name.isdigit():
+            continue
+        pid = int(path.name)
+        if not _is_alive(pid):
+            path.unlink(missing_ok=True)
+            continue
+        try:
+            processes[pid] = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+    return processes
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
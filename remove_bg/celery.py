@@ -2,9 +2,32 @@ import os
 import ssl
 
 from celery import Celery
+from kombu import Queue
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'remove_bg.settings')
 
+# Uploads carry a ``priority`` (the queue they are consumed from). Interactive
+# web uploads and bulk ingest use separate queues so a bulk backlog never
+# delays interactive jobs; workers list interactive first (see
+# scripts/celery_healthcheck.py) and only prefetch one job per process.
+TASK_PRIORITIES = ('interactive', 'bulk')
+DEFAULT_PRIORITY = 'interactive'
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """Pick the queue for process_image_task from its ``priority`` kwarg."""
+    if name != 'processor.tasks.process_image_task':
+        return None
+
+    from django.conf import settings
+
+    priority = (kwargs or {}).get('priority', DEFAULT_PRIORITY)
+    if priority == 'bulk' and settings.INFERENCE_BATCH_ENABLED:
+        # Bulk jobs trade latency for throughput on the batched inference queue
+        return {'queue': settings.INFERENCE_BATCH_QUEUE}
+    return {'queue': priority}
+
+
 app = Celery('remove_bg')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
@@ -32,6 +55,17 @@ app.conf.update(
     task_reject_on_worker_lost=True,
     timezone='UTC',
     enable_utc=True,
+    task_queues=[Queue(priority) for priority in TASK_PRIORITIES],
+    task_default_queue=DEFAULT_PRIORITY,
+    task_routes=(
+        route_task,
+        # Cleanup runs expire after one interval: behind a bulk backlog every
+        # run would expire unstarted, so it goes to the queue polled first
+        {'processor.tasks.cleanup_old_tasks_periodic': {'queue': 'interactive'}},
+    ),
+    worker_prefetch_multiplier=1,
+    # Redis: poll queues in the order the worker lists them, not round robin
+    broker_transport_options={'queue_order_strategy': 'priority'},
     broker_use_ssl=ssl_config,
     redis_backend_use_ssl=ssl_config,
 )
@@ -39,6 +73,26 @@ app.conf.update(
 app.autodiscover_tasks()
 
 
+@app.on_after_configure.connect
+def setup_periodic_tasks(sender, **kwargs):
+    """
+    Register periodic maintenance with Celery beat.
+
+    Beat runs embedded in the worker (see scripts/celery_healthcheck.py) or
+    as ``celery -A remove_bg beat``. Runs expire after one interval so a busy
+    worker never accumulates a backlog of cleanups.
+    """
+    from django.conf import settings
+
+    if settings.CLEANUP_PERIODIC_ENABLED:
+        sender.add_periodic_task(
+            settings.CLEANUP_INTERVAL_SECONDS,
+            sender.signature('processor.tasks.cleanup_old_tasks_periodic'),
+            name='cleanup-old-tasks',
+            expires=settings.CLEANUP_INTERVAL_SECONDS,
+        )
+
+
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
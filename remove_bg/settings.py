@@ -48,7 +48,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'processor.middleware.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,9 +85,24 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': DATABASE_PATH if DATABASE_PATH else BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': config('DATABASE_CONN_MAX_AGE', default=60, cast=int),
+        'OPTIONS': {
+            # Seconds a writer waits for the lock before "database is locked"
+            'timeout': config('SQLITE_TIMEOUT', default=20, cast=int),
+            # Take the write lock when a transaction starts, so concurrent
+            # read-then-write transactions queue up instead of failing
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# WAL lets the web app read while a worker writes. The database must be on a
+# local filesystem (a docker volume is fine, a network share is not).
+if config('SQLITE_WAL', default=True, cast=bool):
+    DATABASES['default']['OPTIONS']['init_command'] = (
+        'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL'
+    )
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -136,7 +151,7 @@ GCS_BUCKET_NAME = config('GCS_BUCKET_NAME', default='')
 STORAGES = {
     'default': {
         'BACKEND': (
-            'storages.backends.gcloud.GoogleCloudStorage'
+            'processor.storage_backends.ResultsGoogleCloudStorage'
             if GCS_BUCKET_NAME
             else 'django.core.files.storage.FileSystemStorage'
         ),
@@ -157,6 +172,26 @@ if GCS_BUCKET_NAME:
     GS_QUERYSTRING_AUTH = False  # Make files publicly accessible
     GS_FILE_OVERWRITE = False  # Don't overwrite files with same name
 
+# Result delivery (see processor.delivery). Result names are unique per task,
+# so they can be cached for good by browsers and CDNs; only results (not
+# staged uploads) are served or stored in GCS with this Cache-Control.
+RESULT_CACHE_CONTROL = config(
+    'RESULT_CACHE_CONTROL', default='public, max-age=31536000, immutable'
+)
+# Local storage behind nginx: internal location aliased to MEDIA_ROOT
+# (e.g. /protected-media/); nginx then sends the files instead of Django.
+RESULT_ACCEL_REDIRECT = config('RESULT_ACCEL_REDIRECT', default='')
+# GCS: hand out V4 signed URLs valid this many seconds instead of public ones,
+# so the bucket can stay private (0 disables). Each process reuses a signed
+# URL for half its TTL instead of signing on every status poll.
+RESULT_SIGNED_URL_TTL = config('RESULT_SIGNED_URL_TTL', default=0, cast=int)
+
+if GCS_BUCKET_NAME:
+    # Sign through the IAM API when the credentials hold no private key
+    # (Cloud Run / GCE metadata credentials)
+    GS_IAM_SIGN_BLOB = config('GCS_IAM_SIGN_BLOB', default=False, cast=bool)
+    GS_SA_EMAIL = config('GCS_SA_EMAIL', default=None)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -166,6 +201,21 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB in bytes
 ALLOWED_IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp']
 ALLOWED_IMAGE_TYPES = ['image/jpeg', 'image/png', 'image/webp']
+ALLOWED_IMAGE_FORMATS = ['JPEG', 'PNG', 'WEBP']  # Pillow formats read from the header
+# Rejected from the header before anything is decoded (decompression bombs)
+MAX_IMAGE_PIXELS = config('MAX_IMAGE_PIXELS', default=64_000_000, cast=int)
+
+# Spool every upload to a temporary file so request bodies never sit in worker
+# memory; staging then moves the file into storage instead of copying it
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+
+# Batch uploads: many files (or one zip archive) per request under one batch id
+BATCH_MAX_FILES = config('BATCH_MAX_FILES', default=500, cast=int)
+BATCH_MAX_ARCHIVE_SIZE = 200 * 1024 * 1024  # 200MB in bytes
+DATA_UPLOAD_MAX_NUMBER_FILES = BATCH_MAX_FILES
+
+# Uploads are staged in default storage under this prefix; Celery only receives the key
+UPLOAD_STAGING_PREFIX = 'uploads/'
 
 # Celery Configuration
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')
@@ -177,6 +227,101 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_ACCEPT_CONTENT = ['json']
 
+# process_image_task retries transient errors (storage, broker, memory) with
+# exponential backoff and jitter; input errors fail at once (processor.retries)
+TASK_MAX_RETRIES = config('TASK_MAX_RETRIES', default=3, cast=int)
+TASK_RETRY_BACKOFF_BASE = config('TASK_RETRY_BACKOFF_BASE', default=10, cast=float)
+TASK_RETRY_BACKOFF_MAX = config('TASK_RETRY_BACKOFF_MAX', default=300, cast=float)
+
+# Fraction of process_image_task runs profiled with cProfile; profiles are
+# saved to default storage as profiles/<task_id>.prof (processor.profiling)
+TASK_PROFILE_SAMPLE_RATE = config('TASK_PROFILE_SAMPLE_RATE', default=0.0, cast=float)
+
+# Periodic cleanup (Celery beat, see remove_bg/celery.py): every
+# CLEANUP_INTERVAL_SECONDS, delete tasks older than CLEANUP_MAX_AGE_HOURS in
+# small increments bounded by CLEANUP_MAX_ROWS and CLEANUP_TIME_BUDGET_SECONDS.
+# A lock in TASK_STATE_URL keeps the beats of several workers from running
+# cleanups in parallel.
+CLEANUP_PERIODIC_ENABLED = config('CLEANUP_PERIODIC_ENABLED', default=True, cast=bool)
+CLEANUP_INTERVAL_SECONDS = config('CLEANUP_INTERVAL_SECONDS', default=300, cast=int)
+CLEANUP_MAX_AGE_HOURS = config('CLEANUP_MAX_AGE_HOURS', default=1, cast=int)
+CLEANUP_MAX_ROWS = config('CLEANUP_MAX_ROWS', default=5000, cast=int)
+CLEANUP_TIME_BUDGET_SECONDS = config(
+    'CLEANUP_TIME_BUDGET_SECONDS', default=20, cast=float
+)
+CLEANUP_CHUNK_SIZE = 500
+
+# Background removal models (see processor.sessions.MODEL_REGISTRY). Sessions are
+# loaded lazily in the worker process that first uses them.
+REMBG_MODEL = config('REMBG_MODEL', default='u2net')
+REMBG_MODELS = config('REMBG_MODELS', default='u2net,u2netp,isnet,silueta', cast=Csv())
+
+# Worker processes and ONNX Runtime threads. 'auto' derives them from the CPUs
+# available to the container (cgroup quota): one process per two CPUs, but never
+# fewer than 2 (the former default), and the CPUs split evenly between the
+# processes' intra-op thread pools. CELERY_CONCURRENCY is the former name and is
+# still read when WORKER_CONCURRENCY is unset.
+WORKER_CONCURRENCY = config(
+    'WORKER_CONCURRENCY', default=config('CELERY_CONCURRENCY', default='auto')
+)
+ONNX_INTRA_OP_THREADS = config('ONNX_INTRA_OP_THREADS', default='auto')
+ONNX_INTER_OP_THREADS = config('ONNX_INTER_OP_THREADS', default=1, cast=int)
+ONNX_GRAPH_OPTIMIZATION = config('ONNX_GRAPH_OPTIMIZATION', default='all')
+# The CPU arena keeps freed buffers for reuse; disable it to return memory after
+# very large images at some cost in speed
+ONNX_ENABLE_MEM_ARENA = config('ONNX_ENABLE_MEM_ARENA', default=True, cast=bool)
+
+# Unix socket of a shared inference server (processor.inference_server). When set,
+# the worker starts one server process that holds the model sessions and pool
+# processes send it decoded pixels through shared memory, so the model is loaded
+# once per container instead of once per process. Empty runs inference in-process.
+INFERENCE_SERVER_ADDRESS = config('INFERENCE_SERVER_ADDRESS', default='')
+
+# Worker warm-up (processor.warmup): each pool process loads these models and runs
+# a dummy inference before it takes tasks; the worker's /ready endpoint reports
+# ready once every process is warm. A process that fails a few attempts exits
+# and the pool replaces it. Celery kills pool processes that take longer than
+# WORKER_WARMUP_TIMEOUT seconds to start.
+WORKER_WARMUP = config('WORKER_WARMUP', default=True, cast=bool)
+WORKER_WARMUP_MODELS = config('WORKER_WARMUP_MODELS', default=REMBG_MODEL, cast=Csv())
+CELERY_WORKER_PROC_ALIVE_TIMEOUT = config(
+    'WORKER_WARMUP_TIMEOUT', default=120, cast=float
+)
+
+# Large-image inference: 'full' runs rembg on the original image; 'downscale' and
+# 'tiled' segment a copy no larger than INFERENCE_MAX_SIDE and refine the mask at
+# full size ('tiled' in strips to bound memory). 'auto' uses 'tiled' above
+# INFERENCE_LARGE_IMAGE_MEGAPIXELS and 'full' otherwise.
+INFERENCE_MODE = config('INFERENCE_MODE', default='auto')
+INFERENCE_LARGE_IMAGE_MEGAPIXELS = config(
+    'INFERENCE_LARGE_IMAGE_MEGAPIXELS', default=12, cast=float
+)
+INFERENCE_MAX_SIDE = config('INFERENCE_MAX_SIDE', default=2048, cast=int)
+INFERENCE_TILE_HEIGHT = config('INFERENCE_TILE_HEIGHT', default=512, cast=int)
+
+# Content-addressed result cache: identical uploads reuse an existing result.
+# Entries unused for RESULT_CACHE_TTL_HOURS, or beyond RESULT_CACHE_MAX_ENTRIES
+# (least recently used first), are evicted by cleanup_old_tasks.
+RESULT_CACHE_ENABLED = config('RESULT_CACHE_ENABLED', default=True, cast=bool)
+RESULT_CACHE_TTL_HOURS = config('RESULT_CACHE_TTL_HOURS', default=24, cast=int)
+RESULT_CACHE_MAX_ENTRIES = config('RESULT_CACHE_MAX_ENTRIES', default=10000, cast=int)
+
+# Single-flight coalescing (processor.coalescing): an upload identical to one
+# still in flight waits for that job instead of running the model again. The
+# in-flight marker lives in TASK_STATE_URL and expires after COALESCE_TTL
+# seconds so a crashed worker cannot hold it.
+COALESCE_UPLOADS = config('COALESCE_UPLOADS', default=True, cast=bool)
+COALESCE_TTL = config('COALESCE_TTL', default=300, cast=int)
+
+# Batched inference: when enabled, uploads are routed to a dedicated queue that is
+# drained by `manage.py run_batch_worker` instead of the regular Celery worker
+INFERENCE_BATCH_ENABLED = config('INFERENCE_BATCH_ENABLED', default=False, cast=bool)
+INFERENCE_BATCH_QUEUE = config('INFERENCE_BATCH_QUEUE', default='batch')
+INFERENCE_BATCH_SIZE = config('INFERENCE_BATCH_SIZE', default=8, cast=int)
+INFERENCE_BATCH_MAX_WAIT_MS = config(
+    'INFERENCE_BATCH_MAX_WAIT_MS', default=200, cast=int
+)
+
 # SSL/TLS configuration for Upstash Redis (only when using rediss://)
 if CELERY_BROKER_URL.startswith('rediss://'):
     CELERY_BROKER_USE_SSL = {
@@ -184,6 +329,58 @@ if CELERY_BROKER_URL.startswith('rediss://'):
     }
     CELERY_REDIS_BACKEND_USE_SSL = {'ssl_cert_reqs': None}
 
+# Task status events: state transitions are published over Redis pub/sub and
+# streamed to clients (SSE or long-poll). Non-Redis URLs use an in-process broker.
+TASK_EVENTS_URL = config(
+    'TASK_EVENTS_URL', default='memory://' if TESTING else CELERY_BROKER_URL
+)
+TASK_EVENTS_STREAM_TIMEOUT = 60  # Seconds an SSE stream stays open before reconnecting
+TASK_EVENTS_HEARTBEAT = 15  # Seconds between SSE keepalive comments
+TASK_STATUS_MAX_WAIT = 30  # Upper bound for ?wait= long-polling, in seconds
+# Under ASGI, threads per process for the async views' blocking I/O (Redis,
+# staging, enqueueing); each waiting long-poll holds one
+ASYNC_VIEW_THREADS = config('ASYNC_VIEW_THREADS', default=64, cast=int)
+
+# Hot task state (processor.task_state): the 'processing' transition and status
+# reads go to Redis, so the database row is only written on creation and at the
+# terminal state. 'memory://' keeps it in-process (single-process setups only);
+# empty disables it and every transition is written to the database.
+# Status reads fall back to the database once an entry expires.
+_redis_broker = CELERY_BROKER_URL.startswith(('redis://', 'rediss://'))
+TASK_STATE_URL = config(
+    'TASK_STATE_URL', default=CELERY_BROKER_URL if _redis_broker and not TESTING else ''
+)
+TASK_STATE_TTL = config(
+    'TASK_STATE_TTL', default=CLEANUP_MAX_AGE_HOURS * 3600, cast=int
+)
+
+# Admission control (processor.admission): uploads are refused with 503 and
+# Retry-After when the queue is deeper than ADMISSION_MAX_QUEUE_DEPTH jobs or
+# its expected wait (depth x recent seconds per job / worker slots) is above
+# the priority's limit. Seconds per job come from the workers through
+# ADMISSION_URL; ADMISSION_SERVICE_SECONDS is used until they report.
+ADMISSION_ENABLED = config('ADMISSION_ENABLED', default=True, cast=bool)
+ADMISSION_URL = config('ADMISSION_URL', default=TASK_STATE_URL)
+ADMISSION_MAX_QUEUE_DEPTH = config('ADMISSION_MAX_QUEUE_DEPTH', default=5000, cast=int)
+ADMISSION_MAX_WAIT_SECONDS = {
+    'interactive': config('ADMISSION_MAX_WAIT_SECONDS', default=60, cast=float),
+    'bulk': config('ADMISSION_BULK_MAX_WAIT_SECONDS', default=1800, cast=float),
+}
+ADMISSION_WORKER_SLOTS = config('ADMISSION_WORKER_SLOTS', default=2, cast=int)
+ADMISSION_SERVICE_SECONDS = config('ADMISSION_SERVICE_SECONDS', default=3, cast=float)
+ADMISSION_SERVICE_TTL = 3600  # Forget the measured seconds per job after idling
+ADMISSION_DEPTH_CACHE_SECONDS = 1  # Per-process cache of broker queue lengths
+
+# Optional per-client token buckets (429 with Retry-After): RATE_LIMIT_RATE
+# images per second with bursts of RATE_LIMIT_BURST, kept in ADMISSION_URL.
+# A batch takes one token per image.
+# Set RATE_LIMIT_PROXY_COUNT to the number of proxies that append to
+# X-Forwarded-For (1 on Cloud Run) to limit by client instead of proxy.
+RATE_LIMIT_ENABLED = config('RATE_LIMIT_ENABLED', default=False, cast=bool)
+RATE_LIMIT_RATE = config('RATE_LIMIT_RATE', default=0.5, cast=float)
+RATE_LIMIT_BURST = config('RATE_LIMIT_BURST', default=10, cast=int)
+RATE_LIMIT_PROXY_COUNT = config('RATE_LIMIT_PROXY_COUNT', default=0, cast=int)
+
 # Media files for processed images
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
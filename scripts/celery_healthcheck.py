@@ -1,10 +1,16 @@
 #!/usr/bin/env python
 # Celery worker wrapper with HTTP health check for Cloud Run.
 
+import argparse
+import atexit
+import json
+import logging
 import os
 import signal
 import sys
+import tempfile
 import threading
+import time
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from pathlib import Path
 
@@ -12,21 +18,110 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+logger = logging.getLogger(__name__)
+
+# Startup of this process: phase durations in seconds, the pool size and
+# whether the worker consumes tasks yet (set by the worker_ready signal)
+startup = {
+    'started': time.monotonic(),
+    'phases': {},
+    'concurrency': None,
+    'consuming': False,
+}
+
+# The shared inference server process, when INFERENCE_SERVER_ADDRESS is set,
+# and how often it was restarted after exiting
+inference_server = {'process': None, 'restarts': 0}
+INFERENCE_SERVER_RESTART_DELAY = 1  # Seconds between an exit and the restart
+
 
 class HealthCheckHandler(BaseHTTPRequestHandler):
-    """Minimal HTTP handler that responds 200 OK to Cloud Run health checks."""
+    """
+    Health checks for Cloud Run, and /metrics.
+
+    /ready is the readiness check: 200 once the worker consumes tasks, every
+    pool process is warm (see processor.warmup) and the inference server, if
+    any, is running; 503 otherwise. Any other
+    path is the liveness check and answers 200 OK as long as the process runs.
+
+    Metrics are aggregated across the prefork pool through
+    PROMETHEUS_MULTIPROC_DIR, which is set before the worker forks.
+    """
 
     def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'text/plain')
+        path = self.path.split('?')[0].rstrip('/')
+        status = 200
+        if path == '/metrics':
+            from processor.metrics import export_metrics
+
+            body, content_type = export_metrics()
+        elif path == '/ready':
+            report = readiness()
+            status = 200 if report['ready'] else 503
+            body, content_type = json.dumps(report).encode(), 'application/json'
+        else:
+            body, content_type = b'OK', 'text/plain'
+
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
         self.end_headers()
-        self.wfile.write(b'OK')
+        self.wfile.write(body)
 
     def log_message(self, format, *args):
         # Suppress HTTP logs to avoid cluttering Celery output
         pass
 
 
+def readiness():
+    """Startup phases, and whether the worker and all pool processes are ready."""
+    processes = {}
+    if startup['consuming']:
+        from processor.warmup import ready_processes
+
+        processes = ready_processes(os.environ['WORKER_READY_DIR'])
+    server = inference_server['process']
+    server_alive = server is None or server.is_alive()
+    return {
+        'ready': (
+            startup['consuming']
+            and len(processes) >= startup['concurrency']
+            and server_alive
+        ),
+        'concurrency': startup['concurrency'],
+        'warm_processes': len(processes),
+        'inference_server': {
+            'alive': server_alive,
+            'restarts': inference_server['restarts'],
+        },
+        'phases': startup['phases'],
+        'processes': {str(pid): timings for pid, timings in processes.items()},
+    }
+
+
+def record_phase(phase, seconds):
+    from processor.metrics import WORKER_STARTUP_SECONDS
+
+    WORKER_STARTUP_SECONDS.labels(phase=phase).observe(seconds)
+    startup['phases'][phase] = round(seconds, 3)
+    # Logged rather than printed: once started, Celery captures stdout
+    logger.info(
+        'Worker startup phase', extra={'phase': phase, 'seconds': round(seconds, 3)}
+    )
+
+
+def on_worker_ready(**kwargs):
+    """Start consuming; report the total startup once all processes are warm."""
+    record_phase('worker_start', time.monotonic() - startup['worker_started'])
+    startup['consuming'] = True
+
+    def wait_until_ready():
+        while not readiness()['ready']:
+            time.sleep(0.5)
+        record_phase('ready', time.monotonic() - startup['started'])
+
+    threading.Thread(target=wait_until_ready, daemon=True).start()
+
+
 def run_health_server():
     port = int(os.environ.get('PORT', 8080))
     server = HTTPServer(('0.0.0.0', port), HealthCheckHandler)
@@ -38,21 +133,132 @@ def run_celery_worker():
     import django
 
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'remove_bg.settings')
+    django_started = time.monotonic()
     django.setup()
+    record_phase('django_setup', time.monotonic() - django_started)
+
+    from celery.signals import worker_ready
 
     from remove_bg.celery import app
 
+    worker_ready.connect(on_worker_ready, weak=False)
+
+    start_inference_server()
+
     print('Celery worker starting...', flush=True)
+    # Embedded beat drives periodic cleanup. Every autoscaled instance runs it;
+    # runs are serialized by a lock in TASK_STATE_URL (processor.cleanup), so
+    # without one, disable it on all but one instance (CELERY_EMBEDDED_BEAT=False)
+    embed_beat = os.environ.get('CELERY_EMBEDDED_BEAT', 'True').lower() == 'true'
+
+    # Queues are polled in the listed order, so interactive jobs go first.
+    # Dedicated pools: CELERY_QUEUES=interactive or CELERY_QUEUES=bulk
+    queues = [
+        queue.strip()
+        for queue in os.environ.get('CELERY_QUEUES', 'interactive,bulk').split(',')
+        if queue.strip()
+    ]
+    from processor.tuning import available_cpus, onnx_thread_counts, worker_concurrency
+
+    concurrency = worker_concurrency()
+    startup['concurrency'] = concurrency
+    intra_op, inter_op = onnx_thread_counts()
+    print(
+        f'Consuming {queues} with {concurrency} process(es) on {available_cpus()} '
+        f'CPU(s), ONNX threads intra-op={intra_op} inter-op={inter_op}',
+        flush=True,
+    )
+
     worker = app.Worker(
         loglevel='INFO',
-        concurrency=2,
+        concurrency=concurrency,
+        queues=queues,
         pool='prefork',
         logfile=None,  # Log to stdout
+        beat=embed_beat,
+        schedule_filename=os.path.join(tempfile.gettempdir(), 'celerybeat-schedule'),
     )
     print('Starting Celery worker.start()...', flush=True)
+    startup['worker_started'] = time.monotonic()
     worker.start()
 
 
+def start_inference_server():
+    """
+    Start the shared inference server when INFERENCE_SERVER_ADDRESS is set.
+
+    It is spawned rather than forked so it does not inherit the worker's
+    broker connections; pool processes connect to it on first use. A server
+    that exits is restarted, and pool processes reconnect on their next job.
+    """
+    from django.conf import settings
+
+    if not settings.INFERENCE_SERVER_ADDRESS:
+        return
+
+    spawn_inference_server()
+    # Registered after multiprocessing's own exit handler, so it runs first:
+    # the server it terminates at exit must not be restarted
+    stopping = threading.Event()
+    atexit.register(stopping.set)
+    threading.Thread(
+        target=supervise_inference_server, args=(stopping,), daemon=True
+    ).start()
+
+
+def spawn_inference_server():
+    import multiprocessing
+
+    from django.conf import settings
+
+    from processor.inference_server import run_server
+
+    process = multiprocessing.get_context('spawn').Process(
+        target=run_server, name='inference-server', daemon=True
+    )
+    process.start()
+    inference_server['process'] = process
+    print(
+        f'Inference server (pid {process.pid}) on {settings.INFERENCE_SERVER_ADDRESS}',
+        flush=True,
+    )
+
+
+def supervise_inference_server(stopping):
+    """Restart the inference server whenever it exits, until ``stopping``."""
+    while True:
+        process = inference_server['process']
+        process.join()
+        if stopping.is_set():
+            return
+        logger.error(
+            'Inference server exited, restarting',
+            extra={'pid': process.pid, 'exitcode': process.exitcode},
+        )
+        if stopping.wait(INFERENCE_SERVER_RESTART_DELAY):
+            return
+        inference_server['restarts'] += 1
+        spawn_inference_server()
+
+
+def parse_args():
+    """
+    Worker tuning flags. Each overrides the environment variable of the same
+    name (see remove_bg/settings.py) for this worker and its pool processes.
+    """
+    parser = argparse.ArgumentParser(description='Celery worker with health check')
+    parser.add_argument('--queues', dest='CELERY_QUEUES')
+    parser.add_argument('--concurrency', dest='WORKER_CONCURRENCY')
+    parser.add_argument('--onnx-intra-op-threads', dest='ONNX_INTRA_OP_THREADS')
+    parser.add_argument('--onnx-inter-op-threads', dest='ONNX_INTER_OP_THREADS')
+    parser.add_argument('--onnx-graph-optimization', dest='ONNX_GRAPH_OPTIMIZATION')
+    parser.add_argument('--onnx-mem-arena', dest='ONNX_ENABLE_MEM_ARENA')
+
+    for name, value in vars(parser.parse_args()).items():
+        if value is not None:
+            os.environ[name] = value
+
+
 def shutdown_handler(sig, frame):
     """Handle SIGTERM/SIGINT for graceful shutdown within Cloud Run grace period."""
     print('\nShutdown signal received, exiting...', flush=True)
@@ -60,11 +266,19 @@ def shutdown_handler(sig, frame):
 
 
 if __name__ == '__main__':
+    parse_args()
     signal.signal(signal.SIGTERM, shutdown_handler)
     signal.signal(signal.SIGINT, shutdown_handler)
 
     print('Starting Celery worker with health check endpoint', flush=True)
 
+    # Pool processes write metrics here; the health server aggregates them
+    os.environ.setdefault(
+        'PROMETHEUS_MULTIPROC_DIR', tempfile.mkdtemp(prefix='prometheus-')
+    )
+    # Pool processes mark themselves warm here; /ready counts them
+    os.environ.setdefault('WORKER_READY_DIR', tempfile.mkdtemp(prefix='worker-ready-'))
+
     # Health check server runs in daemon thread
     health_thread = threading.Thread(target=run_health_server, daemon=True)
     health_thread.start()